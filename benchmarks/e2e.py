@@ -0,0 +1,180 @@
+"""
+Offline end-to-end benchmark: runs main.run_all_tasks and every job from main.build_jobs against
+recorded pages, a fake Notion API and a Gemini stub (see benchmarks/offline.py). No network needed.
+
+Each target runs in its own interpreter with a throwaway data dir, so peak RSS and the mirror/state
+files belong to that target alone. Pass 1 starts from empty local state ("cold"); later passes reuse
+it like the next scheduled cycle would ("warm").
+
+    python -m benchmarks.e2e [--targets run_all_tasks,lifts] [--passes 2] [--notion-429-rate 0.02]
+    python -m benchmarks.e2e --record     # refresh benchmarks/fixtures/e2e from the live sites
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import threading
+import subprocess
+
+import config
+from benchmarks import offline
+
+RESULT_PREFIX = "BENCH_RESULT "
+ALL_TASKS = "run_all_tasks"
+RSS_SAMPLE_SECONDS = 0.2
+# Live hosts are unreachable during a run: requests fails fast through a dead proxy instead of hanging
+OFFLINE_ENV = {"HTTP_PROXY": "http://127.0.0.1:9", "HTTPS_PROXY": "http://127.0.0.1:9",
+               "NO_PROXY": "127.0.0.1,localhost"}
+
+
+class _BrowserRssSampler:
+    """Peak RSS of the browser processes below this one (ru_maxrss only covers this interpreter)."""
+
+    def __init__(self, descendant_rss_mb):
+        self._measure = descendant_rss_mb
+        self.peak_mb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self.peak_mb = max(self.peak_mb, self._measure(os.getpid()))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _localize(urls, server):
+    return {k: _localize(v, server) if isinstance(v, dict) else server.local_url(v) for k, v in urls.items()}
+
+
+def _child(target, args):
+    # Every core module derives its file paths from DATA_DIR at import time
+    config.DATA_DIR = tempfile.mkdtemp(prefix="whistler-bench-")
+
+    import main
+    from core import scraper, notion, runner
+    from core.mirror import mirror
+    from jobs import conditions
+
+    fixtures = offline.Fixtures.load(args.fixtures)
+    server = offline.OfflineServer(fixtures, notion_latency_ms=args.notion_latency_ms, notion_rps=args.notion_rps,
+                                   notion_429_rate=args.notion_429_rate,
+                                   gemini_latency_ms=args.gemini_latency_ms).start()
+    server.seed_notion()
+    config.URLS = _localize(config.URLS, server)
+    notion.NOTION_API = f"{server.base_url}/v1"
+    conditions.GEMINI_API = f"{server.base_url}/gemini"
+
+    jobs = {job.name: job for job in main.build_jobs()}
+    for n in range(1, args.passes + 1):
+        server.counts.clear()
+        blocked_before = scraper.route_totals["requests"]
+        with _BrowserRssSampler(scraper._descendant_rss_mb) as sampler:
+            start = time.perf_counter()
+            if target == ALL_TASKS:
+                try:
+                    main.run_all_tasks()
+                    status = "ok"
+                except Exception as e:
+                    status = f"failed: {e}"
+            else:
+                job = jobs[target]
+                result = runner.run_jobs([runner.Job(job.name, job.func, *job.args, timeout=job.timeout)])[job.name]
+                status = result["status"]
+            wall = time.perf_counter() - start
+
+        counts = dict(server.counts)
+        print(RESULT_PREFIX + json.dumps({
+            "target": target, "pass": n, "status": status, "wall_s": round(wall, 3),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "browser_peak_rss_mb": round(sampler.peak_mb, 1),
+            "requests": {
+                "pages": counts.get("site", 0), "images": counts.get("image", 0), "misses": counts.get("miss", 0),
+                "notion": sum(v for k, v in counts.items() if k.startswith("notion ") and k != "notion 429"),
+                "notion_429": counts.get("notion 429", 0), "gemini": counts.get("gemini", 0),
+                "blocked": scraper.route_totals["requests"] - blocked_before,
+            },
+            "fixtures": fixtures.source,
+        }), flush=True)
+        # The next pass behaves like the next scheduled cycle: persisted state kept, per-cycle caches dropped
+        scraper.fetch_cache.clear()
+        mirror._last_sync.clear()
+
+    scraper.close_browser_pool()
+    server.stop()
+
+
+def _print_table(results):
+    cols = [("target", 16), ("pass", 5), ("status", 9), ("wall s", 8), ("py MB", 7), ("browser MB", 11),
+            ("pages", 6), ("images", 7), ("notion", 7), ("429", 5), ("gemini", 7), ("blocked", 8), ("misses", 7)]
+    print("\n" + "".join(f"{name:>{w}}" if i > 2 else f"{name:<{w}}" for i, (name, w) in enumerate(cols)))
+    for r in results:
+        q = r["requests"]
+        values = [r["target"], "cold" if r["pass"] == 1 else "warm", r["status"][:8], f"{r['wall_s']:.1f}",
+                  f"{r['peak_rss_mb']:.0f}", f"{r['browser_peak_rss_mb']:.0f}", q["pages"], q["images"],
+                  q["notion"], q["notion_429"], q["gemini"], q["blocked"], q["misses"]]
+        print("".join(f"{v:>{w}}" if i > 2 else f"{v:<{w}}" for i, (v, (_, w)) in enumerate(zip(values, cols))))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--targets", help=f"comma-separated job names and/or {ALL_TASKS} (default: all)")
+    ap.add_argument("--passes", type=int, default=2)
+    ap.add_argument("--fixtures", default=offline.FIXTURE_DIR)
+    ap.add_argument("--notion-latency-ms", type=float, default=offline.NOTION_LATENCY_MS)
+    ap.add_argument("--notion-rps", type=float, default=offline.NOTION_RPS)
+    ap.add_argument("--notion-429-rate", type=float, default=0.0, help="extra random 429s on top of the rate limit")
+    ap.add_argument("--gemini-latency-ms", type=float, default=offline.GEMINI_LATENCY_MS)
+    ap.add_argument("--json", help="also write the results to this file")
+    ap.add_argument("--verbose", action="store_true", help="show the jobs' own output")
+    ap.add_argument("--record", action="store_true", help="record fixtures from the live sites and exit")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.record:
+        offline.record_fixtures(args.fixtures)
+        return
+    if args.child:
+        _child(args.child, args)
+        return
+
+    if args.targets:
+        targets = args.targets.split(",")
+    else:
+        config.DATA_DIR = tempfile.mkdtemp(prefix="whistler-bench-")
+        import main as pipeline
+        targets = [ALL_TASKS] + [job.name for job in pipeline.build_jobs()]
+
+    print(f"Fixtures: {offline.Fixtures.load(args.fixtures).source}")
+    passthrough = [a for a in sys.argv[1:] if a not in ("--verbose",)]
+    env = {**os.environ, **OFFLINE_ENV}
+    results = []
+    for target in targets:
+        print(f"⏱️ {target}...", flush=True)
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.e2e", *passthrough, "--child", target],
+                              capture_output=True, text=True, env=env)
+        lines = proc.stdout.splitlines()
+        if args.verbose:
+            print("\n".join(l for l in lines if not l.startswith(RESULT_PREFIX)))
+        found = [json.loads(l[len(RESULT_PREFIX):]) for l in lines if l.startswith(RESULT_PREFIX)]
+        if proc.returncode != 0 or not found:
+            print(f"   ❌ {target} crashed: {(proc.stderr.strip().splitlines() or ['no output'])[-1]}")
+        results.extend(found)
+
+    _print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+"""
+Offline stand-ins for everything the jobs talk to, served from one local HTTP server:
+
+    /site/<host>/<path>   recorded (or synthetic) pages and webcam images for config.URLS and stations
+    /v1/...               a fake Notion API (in-memory databases, latency, server-side 429s)
+    /gemini               a Gemini generateContent stub
+
+Absolute links inside served pages are rewritten to /site/ so a browser never leaves the machine.
+Fixtures are recorded with `python -m benchmarks.e2e --record` (needs network and credentials);
+without them a synthetic site shaped like the real pages is generated.
+"""
+import io
+import os
+import re
+import json
+import time
+import uuid
+import random
+import hashlib
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse, urljoin
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "e2e")
+INDEX_FILE = "index.json"
+
+# Fake Notion defaults: ~3 requests/second sustained with a small burst, like the real API
+NOTION_LATENCY_MS = 180
+NOTION_JITTER_MS = 60
+NOTION_RPS = 3
+NOTION_BURST = 10
+NOTION_RETRY_AFTER_SECONDS = 1
+GEMINI_LATENCY_MS = 900
+
+_ABSOLUTE_URL = re.compile(r"(?<=[\"'(=\s])(?:https?:)?//(?=[\w.-]+\.[a-z]{2,}[/\"'?#)\s])", re.I)
+
+
+def _data_source(database_id):
+    """The fake data source id of a database: its config.DS_IDS entry if set."""
+    name = next((n for n, db_id in config.DB_IDS.items() if db_id == database_id), None)
+    return (config.DS_IDS.get(name) if name else None) or f"ds-{database_id}"
+
+
+def _page_object(page_id, database_id, properties, created=None):
+    now = _notion_time()
+    parent = {"type": "data_source_id", "data_source_id": _data_source(database_id), "database_id": database_id}
+    return {"object": "page", "id": page_id, "created_time": created or now, "last_edited_time": now,
+            "archived": False, "parent": parent, "properties": properties}
+
+
+def _notion_time(dt=None):
+    # Notion timestamps are minute-granular
+    dt = (dt or datetime.now(timezone.utc)).replace(second=0, microsecond=0)
+    return dt.strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+
+def _typed(properties):
+    """Turns request-style properties ({"title": [...]}) into response-style ones ({"type": "title", ...})."""
+    typed = {}
+    for name, prop in properties.items():
+        kind = prop.get("type") or next(iter(prop), None)
+        value = prop.get(kind)
+        if kind in ("title", "rich_text"):
+            value = [{**t, "type": "text", "plain_text": t.get("plain_text") or t.get("text", {}).get("content", "")}
+                     for t in value or []]
+        typed[name] = {"id": name[:4], "type": kind, kind: value}
+    return typed
+
+
+# --- FIXTURES ---
+class Fixtures:
+    """
+    Recorded responses keyed by their original URL, plus the Notion lookup rows the jobs expect
+    (stations, elevations). index.json: {"pages": {url: file}, "images": {url: file}, "notion": {db: [props]}}.
+    """
+
+    def __init__(self, pages, images, notion_rows, source):
+        self.pages = pages      # url -> html str
+        self.images = images    # url -> bytes
+        self.notion_rows = notion_rows
+        self.source = source
+
+    @classmethod
+    def load(cls, directory=FIXTURE_DIR):
+        path = os.path.join(directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return synthetic_fixtures()
+        with open(path) as f:
+            index = json.load(f)
+        read = lambda name, mode: open(os.path.join(directory, name), mode).read()
+        pages = {url: read(name, "r") for url, name in index["pages"].items()}
+        images = {url: read(name, "rb") for url, name in index.get("images", {}).items()}
+        return cls(pages, images, index.get("notion", {}), f"recorded ({directory})")
+
+    def save(self, directory=FIXTURE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        index = {"pages": {}, "images": {}, "notion": self.notion_rows}
+        for kind, items, ext, mode in (("pages", self.pages, ".html", "w"), ("images", self.images, ".jpg", "wb")):
+            for url, body in items.items():
+                name = hashlib.sha1(url.encode()).hexdigest()[:16] + ext
+                with open(os.path.join(directory, name), mode) as f:
+                    f.write(body)
+                index[kind][url] = name
+        with open(os.path.join(directory, INDEX_FILE), "w") as f:
+            json.dump(index, f, indent=2)
+
+
+def record_fixtures(directory=FIXTURE_DIR):
+    """Captures every config.URLS page, the station pages and their webcam frames from the live sites."""
+    import requests
+    from core import scraper, notion, parsing
+
+    targets = {config.URLS["Lifts"]: ".row", config.URLS["Snowfall History"]: ".day-container",
+               config.URLS["Lift Status"]: None,
+               **{url: (".alpine__container" if e == "1800m" else ".forecast-table")
+                  for e, url in config.URLS["Weather Forecast"].items()}}
+    notion_rows = {}
+    for db_name in ("Weather Forecast Elevations", "Weather Stations"):
+        pages = notion.query_datasource(config.DB_IDS[db_name])
+        notion_rows[db_name] = [{k: v for k, v in p["properties"].items()} for p in pages]
+
+    from core.mirror import plain_value
+    for props in notion_rows["Weather Stations"]:
+        url = plain_value(props["WhistlerPeak URL"]) if "WhistlerPeak URL" in props else None
+        if url: targets[url] = ".tempValue"
+
+    pages, images = {}, {}
+    for url, selector in targets.items():
+        print(f"📼 Recording {url}")
+        html = scraper.scrape_dynamic_content(url, selector, use_cache=False, block_profile="full")
+        if not html: continue
+        pages[url] = html
+        if selector != ".tempValue": continue
+        soup = parsing.make_soup(html)
+        for img in soup.select("#cam-gallery img, .container_wind img, .webcam-image img, img[src*='webcam']"):
+            src = urljoin(url, img.get("src", ""))
+            resp = requests.get(src, timeout=30)
+            if resp.ok: images[src] = resp.content
+
+    Fixtures(pages, images, notion_rows, "recorded").save(directory)
+    print(f"✅ Recorded {len(pages)} page(s) and {len(images)} image(s) to {directory}")
+
+
+# --- SYNTHETIC SITE ---
+STATIONS = ["Roundhouse", "Rendezvous", "Pig Alley", "Crystal Ridge", "7th Heaven", "Horstman Hut"]
+
+
+def _synthetic_snow_forecast():
+    from benchmarks.parsers import synthetic_forecast_page
+    extra = ('<span class="location-issued__update"><span class="hours">3</span>h '
+             '<span class="minutes">12</span>m</span>'
+             '<div class="about-weather-summary__content">Weather (Next 3 days): Light snow, heaviest on '
+             'Thursday night. Freeze level near 1200m.</div>')
+    return synthetic_forecast_page(filler_blocks=1500).replace('<div class="weather-intro">',
+                                                               extra + '<div class="weather-intro">', 1)
+
+
+def _synthetic_rwdi():
+    today = datetime.now()
+    cards = "".join(
+        f'<div class="alpine__card"><h3 class="alpine__card-period">{(today + timedelta(days=d)).strftime("%A")}'
+        f'</h3><p class="alpine__card-summary">Flurries with sunny breaks.</p>'
+        f'<p class="alpine__card-temps">High {-d} Low {-6 - d}</p></div>' for d in range(4))
+    stamp = today.replace(hour=5).strftime("%B %-d, %Y 5am")
+    return (f'<html><body><div class="alpine__container"><div class="alpine__time-container">'
+            f'Report date: {today.strftime("%A")} {stamp}. Forecast by RWDI.</div>{cards}</div></body></html>')
+
+
+def _synthetic_lifts():
+    names = ["Whistler Village Gondola", "Peak Express", "Harmony 6 Express", "Symphony Express", "T-Bar",
+             "Big Red Express", "Creekside Gondola", "Emerald 6 Express", "Franz's Chair", "Garbanzo Express",
+             "Blackcomb Gondola", "7th Heaven Express", "Glacier Express", "Jersey Cream Express",
+             "Crystal Ridge Express", "Catskinner Express", "Excalibur Gondola", "Excelerator Express",
+             "Showcase T-Bar", "Horstman T-Bar", "Peak 2 Peak Gondola", "Magic Chair", "Olympic Chair"]
+    row = lambda *c: '<div class="row">' + "".join(f'<div class="cell">{x}</div>' for x in c) + "</div>"
+    rows = [row("Lift Name", "Bottom", "Top")] + [row(n, f"{650 + 37 * i:,}", f"{1500 + 41 * i:,}")
+                                                    for i, n in enumerate(names)]
+    return "<html><body><div class='lifts'>" + "\n".join(rows) + "</div></body></html>"
+
+
+def _synthetic_lift_status():
+    lifts = [{"Name": name, "Status": i % 4 if i % 5 else 1, "WaitTimeInMinutes": (i * 3) % 17 if i % 4 else None}
+             for i, name in enumerate(["Whistler Village Gondola", "Peak Express", "Harmony 6 Express",
+                                       "Symphony Express", "Blackcomb Gondola", "7th Heaven Express",
+                                       "Glacier Express", "Jersey Cream Express", "Peak 2 Peak Gondola"])]
+    return (f"<html><head><script>FR.TerrainStatusFeed = {json.dumps({'Lifts': lifts, 'GroomingAreas': []})};"
+            f"</script></head><body><div id='terrain'></div></body></html>")
+
+
+def _synthetic_history(days=60):
+    today = datetime.now()
+    lines, season = ["Date", "Snowfall", "Season", "Base"], 0
+    for d in range(days, 0, -1):
+        day = today - timedelta(days=d)
+        snow = (d * 7) % 13
+        season += snow
+        lines += [day.strftime("%b %d"), f"{snow}cm", f"{season}cm", f"{80 + season // 3}cm"]
+    body = "\n".join(f"<div>{line}</div>" for line in lines)
+    return (f'<html><body><div id="content_history"><div class="day-container">\n{body}\n'
+            f'</div></div></body></html>')
+
+
+def _synthetic_station(slug, temperature):
+    return (f'<html><body><div class="weather"><span class="tempValue">{temperature}°C</span></div>'
+            f'<div id="cam-gallery"><ul class="thumbnail-list">'
+            f'<li><img src="/webcams/{slug}-1.jpg"></li><li><img src="/webcams/{slug}-2.jpg"></li>'
+            f'</ul></div></body></html>')
+
+
+def _synthetic_webcam(seed):
+    """A daytime frame that the local classifier cannot decide, so it exercises the Gemini path."""
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    h, w = 360, 640
+    rows = np.linspace(0, 1, h)[:, None, None]
+    sky = np.array([90, 140, 220]) * (1 - rows) + np.array([235, 235, 240]) * rows
+    frame = np.clip(sky + rng.normal(0, 25, (h, w, 3)), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(frame).save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def synthetic_fixtures():
+    pages = {
+        config.URLS["Lifts"]: _synthetic_lifts(),
+        config.URLS["Lift Status"]: _synthetic_lift_status(),
+        config.URLS["Snowfall History"]: _synthetic_history(),
+        config.URLS["Weather Forecast"]["1800m"]: _synthetic_rwdi(),
+    }
+    for elevation in ("1480m", "2248m"):
+        pages[config.URLS["Weather Forecast"][elevation]] = _synthetic_snow_forecast()
+
+    stations, images = [], {}
+    for i, name in enumerate(STATIONS):
+        slug = name.lower().replace(" ", "-")
+        url = f"https://whistlerpeak.com/stations/{slug}/"
+        pages[url] = _synthetic_station(slug, -2 - i)
+        for cam in (1, 2):
+            images[f"https://whistlerpeak.com/webcams/{slug}-{cam}.jpg"] = _synthetic_webcam(i * 10 + cam)
+        stations.append({"Name": {"title": [{"text": {"content": name}}]},
+                         "WhistlerPeak URL": {"url": url},
+                         "Webcams": {"rich_text": [{"text": {"content": "1"}}]}})
+
+    elevations = [{"Name": {"title": [{"text": {"content": e}}]}} for e in ("1480m", "1800m", "2248m")]
+    return Fixtures(pages, images, {"Weather Stations": stations, "Weather Forecast Elevations": elevations},
+                    "synthetic")
+
+
+# --- SERVER ---
+class _Bucket:
+    """Server-side rate limit of the fake Notion API (tokens refill at rps up to burst)."""
+
+    def __init__(self, rps, burst):
+        self.rps, self.burst = rps, burst
+        self._tokens, self._updated = burst, time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rps)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class OfflineServer:
+    """
+    Serves a Fixtures set, a fake Notion API and a Gemini stub on 127.0.0.1.
+    counts tallies every request by kind ("site", "image", "miss", "notion POST", "notion 429", "gemini", ...).
+    """
+
+    def __init__(self, fixtures, notion_latency_ms=NOTION_LATENCY_MS, notion_rps=NOTION_RPS,
+                 notion_burst=NOTION_BURST, notion_429_rate=0.0, gemini_latency_ms=GEMINI_LATENCY_MS, seed=1):
+        self.fixtures = fixtures
+        self.notion_latency_ms = notion_latency_ms
+        self.notion_429_rate = notion_429_rate
+        self.gemini_latency_ms = gemini_latency_ms
+        self.counts = Counter()
+        self.databases = {}  # database id -> {page id: page}
+        self._bucket = _Bucket(notion_rps, notion_burst)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    # -- lifecycle --
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="offline-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def local_url(self, url):
+        """Where the original URL is served locally."""
+        parsed = urlparse(url)
+        return f"{self.base_url}/site/{parsed.netloc}{parsed.path or '/'}" + (f"?{parsed.query}" if parsed.query else "")
+
+    def seed_notion(self):
+        """Creates the lookup rows (stations, elevations) with station URLs pointing at the local site."""
+        for db_name, rows in self.fixtures.notion_rows.items():
+            for props in rows:
+                props = dict(props)
+                if "WhistlerPeak URL" in props and props["WhistlerPeak URL"].get("url"):
+                    props["WhistlerPeak URL"] = {"url": self.local_url(props["WhistlerPeak URL"]["url"])}
+                self._create(config.DB_IDS[db_name], props)
+
+    def rows(self, db_name):
+        return list(self.databases.get(config.DB_IDS[db_name], {}).values())
+
+    # -- fake Notion --
+    def _create(self, database_id, properties):
+        page = _page_object(str(uuid.uuid4()), database_id, _typed(properties))
+        with self._lock:
+            self.databases.setdefault(database_id, {})[page["id"]] = page
+        return page
+
+    def _notion(self, method, path, body):
+        """Returns (status, payload, headers)."""
+        self.counts[f"notion {method}"] += 1
+        time.sleep(max(0, self._random.gauss(self.notion_latency_ms, NOTION_JITTER_MS)) / 1000)
+        if not self._bucket.take() or self._random.random() < self.notion_429_rate:
+            self.counts["notion 429"] += 1
+            return 429, {"object": "error", "code": "rate_limited"}, {"Retry-After": str(NOTION_RETRY_AFTER_SECONDS)}
+
+        parts = path.strip("/").split("/")[1:]  # drop "v1"
+        databases = {_data_source(db_id): db_id for db_id in config.DB_IDS.values()}
+        if method == "POST" and parts == ["pages"]:
+            parent = body["parent"]
+            database_id = parent.get("database_id") or databases.get(parent.get("data_source_id"))
+            if database_id is None:
+                return 404, {"object": "error", "code": "object_not_found"}, {}
+            return 200, self._create(database_id, body.get("properties", {})), {}
+        if method == "GET" and len(parts) == 2 and parts[0] == "databases":
+            return 200, {"object": "database", "id": parts[1],
+                         "data_sources": [{"id": _data_source(parts[1]), "name": "Default"}]}, {}
+        if method == "GET" and len(parts) == 2 and parts[0] == "data_sources":
+            if parts[1] not in databases:
+                return 404, {"object": "error", "code": "object_not_found"}, {}
+            # Imported here: core modules must not load before the benchmark has set config.DATA_DIR
+            from jobs import lift_waits
+            # Reports the properties jobs check for; the fake accepts any property on write
+            schemas = {"Lift Wait Times": lift_waits.SCHEMA}
+            name = next(n for n, db_id in config.DB_IDS.items() if db_id == databases[parts[1]])
+            schema = schemas.get(name, {})
+            return 200, {"object": "data_source", "id": parts[1],
+                         "properties": {n: {"name": n, "type": t} for n, t in schema.items()}}, {}
+        if method == "PATCH" and len(parts) == 2 and parts[0] == "pages":
+            with self._lock:
+                page = next((db[parts[1]] for db in self.databases.values() if parts[1] in db), None)
+                if page is None:
+                    return 404, {"object": "error", "code": "object_not_found"}, {}
+                page["properties"].update(_typed(body.get("properties", {})))
+                page["archived"] = body.get("archived", page["archived"])
+                page["last_edited_time"] = _notion_time()
+            return 200, page, {}
+        if method == "POST" and len(parts) == 3 and parts[0] == "data_sources" and parts[2] == "query":
+            if parts[1] not in databases:
+                return 404, {"object": "error", "code": "object_not_found"}, {}
+            return 200, self._query(databases[parts[1]], body), {}
+        return 400, {"object": "error", "code": "invalid_request_url"}, {}
+
+    def _query(self, database_id, body):
+        with self._lock:
+            pages = [p for p in self.databases.get(database_id, {}).values() if not p["archived"]]
+        since = (body.get("filter") or {}).get("last_edited_time", {}).get("on_or_after")
+        if since:
+            since = datetime.fromisoformat(since.replace("Z", "+00:00"))
+            pages = [p for p in pages if datetime.fromisoformat(p["last_edited_time"].replace("Z", "+00:00")) >= since]
+        pages.sort(key=lambda p: p["last_edited_time"])
+        start = int(body.get("start_cursor") or 0)
+        size = min(int(body.get("page_size", 100)), 100)
+        chunk = pages[start:start + size]
+        more = start + size < len(pages)
+        return {"object": "list", "results": chunk, "has_more": more, "next_cursor": str(start + size) if more else None}
+
+    # -- Gemini stub --
+    def _gemini(self, body):
+        self.counts["gemini"] += 1
+        time.sleep(self.gemini_latency_ms / 1000)
+        parts = body["contents"][0]["parts"]
+        image = next((p["inline_data"]["data"] for p in parts if "inline_data" in p), "")
+        label = ["Bluebird", "Sunny", "Cloudy", "Overcast"][int(hashlib.sha1(image.encode()).hexdigest(), 16) % 4]
+        return {"candidates": [{"content": {"parts": [{"text": label}]}}]}
+
+    # -- site replay --
+    def _site(self, path):
+        original = "https://" + path[len("/site/"):]
+        key = original if original in self.fixtures.pages or original in self.fixtures.images else \
+            original.replace("https://", "http://", 1)
+        if key in self.fixtures.pages:
+            self.counts["site"] += 1
+            html = _ABSOLUTE_URL.sub(f"{self.base_url}/site/", self.fixtures.pages[key])
+            return 200, html.encode("utf-8"), "text/html; charset=utf-8"
+        if key in self.fixtures.images:
+            self.counts["image"] += 1
+            return 200, self.fixtures.images[key], "image/jpeg"
+        self.counts["miss"] += 1
+        return 404, b"", "text/plain"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json_body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+            def _dispatch(self, method):
+                path = self.path.split("?", 1)[0] if not self.path.startswith("/site/") else self.path
+                if path.startswith("/v1/"):
+                    status, payload, headers = server._notion(method, path, self._json_body())
+                    self._send(status, json.dumps(payload).encode(), "application/json", headers)
+                elif path.startswith("/gemini"):
+                    self._send(200, json.dumps(server._gemini(self._json_body())).encode(), "application/json")
+                elif path.startswith("/site/"):
+                    self._send(*server._site(path))
+                else:
+                    server.counts["miss"] += 1
+                    self._send(404, b"", "text/plain")
+
+            def do_GET(self): self._dispatch("GET")
+            def do_POST(self): self._dispatch("POST")
+            def do_PATCH(self): self._dispatch("PATCH")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
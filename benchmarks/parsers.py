@@ -0,0 +1,117 @@
+"""
+Parser benchmark: time and peak memory of each parsing backend on saved pages.
+
+Pages are read from benchmarks/fixtures/pages/*.html (snow-forecast.com 6-day pages work best).
+Without any, a synthetic page with a full-size forecast table is generated.
+
+    python -m benchmarks.parsers [--repeat 20]
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import tempfile
+import resource
+import subprocess
+
+from core import parsing
+from jobs.weather import FORECAST_ROWS
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+BASELINE = "html.parser-full"
+
+
+def synthetic_forecast_page(days=6, filler_blocks=3000):
+    """A page shaped like snow-forecast.com: lots of unrelated markup around one forecast table."""
+    periods = days * 3
+    cell = lambda inner, extra="": f"<td class=\"forecast-table__cell\"{extra}>{inner}</td>"
+    rows = {
+        "days": "".join(cell(f"Day {d}", f' colspan="3" data-date="2025-12-{10 + d:02d}"') for d in range(days)),
+        "time": "".join(cell(["AM", "PM", "night"][p % 3]) for p in range(periods)),
+        "phrases": "".join(cell('<span class="forecast-table__phrase">light snow</span>') for _ in range(periods)),
+        "snow": "".join(cell(f'<div class="snow-amount"><span class="snow-amount__value">{p % 7}</span></div>')
+                        for p in range(periods)),
+        "rain": "".join(cell('<span class="rain-amount__value">-</span>') for _ in range(periods)),
+        "temperature-max": "".join(cell(f'<span class="temp-value">{-p % 5}</span>') for p in range(periods)),
+        "temperature-min": "".join(cell(f'<span class="temp-value">{-p % 9}</span>') for p in range(periods)),
+        "freezing-level": "".join(cell(f'<span class="level-value">{1200 + 50 * p}</span>') for p in range(periods)),
+        "wind": "".join(cell(f'<svg><text>{10 + p}</text></svg>') for p in range(periods)),
+    }
+    table = "".join(f'<tr class="forecast-table__row" data-row="{name}">{cells}</tr>' for name, cells in rows.items())
+    filler = "".join(f'<div class="promo"><a href="/x/{i}">link {i}</a><p>text {i} ' + "lorem " * 20 + "</p></div>"
+                     for i in range(filler_blocks))
+    return (f'<html><head><script>var x = 1;</script></head><body>{filler}'
+            f'<div class="weather-intro">Updated: 42 min ago</div>'
+            f'<div class="forecast-table"><table class="forecast-table__table"><tbody>{table}</tbody></table></div>'
+            f'{filler}</body></html>')
+
+
+def _backends():
+    names = [BASELINE, "html.parser"]
+    try:
+        import lxml  # noqa: F401
+        names.append("lxml")
+    except ImportError:
+        pass
+    if parsing.FastHTMLParser is not None:
+        names.append("selectolax")
+    return names
+
+
+def _run(backend, html):
+    if backend == BASELINE:
+        # What the jobs did before: a full html.parser soup, then one table scan per data-row
+        soup = parsing.make_soup(html, builder="html.parser")
+        table = soup.find("table", class_="forecast-table__table")
+        return {name: [c.get_text(strip=True) for c in table.find("tr", attrs={"data-row": name}).find_all("td")]
+                for name in FORECAST_ROWS}
+    return parsing.extract_table_rows(html, FORECAST_ROWS, backend=backend)
+
+
+def _child(backend, path, repeat):
+    """Runs in a fresh interpreter so ru_maxrss reflects only this backend."""
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    base_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    for _ in range(repeat):
+        _run(backend, html)
+    elapsed = (time.perf_counter() - start) / repeat
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed * 1000:.3f} {max(0, peak_kb - base_kb) / 1024:.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--child", nargs=2, metavar=("BACKEND", "PATH"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _child(args.child[0], args.child[1], args.repeat)
+        return
+
+    pages = sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    if not pages:
+        path = os.path.join(tempfile.mkdtemp(), "synthetic_forecast.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthetic_forecast_page())
+        print(f"No fixtures in {FIXTURE_DIR}, using a synthetic forecast page.")
+        pages = [path]
+
+    for path in pages:
+        print(f"\n{os.path.basename(path)} ({os.path.getsize(path) / 1024:.0f} KB)")
+        print(f"  {'backend':<18}{'ms/parse':>10}{'peak MB':>10}")
+        for backend in _backends():
+            out = subprocess.run([sys.executable, "-m", "benchmarks.parsers", "--repeat", str(args.repeat),
+                                  "--child", backend, path], capture_output=True, text=True)
+            if out.returncode != 0:
+                print(f"  {backend:<18}failed: {out.stderr.strip().splitlines()[-1]}")
+                continue
+            ms, mb = out.stdout.split()
+            print(f"  {backend:<18}{float(ms):>10.2f}{float(mb):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
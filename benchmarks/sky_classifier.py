@@ -0,0 +1,102 @@
+"""
+Accuracy/latency benchmark for jobs.conditions.local_sky_classify.
+
+Labelled frames are read from benchmarks/fixtures/sky/<Label>/*.jpg (saved webcam images, one
+folder per label). Only such real frames say anything about the thresholds. Without them a
+synthetic set is generated, which is a smoke test of the code path and its latency: the frames
+are made to be classifiable, so their precision is not evidence that the cutoffs work on webcams.
+
+    python -m benchmarks.sky_classifier
+"""
+import io
+import os
+import glob
+import time
+import numpy as np
+from PIL import Image
+
+from core.image_cache import load_rgb
+from jobs.conditions import local_sky_classify
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "sky")
+# Labels the local stage is allowed to answer; everything else must be escalated (None)
+LOCAL_LABELS = {"Night", "Foggy"}
+
+
+def _jpeg(pixels):
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def synthetic_fixtures(per_label=20, seed=7, shape=(360, 640)):
+    """Generates (label, jpeg bytes) pairs roughly mimicking webcam scenes."""
+    rng = np.random.default_rng(seed)
+    h, w = shape
+    rows = np.linspace(0, 1, h)[:, None, None]
+    frames = []
+    for _ in range(per_label):
+        # Night: near-black with a few lights
+        night = rng.normal(12, 6, (h, w, 3))
+        ys, xs = rng.integers(h // 2, h, 15), rng.integers(0, w, 15)
+        night[ys, xs] = 240
+        frames.append(("Night", _jpeg(night)))
+
+        # Foggy: bright uniform grey
+        grey = rng.uniform(150, 200)
+        frames.append(("Foggy", _jpeg(rng.normal(grey, 4, (h, w, 1)).repeat(3, axis=2))))
+
+        # Bluebird: saturated blue gradient over textured snow
+        sky = np.concatenate([60 + 80 * rows, 130 + 60 * rows, 230 + 0 * rows], axis=2) * np.ones((1, w, 1))
+        snow = rng.normal(225, 25, (h, w, 1)).repeat(3, axis=2)
+        frames.append(("Bluebird", _jpeg(np.where(rows < 0.45, sky, snow))))
+
+        # Cloudy: textured grey sky over dark treeline
+        clouds = rng.normal(170, 30, (h, w, 1)).repeat(3, axis=2)
+        trees = rng.normal(50, 20, (h, w, 3))
+        frames.append(("Cloudy", _jpeg(np.where(rows < 0.5, clouds, trees))))
+
+        # Overcast: flat grey sky but a contrasting mountain below
+        flat = rng.normal(185, 5, (h, w, 1)).repeat(3, axis=2)
+        frames.append(("Overcast", _jpeg(np.where(rows < 0.4, flat, trees))))
+    return frames
+
+
+def load_fixtures():
+    frames = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*", "*.jpg"))):
+        with open(path, "rb") as f:
+            frames.append((os.path.basename(os.path.dirname(path)), f.read()))
+    return frames
+
+
+def run(frames):
+    answered = correct = missed = 0
+    timings = []
+    for label, data in frames:
+        start = time.perf_counter()
+        predicted = local_sky_classify(load_rgb(data, max_width=160))
+        timings.append(time.perf_counter() - start)
+
+        if predicted is None:
+            if label in LOCAL_LABELS: missed += 1
+            continue
+        answered += 1
+        correct += predicted == label
+
+    timings_ms = np.array(timings) * 1000
+    print(f"Frames:      {len(frames)}")
+    print(f"Answered:    {answered} locally, {len(frames) - answered} escalated to Gemini")
+    print(f"Precision:   {correct}/{answered} ({100 * correct / max(answered, 1):.1f}%)")
+    print(f"Missed:      {missed} Night/Foggy frames escalated unnecessarily")
+    print(f"Latency:     median {np.median(timings_ms):.2f} ms, p95 {np.percentile(timings_ms, 95):.2f} ms "
+          f"(decode + classify)")
+
+
+if __name__ == "__main__":
+    fixtures = load_fixtures()
+    if not fixtures:
+        print(f"No fixtures in {FIXTURE_DIR}, using synthetic frames "
+              f"(smoke test only; precision on these says nothing about real webcams).")
+        fixtures = synthetic_fixtures()
+    run(fixtures)
@@ -1,3 +1,5 @@
+import os
+
 # Database IDs
 DB_IDS = {
     "Lifts": "2c3e268796a880e6a4c9dd11d6f05008",
@@ -6,7 +8,9 @@ DB_IDS = {
     "Weather Forecast Elevations": "2c3e268796a880d3b6fdcd2733467a83",
     "Weather Forecasts": "2c3e268796a8801e994dcf661aaab6c3",
     "Weather Stations": "2c3e268796a880c3a15bc088669fbb2a",
-    "Ski Conditions": "2dae268796a8808d87d6c970ab4d49ba"
+    "Ski Conditions": "2dae268796a8808d87d6c970ab4d49ba",
+    # Summary rows written by jobs/verification.py (leave empty to only print them)
+    "Forecast Verification": ""
 }
 
 # Datasource IDs
@@ -17,7 +21,8 @@ DS_IDS = {
     "Weather Forecast Elevations": "",
     "Weather Forecasts": "",
     "Weather Stations": "",
-    "Ski Conditions": ""
+    "Ski Conditions": "",
+    "Forecast Verification": ""
 }
 
 # Page IDs
@@ -27,9 +32,16 @@ SEASON_PAGE_ID = "2b8e268796a88004b66bc101e8f04340"
 URLS = {
     "Lifts": "https://whistlerpeak.com/elevations/",
     "Snowfall History": "https://whistlerpeak.com/snow/history/",
+    "Lift Status": "https://www.whistlerblackcomb.com/the-mountain/mountain-conditions/terrain-and-lift-status.aspx",
     "Weather Forecast": {
         "1480m": "https://www.snow-forecast.com/resorts/Whistler-Blackcomb/6day/mid",
         "1800m": "https://whistlerpeak.com/forecast/",
         "2248m": "https://www.snow-forecast.com/resorts/Whistler-Blackcomb/6day/top"
     }
-}
\ No newline at end of file
+}
+
+# Local state (mirrors, caches, watermarks)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Keep a compressed copy of every fetched page in DATA_DIR/archive (replay with replay.py)
+ARCHIVE_PAGES = False
@@ -0,0 +1,207 @@
+import os
+import glob
+import uuid
+import threading
+from datetime import date, datetime, timezone
+
+import pandas as pd
+
+import config
+from core import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow missing: appends are skipped and queries return empty frames
+    pa = pq = None
+
+ANALYTICS_DIR = os.path.join(config.DATA_DIR, "analytics")
+PARTITION_COLS = ["season", "elevation"]
+# A partition is rewritten as a single file once appends have split it into this many
+COMPACT_AFTER_FILES = 32
+
+# Dataset -> columns (name, type), dedupe keys and the date column that decides the season.
+# Datasets without an "elevation" column land in elevation=all.
+DATASETS = {
+    "snow_history": {
+        "columns": [("date", "date"), ("snowfall_cm", "float"), ("season_cm", "float"), ("base_cm", "float")],
+        "keys": ["date"],
+        "date": "date",
+    },
+    "forecasts": {
+        "columns": [("elevation", "str"), ("source", "str"), ("report_time", "timestamp"),
+                    ("forecast_date", "date"), ("period", "str"), ("summary", "str"), ("precip_type", "str"),
+                    ("precip_amount", "float"), ("snow_cm", "float"), ("rain_mm", "float"), ("high_c", "float"),
+                    ("low_c", "float"), ("freezing_level_m", "float")],
+        "keys": ["elevation", "source", "report_time", "forecast_date", "period"],
+        "date": "forecast_date",
+    },
+    "conditions": {
+        "columns": [("station", "str"), ("observed_at", "timestamp"), ("temperature_c", "float"),
+                    ("condition", "str")],
+        "keys": ["station", "observed_at"],
+        "date": "observed_at",
+    },
+    "lifts": {
+        "columns": [("captured_on", "date"), ("lift", "str"), ("bottom_m", "float"), ("top_m", "float")],
+        "keys": ["captured_on", "lift"],
+        "date": "captured_on",
+    },
+}
+
+_locks = {name: threading.Lock() for name in DATASETS}
+_warned = False
+
+
+def season_of(day):
+    """Ski season label for a date: Jul-Dec start a season, Jan-Jun belong to the previous one ("2025-26")."""
+    start = day.year if day.month > 6 else day.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def _arrow_type(kind):
+    return {"date": pa.date32(), "float": pa.float64(), "str": pa.string(),
+            "timestamp": pa.timestamp("us", tz="UTC")}[kind]
+
+
+def _schema(dataset, with_partitions=True):
+    fields = [(name, _arrow_type(kind)) for name, kind in DATASETS[dataset]["columns"] if name != "elevation"]
+    fields.append(("ingested_at", pa.timestamp("us", tz="UTC")))
+    if with_partitions:
+        fields += [(c, pa.string()) for c in PARTITION_COLS]
+    return pa.schema(fields)
+
+
+def _coerce(df, dataset):
+    for name, kind in DATASETS[dataset]["columns"]:
+        if name not in df:
+            df[name] = None
+        if kind == "date":
+            df[name] = pd.to_datetime(df[name]).dt.date
+        elif kind == "timestamp":
+            df[name] = pd.to_datetime(df[name], utc=True)
+        elif kind == "float":
+            df[name] = pd.to_numeric(df[name], errors="coerce")
+        else:
+            df[name] = df[name].astype(object).where(df[name].notna(), None)
+    return df
+
+
+def _dataset_dir(dataset):
+    return os.path.join(ANALYTICS_DIR, dataset)
+
+
+def append(dataset, rows):
+    """
+    Appends cleaned job output (DataFrame or list of dicts) to a dataset, partitioned by season and
+    elevation. Best effort: failures are printed, never raised. Returns the number of rows written.
+    """
+    global _warned
+    if pa is None:
+        if not _warned:
+            print("⚠️ pyarrow is not installed, skipping the local analytics store")
+            _warned = True
+        return 0
+    try:
+        df = pd.DataFrame(rows).copy()
+        if df.empty: return 0
+        spec = DATASETS[dataset]
+        df = _coerce(df, dataset)
+        df = df.dropna(subset=[spec["date"]])
+        df["ingested_at"] = pd.Timestamp.now(tz="UTC")
+        df["season"] = [season_of(d) for d in pd.to_datetime(df[spec["date"]])]
+        df["elevation"] = df["elevation"].fillna("all") if "elevation" in df else "all"
+
+        table = pa.Table.from_pandas(df[_schema(dataset).names], schema=_schema(dataset), preserve_index=False)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        with _locks[dataset], metrics.timed("analytics.append"):
+            pq.write_to_dataset(table, _dataset_dir(dataset), partition_cols=PARTITION_COLS,
+                                basename_template=f"part-{stamp}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+                                existing_data_behavior="overwrite_or_ignore")
+            for season, elevation in set(zip(df["season"], df["elevation"])):
+                part = os.path.join(_dataset_dir(dataset), f"season={season}", f"elevation={elevation}")
+                if len(glob.glob(os.path.join(part, "*.parquet"))) > COMPACT_AFTER_FILES:
+                    _compact_partition(dataset, part)
+        return len(df)
+    except Exception as e:
+        print(f"⚠️ Analytics append to {dataset} failed: {e}")
+        return 0
+
+
+def _dedupe(df, dataset):
+    """Keeps the most recently ingested row per key."""
+    if df.empty: return df
+    keys = [k for k in DATASETS[dataset]["keys"] if k in df]
+    return df.sort_values("ingested_at").drop_duplicates(keys, keep="last").reset_index(drop=True)
+
+
+def _compact_partition(dataset, part):
+    files = sorted(glob.glob(os.path.join(part, "*.parquet")))
+    merged = pa.concat_tables([pq.read_table(f, memory_map=True) for f in files])
+    df = _dedupe(merged.to_pandas(), dataset)
+    schema = _schema(dataset, with_partitions=False)
+    target = os.path.join(part, f"part-compacted-{uuid.uuid4().hex[:8]}.parquet")
+    pq.write_table(pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False), target)
+    for f in files:
+        os.remove(f)
+
+
+def compact(dataset):
+    """Rewrites every partition of a dataset as one deduplicated file."""
+    with _locks[dataset]:
+        for part in glob.glob(os.path.join(_dataset_dir(dataset), "season=*", "elevation=*")):
+            _compact_partition(dataset, part)
+
+
+def read(dataset, columns=None, filters=None):
+    """
+    Deduplicated rows of a dataset as a DataFrame. filters use pyarrow's DNF form, e.g.
+    [("season", "=", "2025-26"), ("elevation", "=", "1480m")]; partition filters skip whole directories.
+    """
+    names = [n for n, _ in DATASETS[dataset]["columns"]] + ["ingested_at"] + PARTITION_COLS
+    root = _dataset_dir(dataset)
+    if pa is None or not glob.glob(os.path.join(root, "season=*")):
+        return pd.DataFrame(columns=columns or names)
+    if columns:
+        columns = list(dict.fromkeys(columns + DATASETS[dataset]["keys"] + ["ingested_at"]))
+    with metrics.timed("analytics.read"):
+        table = pq.read_table(root, columns=columns, filters=filters, partitioning="hive", memory_map=True,
+                              schema=_schema(dataset))
+    df = table.to_pandas()
+    return _dedupe(df, dataset)
+
+
+# --- QUERIES ---
+def season_totals():
+    """Per season: days reported, total snowfall, season-to-date total and peak base (cm)."""
+    df = read("snow_history", columns=["date", "snowfall_cm", "season_cm", "base_cm", "season"])
+    if df.empty:
+        return pd.DataFrame(columns=["season", "days", "snowfall_cm", "season_cm", "peak_base_cm"])
+    return (df.groupby("season")
+            .agg(days=("date", "count"), snowfall_cm=("snowfall_cm", "sum"), season_cm=("season_cm", "max"),
+                 peak_base_cm=("base_cm", "max"))
+            .reset_index())
+
+
+def base_depth_curve(season):
+    """Daily base depth and season-to-date snowfall for one season, in date order."""
+    df = read("snow_history", columns=["date", "base_cm", "season_cm"], filters=[("season", "=", season)])
+    return df.sort_values("date")[["date", "base_cm", "season_cm"]].reset_index(drop=True)
+
+
+def forecast_snapshots(start, end, elevation=None, source=None):
+    """
+    Every stored forecast for forecast dates in [start, end] (dates), one row per report and period,
+    ordered by forecast date then report time (how the forecast for a day evolved).
+    """
+    start, end = (d if isinstance(d, date) else date.fromisoformat(d) for d in (start, end))
+    seasons = sorted({season_of(start), season_of(end)})
+    filters = [("forecast_date", ">=", start), ("forecast_date", "<=", end)]
+    if len(seasons) == 1:
+        filters.append(("season", "=", seasons[0]))
+    if elevation:
+        filters.append(("elevation", "=", elevation))
+    if source:
+        filters.append(("source", "=", source))
+    df = read("forecasts", filters=filters)
+    return df.sort_values(["forecast_date", "report_time", "period"]).reset_index(drop=True)
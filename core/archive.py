@@ -0,0 +1,121 @@
+import os
+import zlib
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+import config
+
+try:
+    import zstandard
+except ImportError:  # zstandard missing: objects are written with zlib (both stay readable once it is installed)
+    zstandard = None
+
+ARCHIVE_DIR = os.path.join(config.DATA_DIR, "archive")
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 9
+
+
+def _utc(dt):
+    return dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class PageArchive:
+    """
+    Content-addressed store of fetched pages: objects/<sha[:2]>/<sha256>.zst, deduplicated by hash,
+    plus a SQLite index of (url, fetched_at, sha256). Unchanged pages cost one index row per fetch.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    url TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    size INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS snapshots_url_time ON snapshots (url, fetched_at);
+            """)
+        return self._conn
+
+    def _object_path(self, sha, ext):
+        return os.path.join(self.directory, "objects", sha[:2], sha + ext)
+
+    def put(self, url, html, fetched_at=None):
+        """Archives one fetched page and returns its content hash."""
+        data = html.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        if not any(os.path.exists(self._object_path(sha, ext)) for ext in (".zst", ".zz")):
+            if zstandard is not None:
+                path, blob = self._object_path(sha, ".zst"), zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+            else:
+                path, blob = self._object_path(sha, ".zz"), zlib.compress(data, ZLIB_LEVEL)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+
+        fetched_at = _utc(fetched_at or datetime.now(timezone.utc))
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?)", (url, fetched_at.isoformat(), sha, len(data)))
+            db.commit()
+        return sha
+
+    def read(self, sha):
+        path = self._object_path(sha, ".zst")
+        if os.path.exists(path):
+            if zstandard is None:
+                raise RuntimeError(f"Archived page {sha} is zstd-compressed; install zstandard to read it")
+            with open(path, "rb") as f:
+                return zstandard.ZstdDecompressor().decompress(f.read()).decode("utf-8")
+        with open(self._object_path(sha, ".zz"), "rb") as f:
+            return zlib.decompress(f.read()).decode("utf-8")
+
+    def snapshots(self, url, since=None, until=None):
+        """[(fetched_at, sha256)] for url, oldest first, optionally within [since, until]."""
+        query, params = "SELECT fetched_at, sha256 FROM snapshots WHERE url = ?", [url]
+        if since:
+            query, params = query + " AND fetched_at >= ?", params + [_utc(since).isoformat()]
+        if until:
+            query, params = query + " AND fetched_at <= ?", params + [_utc(until).isoformat()]
+        with self._lock:
+            rows = self._db().execute(query + " ORDER BY fetched_at", params).fetchall()
+        return [(datetime.fromisoformat(t), sha) for t, sha in rows]
+
+    def replay(self, url, since=None, until=None, distinct=True):
+        """
+        Yields (fetched_at, html) for url, oldest first. distinct=True skips fetches whose content
+        matched the previous one, so each page version is parsed once.
+        """
+        previous = None
+        for fetched_at, sha in self.snapshots(url, since, until):
+            if distinct and sha == previous:
+                continue
+            previous = sha
+            yield fetched_at, self.read(sha)
+
+    def latest(self, url, at=None):
+        """The page as it was last fetched at or before `at` (default: now), or None."""
+        found = self.snapshots(url, until=at or datetime.now(timezone.utc))
+        return self.read(found[-1][1]) if found else None
+
+    def urls(self):
+        """[(url, fetches, distinct versions, first fetched_at, last fetched_at)]"""
+        with self._lock:
+            return self._db().execute(
+                "SELECT url, COUNT(*), COUNT(DISTINCT sha256), MIN(fetched_at), MAX(fetched_at) "
+                "FROM snapshots GROUP BY url ORDER BY url").fetchall()
+
+
+archive = PageArchive()
@@ -0,0 +1,28 @@
+import json
+import time
+import hashlib
+
+from core import state
+
+STATE_PREFIX = "fingerprint."
+# Even unchanged sources get a full check (Notion read + upsert) once the last one is this old,
+# which repairs rows that were edited or deleted in Notion by hand. Kept well clear of the daily
+# lifts cadence: at exactly 24h, scheduler jitter decided whether a run was skipped or checked.
+# With 36h the daily job skips one day and checks the next.
+MAX_AGE_SECONDS = 36 * 60 * 60
+
+
+def of(data):
+    """Stable hash of normalized extracted data (anything JSON-serializable; other values via str)."""
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def unchanged(name, fp):
+    """True when fp matches what the job last uploaded successfully, within MAX_AGE_SECONDS."""
+    saved = state.get(STATE_PREFIX + name)
+    return bool(saved) and saved["hash"] == fp and time.time() - saved["at"] < MAX_AGE_SECONDS
+
+
+def remember(name, fp):
+    """Call only once everything derived from fp has reached Notion."""
+    state.put(STATE_PREFIX + name, {"hash": fp, "at": time.time()})
@@ -0,0 +1,144 @@
+import io
+import os
+import json
+import time
+import threading
+import numpy as np
+
+import config
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow missing: hashing is disabled and every frame goes to the model
+    Image = None
+
+SKY_CACHE_PATH = os.path.join(config.DATA_DIR, "sky_cache.json")
+SKY_CACHE_MAX_ENTRIES = 500
+SKY_CACHE_TTL_SECONDS = 6 * 60 * 60
+# Max differing bits (out of 64) for two frames to count as the same scene
+HAMMING_THRESHOLD = 6
+
+_HASH_SIZE = 8
+_DCT_SIZE = 32
+
+
+def _dct_matrix(n):
+    k = np.arange(n)
+    m = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n)) * np.sqrt(2 / n)
+    m[0] /= np.sqrt(2)
+    return m
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+
+def load_rgb(image_bytes, max_width=None):
+    """Decodes an image to an (H, W, 3) uint8 array, optionally downscaled. None if undecodable."""
+    if Image is None:
+        return None
+    try:
+        img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    except Exception:
+        return None
+    if max_width and img.width > max_width:
+        img = img.resize((max_width, max(1, img.height * max_width // img.width)), Image.BILINEAR)
+    return np.asarray(img)
+
+
+def phash(image_bytes):
+    """64-bit DCT perceptual hash of an image, or None if it can't be decoded."""
+    if Image is None:
+        return None
+    try:
+        img = Image.open(io.BytesIO(image_bytes)).convert("L").resize((_DCT_SIZE, _DCT_SIZE), Image.LANCZOS)
+    except Exception:
+        return None
+    pixels = np.asarray(img, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:_HASH_SIZE, :_HASH_SIZE].ravel()
+    bits = low > np.median(low[1:])
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def time_bucket(dt):
+    """Coarse time-of-day bucket so a dusk frame never reuses a midday label."""
+    h = dt.hour
+    if h < 6 or h >= 20: return "night"
+    if h < 9: return "dawn"
+    if h < 16: return "day"
+    return "dusk"
+
+
+class SkyCache:
+    """
+    Persistent cache of sky classifications keyed by (perceptual hash, time bucket).
+    A frame within HAMMING_THRESHOLD bits of a fresh entry in the same bucket reuses its label.
+    Entries expire after ttl_seconds and the least recently used are evicted past max_entries.
+    """
+
+    def __init__(self, path=SKY_CACHE_PATH, max_entries=SKY_CACHE_MAX_ENTRIES, ttl_seconds=SKY_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = []
+        return self._entries
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp, self.path)
+
+    def get(self, image_hash, bucket):
+        """Returns the cached label for a near-duplicate frame, or None."""
+        if image_hash is None:
+            return None
+        now = time.time()
+        with self._lock:
+            entries = self._load()
+            entries[:] = [e for e in entries if now - e["created_at"] <= self.ttl_seconds]
+            best = None
+            for e in entries:
+                if e["bucket"] != bucket: continue
+                dist = hamming(e["hash"], image_hash)
+                if dist <= HAMMING_THRESHOLD and (best is None or dist < best[0]):
+                    best = (dist, e)
+            if best is None:
+                self.misses += 1
+                return None
+            best[1]["last_used"] = now
+            self.hits += 1
+            return best[1]["label"]
+
+    def put(self, image_hash, bucket, label):
+        if image_hash is None or not label:
+            return
+        now = time.time()
+        with self._lock:
+            entries = self._load()
+            entries.append({"hash": image_hash, "bucket": bucket, "label": label, "created_at": now, "last_used": now})
+            if len(entries) > self.max_entries:
+                entries.sort(key=lambda e: e["last_used"])
+                del entries[:len(entries) - self.max_entries]
+            self._save()
+
+    def summary(self):
+        return f"🖼️ Sky cache: {self.hits} reused / {self.misses} sent to Gemini"
+
+
+sky_cache = SkyCache()
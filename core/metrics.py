@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import bisect
+import threading
+import contextvars
+from functools import wraps
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import config
+
+PROMETHEUS_PATH = os.path.join(config.DATA_DIR, "metrics.prom")
+CYCLE_SUMMARY_PATH = os.path.join(config.DATA_DIR, "cycle_metrics.jsonl")
+METRIC_NAME = "whistler_stage_duration_seconds"
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+LABEL_NAMES = ("job", "elevation", "station", "url")
+
+_labels = contextvars.ContextVar("metric_labels", default={})
+_lock = threading.Lock()
+# (stage, labels tuple) -> {"count", "sum", "max", "buckets": [...]} since process start
+_histograms = {}
+# Raw observations since the last take_window(): [(stage, labels dict, seconds, ok)]
+_window = []
+
+
+@contextmanager
+def labels(**kwargs):
+    """Adds labels (job, elevation, station, url) to every measurement made inside the block."""
+    token = _labels.set({**_labels.get(), **{k: str(v) for k, v in kwargs.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def submit(executor, fn, *args):
+    """executor.submit that carries the caller's labels into the worker thread."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def observe(stage, seconds, ok=True, **extra):
+    current = {**_labels.get(), **{k: str(v) for k, v in extra.items() if v is not None}}
+    key = (stage, tuple(current.get(n, "") for n in LABEL_NAMES))
+    with _lock:
+        h = _histograms.setdefault(key, {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(BUCKETS)})
+        h["count"] += 1
+        h["sum"] += seconds
+        h["max"] = max(h["max"], seconds)
+        idx = bisect.bisect_left(BUCKETS, seconds)
+        if idx < len(BUCKETS):
+            h["buckets"][idx] += 1
+        _window.append((stage, current, seconds, ok))
+
+
+@contextmanager
+def timed(stage, **extra):
+    """Times the block as `stage`; failures are recorded too (ok=False) and re-raised."""
+    start = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start, ok, **extra)
+
+
+def instrument(stage):
+    """Decorator form of timed()."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def export_prometheus(path=None):
+    """Writes every histogram in Prometheus text format (for node_exporter's textfile collector)."""
+    path = path or PROMETHEUS_PATH
+    lines = [f"# HELP {METRIC_NAME} Duration of pipeline stages.", f"# TYPE {METRIC_NAME} histogram"]
+    with _lock:
+        items = sorted(_histograms.items())
+        for (stage, label_values), h in items:
+            pairs = [("stage", stage)] + [(n, v) for n, v in zip(LABEL_NAMES, label_values) if v]
+            base = ",".join(f'{n}="{_escape(v)}"' for n, v in pairs)
+            cumulative = 0
+            for le, n in zip(BUCKETS, h["buckets"]):
+                cumulative += n
+                lines.append(f'{METRIC_NAME}_bucket{{{base},le="{le}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_bucket{{{base},le="+Inf"}} {h["count"]}')
+            lines.append(f"{METRIC_NAME}_sum{{{base}}} {h['sum']:.6f}")
+            lines.append(f"{METRIC_NAME}_count{{{base}}} {h['count']}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
+
+
+def take_window(job=None):
+    """Removes and returns the raw observations since the last call (only `job`'s, if given)."""
+    global _window
+    with _lock:
+        taken = [o for o in _window if job is None or o[1].get("job") == job]
+        _window = [o for o in _window if not (job is None or o[1].get("job") == job)]
+    return taken
+
+
+def summarize(observations):
+    """Per-stage count/total/max/failures, slowest stages first."""
+    stages = {}
+    for stage, _, seconds, ok in observations:
+        s = stages.setdefault(stage, {"count": 0, "total_s": 0.0, "max_s": 0.0, "failures": 0})
+        s["count"] += 1
+        s["total_s"] += seconds
+        s["max_s"] = max(s["max_s"], seconds)
+        s["failures"] += not ok
+    return dict(sorted(((k, {**v, "total_s": round(v["total_s"], 3), "max_s": round(v["max_s"], 3)})
+                        for k, v in stages.items()), key=lambda kv: -kv[1]["total_s"]))
+
+
+def write_cycle_summary(cycle, status, seconds, job=None, path=None):
+    """Appends one JSON line describing a finished cycle/job run and refreshes the Prometheus file."""
+    path = path or CYCLE_SUMMARY_PATH
+    record = {
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "cycle": cycle,
+        "status": status,
+        "seconds": round(seconds, 3),
+        "stages": summarize(take_window(job)),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    export_prometheus()
+    return record
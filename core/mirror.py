@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import config
+from core import notion, metrics
+
+MIRROR_PATH = os.path.join(config.DATA_DIR, "notion_mirror.sqlite3")
+# Several jobs sync the same database each cycle; only hit Notion once per interval
+MIN_SYNC_INTERVAL_SECONDS = 120
+
+
+def plain_value(prop):
+    """Flattens one Notion property object (as returned, or as sent without "type") to a plain value."""
+    kind = prop.get("type") or next(iter(prop), None)
+    data = prop.get(kind)
+    if kind in ("title", "rich_text"):
+        return "".join(t.get("plain_text") or t.get("text", {}).get("content", "") for t in data or [])
+    if kind == "date":
+        return data.get("start") if data else None
+    if kind in ("select", "status"):
+        return data.get("name") if data else None
+    if kind == "multi_select":
+        return [o.get("name") for o in data or []]
+    if kind == "relation":
+        return [r.get("id") for r in data or []]
+    if kind == "files":
+        return [f.get("external", f.get("file", {})).get("url") for f in data or []]
+    if kind == "formula":
+        return data.get(data.get("type")) if data else None
+    return data
+
+
+def _forecast_key(values):
+    # Only the live ("Latest Report?") row for each elevation/date/period blocks an insert
+    if not values.get("Latest Report?"):
+        return None
+    elevation = (values.get("Elevation + Update Time") or "").split(" - ")[0]
+    return elevation, values.get("Forecast Date"), values.get("Time of Day")
+
+
+def _title_key(values):
+    return (values["__title__"].strip().lower(),) if values["__title__"] else None
+
+
+# Secondary indexes per database: {db name: {key name: values -> tuple or None}}
+KEY_BUILDERS = {
+    "Lifts": {"name": _title_key},
+    "Snowfall History": {"date": lambda v: (v.get("Date"),) if v.get("Date") else None},
+    "Weather Forecasts": {"latest_forecast": _forecast_key},
+    "Weather Forecast Elevations": {"name": _title_key},
+    "Weather Stations": {"name": _title_key},
+    "Forecast Verification": {"name": _title_key},
+}
+
+
+class NotionMirror:
+    """
+    Local SQLite copy of the Notion databases in config.DB_IDS, kept in sync incrementally
+    through last_edited_time. Existence checks become indexed lookups instead of full reads.
+    Pages deleted in Notion disappear from query results, so only sync(full=True) drops them.
+    """
+
+    def __init__(self, path=MIRROR_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.RLock()
+        self._db_locks = {}
+        self._last_sync = {}
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    page_id TEXT PRIMARY KEY,
+                    db_name TEXT NOT NULL,
+                    title TEXT,
+                    last_edited_time TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS pages_db_title ON pages (db_name, title);
+                CREATE TABLE IF NOT EXISTS page_keys (
+                    db_name TEXT NOT NULL,
+                    key_name TEXT NOT NULL,
+                    key_value TEXT NOT NULL,
+                    page_id TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS page_keys_lookup ON page_keys (db_name, key_name, key_value);
+                CREATE INDEX IF NOT EXISTS page_keys_page ON page_keys (page_id);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    db_name TEXT PRIMARY KEY,
+                    last_edited_time TEXT
+                );
+            """)
+        return self._conn
+
+    @staticmethod
+    def _values(page):
+        values = {"id": page["id"], "__title__": ""}
+        for name, prop in page.get("properties", {}).items():
+            values[name] = plain_value(prop)
+            if prop.get("type") == "title":
+                values["__title__"] = values[name]
+        return values
+
+    def upsert_page(self, db_name, page):
+        """Stores one Notion page object (e.g. the response of a create) and refreshes its keys."""
+        values = self._values(page)
+        with self._lock:
+            db = self._db()
+            if page.get("archived") or page.get("in_trash"):
+                db.execute("DELETE FROM pages WHERE page_id = ?", (page["id"],))
+                db.execute("DELETE FROM page_keys WHERE page_id = ?", (page["id"],))
+                return
+            db.execute(
+                "INSERT OR REPLACE INTO pages (page_id, db_name, title, last_edited_time, data) VALUES (?, ?, ?, ?, ?)",
+                (page["id"], db_name, values["__title__"], page.get("last_edited_time"), json.dumps(values)))
+            db.execute("DELETE FROM page_keys WHERE page_id = ?", (page["id"],))
+            for key_name, build in KEY_BUILDERS.get(db_name, {}).items():
+                key = build(values)
+                if key is not None:
+                    db.execute("INSERT INTO page_keys VALUES (?, ?, ?, ?)",
+                               (db_name, key_name, json.dumps(list(key)), page["id"]))
+
+    def sync(self, db_name, full=False):
+        """Pulls pages edited since the last sync. Returns the number of pages refreshed."""
+        db_lock = self._db_locks.setdefault(db_name, threading.Lock())
+        with db_lock:
+            if not full and time.monotonic() - self._last_sync.get(db_name, -1e9) < MIN_SYNC_INTERVAL_SECONDS:
+                return 0
+
+            database_id = config.DB_IDS[db_name]
+            with self._lock:
+                row = self._db().execute(
+                    "SELECT last_edited_time FROM sync_state WHERE db_name = ?", (db_name,)).fetchone()
+            watermark = None if full or not row else row[0]
+
+            query_filter = None
+            if watermark:
+                # last_edited_time is minute-granular: re-read the boundary minute
+                since = datetime.fromisoformat(watermark.replace("Z", "+00:00")) - timedelta(minutes=1)
+                query_filter = {"timestamp": "last_edited_time",
+                                "last_edited_time": {"on_or_after": since.isoformat()}}
+            sorts = [{"timestamp": "last_edited_time", "direction": "ascending"}]
+
+            seen = set()
+            newest = watermark
+            with metrics.timed("notion.sync"):
+                pages = list(notion.query_datasource(database_id, filter=query_filter, sorts=sorts))
+            for page in pages:
+                self.upsert_page(db_name, page)
+                seen.add(page["id"])
+                edited = page.get("last_edited_time")
+                if edited and (newest is None or edited > newest):
+                    newest = edited
+
+            with self._lock:
+                db = self._db()
+                if full:
+                    stale = [r[0] for r in db.execute("SELECT page_id FROM pages WHERE db_name = ?", (db_name,))
+                             if r[0] not in seen]
+                    for page_id in stale:
+                        db.execute("DELETE FROM pages WHERE page_id = ?", (page_id,))
+                        db.execute("DELETE FROM page_keys WHERE page_id = ?", (page_id,))
+                db.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (db_name, newest))
+                db.commit()
+
+            self._last_sync[db_name] = time.monotonic()
+            print(f"   🪞 Mirror synced {db_name}: {len(seen)} page(s) refreshed")
+            return len(seen)
+
+    def record_writes(self, db_name, results):
+        """Write-through for WritePipeline results so new pages are visible before the next sync."""
+        for r in results:
+            if r["ok"] and r.get("page"):
+                self.upsert_page(db_name, r["page"])
+        self.commit()
+
+    def has(self, db_name, key_name, key):
+        with self._lock:
+            return self._db().execute(
+                "SELECT 1 FROM page_keys WHERE db_name = ? AND key_name = ? AND key_value = ? LIMIT 1",
+                (db_name, key_name, json.dumps(list(key)))).fetchone() is not None
+
+    def lookup(self, db_name, key_name, key):
+        """Returns the flattened property dicts of every page indexed under key."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT p.data FROM page_keys k JOIN pages p ON p.page_id = k.page_id "
+                "WHERE k.db_name = ? AND k.key_name = ? AND k.key_value = ?",
+                (db_name, key_name, json.dumps(list(key)))).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def count(self, db_name):
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM pages WHERE db_name = ?", (db_name,)).fetchone()[0]
+
+    def rows(self, db_name):
+        with self._lock:
+            rows = self._db().execute("SELECT data FROM pages WHERE db_name = ?", (db_name,)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def commit(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+
+
+mirror = NotionMirror()
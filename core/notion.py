@@ -0,0 +1,372 @@
+import json
+import time
+import threading
+import requests
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from internal_tools import NotionClient
+import config
+from cred import NOTION_TOKEN
+from core import metrics, resilience
+from core.outbox import outbox
+
+NOTION_API = "https://api.notion.com/v1"
+# Data-source API version: rows live in a database's data sources (see data_source_id)
+NOTION_VERSION = "2025-09-03"
+
+# Property builders for every job's payloads, from the shared client library
+Props = NotionClient.Props
+
+# Notion allows ~3 requests/second per integration
+NOTION_REQUESTS_PER_SECOND = 3
+NOTION_WRITE_WORKERS = 3
+NOTION_MAX_RETRIES = 5
+NOTION_TIMEOUT_SECONDS = 30
+# Per-request deadline, retries and rate-limit waits included
+NOTION_REQUEST_BUDGET_SECONDS = 3 * 60
+# Scheduled replays leave fresh entries alone; their own pipeline is about to send them
+OUTBOX_REPLAY_MIN_AGE_SECONDS = 120
+
+_session = requests.Session()
+
+
+class TokenBucket:
+    """Thread-safe token bucket. pause() blocks every caller, e.g. for a 429 Retry-After."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes a token, waiting for one (or for a pause to end) as needed. Raises
+        resilience.DeadlineExceeded instead of waiting past the caller's deadline.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait_s = (1 - self._tokens) / self.rate
+                else:
+                    wait_s = self._paused_until - now
+            left = resilience.remaining()
+            if left is not None and wait_s >= left:
+                raise resilience.DeadlineExceeded(f"no budget left for a {wait_s:.1f}s rate-limit wait")
+            time.sleep(wait_s)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+            self._updated = self._paused_until
+
+
+rate_limiter = TokenBucket(NOTION_REQUESTS_PER_SECOND)
+
+
+def _json_default(value):
+    # pandas/numpy scalars (e.g. int64 from DataFrame rows) expose .item()
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def request(method, path, payload=None):
+    """
+    Calls the Notion REST API through the shared rate limiter, retrying 429s, 5xx responses and
+    network errors with jittered backoff. Fails fast with resilience.CircuitOpen while Notion's
+    breaker is open and with resilience.DeadlineExceeded once the request's budget is spent.
+    """
+    headers = {
+        "Authorization": f"Bearer {NOTION_TOKEN}",
+        "Notion-Version": NOTION_VERSION,
+        "Content-Type": "application/json",
+    }
+    body = json.dumps(payload, default=_json_default) if payload is not None else None
+    host_breaker = resilience.breaker(resilience.host_of(NOTION_API))
+    with resilience.deadline(NOTION_REQUEST_BUDGET_SECONDS):
+        for attempt in range(NOTION_MAX_RETRIES + 1):
+            # Fail fast without spending a rate-limit token while Notion is cooling down
+            if host_breaker.cooling_down():
+                raise resilience.CircuitOpen(f"Notion is cooling down for {host_breaker.retry_in():.0f}s")
+            with metrics.timed("notion.ratelimit_wait"):
+                rate_limiter.acquire()
+            request_timeout = resilience.budget(NOTION_TIMEOUT_SECONDS)
+            resp = None
+            with host_breaker.attempt() as call:
+                try:
+                    with metrics.timed(f"notion.{method.lower()}"):
+                        resp = _session.request(method, f"{NOTION_API}{path}", data=body, headers=headers,
+                                                timeout=request_timeout)
+                except requests.RequestException:
+                    call.failure()
+                    if attempt >= NOTION_MAX_RETRIES: raise
+                else:
+                    # A 429 leaves the call unresolved, which releases a half-open trial
+                    if resp.status_code >= 500: call.failure()
+                    elif resp.status_code != 429: call.success()
+            if resp is None:
+                resilience.sleep_backoff(attempt)
+                continue
+            if resp.status_code == 429:
+                retry_after = float(resp.headers.get("Retry-After", 1))
+                print(f"   🐢 Notion rate limited, pausing writes for {retry_after:.0f}s")
+                # Every caller waits out the pause; this one gives up if it would overrun its deadline
+                rate_limiter.pause(retry_after)
+                continue
+            if resp.status_code >= 500 and attempt < NOTION_MAX_RETRIES:
+                resilience.sleep_backoff(attempt)
+                continue
+            resp.raise_for_status()
+            return resp.json()
+    raise RuntimeError(f"Notion {method} {path} still rate limited after {NOTION_MAX_RETRIES} retries")
+
+
+_data_sources = {}
+_data_sources_lock = threading.Lock()
+
+
+def data_source_id(database_id):
+    """
+    The data source holding a database's rows: config.DS_IDS when set for that database, otherwise
+    looked up once from the database. A database with several data sources needs its DS_IDS entry.
+    """
+    with _data_sources_lock:
+        if database_id in _data_sources:
+            return _data_sources[database_id]
+    name = next((n for n, db_id in config.DB_IDS.items() if db_id == database_id), None)
+    ds_id = config.DS_IDS.get(name) if name else None
+    if not ds_id:
+        sources = request("GET", f"/databases/{database_id}").get("data_sources", [])
+        if not sources:
+            raise RuntimeError(f"Notion database {name or database_id} has no data source")
+        if len(sources) > 1:
+            print(f"   ⚠️ {name or database_id} has {len(sources)} data sources; using '{sources[0].get('name')}'. "
+                  f"Set config.DS_IDS to pick one.")
+        ds_id = sources[0]["id"]
+    with _data_sources_lock:
+        _data_sources[database_id] = ds_id
+    return ds_id
+
+
+def missing_properties(database_id, required):
+    """
+    The entries of required ({name: Notion property type}) that the database's data source lacks
+    or holds with another type, as ["Name (type)"]. Empty when the schema fits.
+    """
+    properties = request("GET", f"/data_sources/{data_source_id(database_id)}").get("properties", {})
+    return [f"{name} ({kind})" for name, kind in required.items() if properties.get(name, {}).get("type") != kind]
+
+
+def create_page(database_id, properties):
+    parent = {"type": "data_source_id", "data_source_id": data_source_id(database_id)}
+    return request("POST", "/pages", {"parent": parent, "properties": properties})
+
+
+def update_page(page_id, properties):
+    return request("PATCH", f"/pages/{page_id}", {"properties": properties})
+
+
+def query_datasource(database_id, filter=None, sorts=None):
+    """Yields every page of the database's data source matching the query, following pagination."""
+    payload = {"page_size": 100}
+    if filter: payload["filter"] = filter
+    if sorts: payload["sorts"] = sorts
+    path = f"/data_sources/{data_source_id(database_id)}/query"
+    while True:
+        data = request("POST", path, payload)
+        yield from data.get("results", [])
+        if not data.get("has_more"):
+            return
+        payload["start_cursor"] = data["next_cursor"]
+
+
+_write_executor = ThreadPoolExecutor(max_workers=NOTION_WRITE_WORKERS, thread_name_prefix="notion-write")
+
+
+class OutboxBusy(Exception):
+    """The outbox entry is being sent by another pipeline or replay."""
+
+
+def _retryable(error):
+    # Validation / permission errors will fail the same way next time; everything else is transient
+    response = getattr(error, "response", None)
+    if response is None:
+        return True
+    return response.status_code in (409, 429) or response.status_code >= 500
+
+
+def _title_text(properties):
+    """(property name, plain text) of the title property in a write payload, or (None, None)."""
+    for name, prop in properties.items():
+        if isinstance(prop, dict) and "title" in prop:
+            return name, "".join(t.get("plain_text") or t.get("text", {}).get("content", "") for t in prop["title"])
+    return None, None
+
+
+def _find_created(entry):
+    """
+    A create whose earlier attempt got no answer may still have reached Notion. Look for a page
+    with the same title created since that attempt before sending it again.
+    """
+    name, title = _title_text(entry["properties"])
+    if name is None:
+        return None
+    # Notion truncates created_time to the minute
+    since = datetime.fromisoformat(entry["first_attempt_at"]) - timedelta(minutes=1)
+    query = {"and": [{"property": name, "title": {"equals": title}},
+                     {"timestamp": "created_time", "created_time": {"on_or_after": since.isoformat()}}]}
+    for page in query_datasource(entry["target"], filter=query):
+        created = datetime.fromisoformat(page["created_time"].replace("Z", "+00:00"))
+        _, page_title = _title_text(page.get("properties", {}))
+        if created >= since and page_title == title:
+            return page
+    return None
+
+
+def _send(entry_id):
+    """Sends one outbox entry and marks it done. Returns the page (None if another run already sent it)."""
+    entry = outbox.claim(entry_id)
+    if entry is None:
+        current = outbox.get(entry_id)
+        if current and current["status"] == "done":
+            return None
+        raise OutboxBusy(f"outbox entry {entry_id} is {current['status'] if current else 'missing'}")
+
+    try:
+        page = None
+        if entry["op"] == "create" and entry["attempts"] > 1:
+            page = _find_created(entry)
+        if page is None and entry["op"] == "create":
+            page = create_page(entry["target"], entry["properties"])
+        elif page is None:
+            page = update_page(entry["target"], entry["properties"])
+    except (resilience.CircuitOpen, resilience.DeadlineExceeded) as e:
+        # Skipped rather than rejected: never counts towards parking the entry
+        outbox.release(entry_id, e, limit_attempts=False)
+        raise
+    except Exception as e:
+        outbox.release(entry_id, e, retryable=_retryable(e))
+        raise
+    outbox.done(entry_id, page.get("id"))
+    return page
+
+
+def _enqueue(op, target, properties, label, key):
+    # Serialized the same way request() will send it, so a replay sends exactly this payload
+    return outbox.enqueue(op, target, properties, label=label, key=key,
+                          serialize=lambda p: json.dumps(p, default=_json_default))
+
+
+class WritePipeline:
+    """
+    Queues new rows for one database and sends them concurrently within the rate limit.
+    Every row is recorded in the outbox before it is sent, so rows that fail on a transient
+    error (or are cut off by a crash) are replayed later by replay_outbox().
+    Rows start uploading as soon as they are added; flush() waits and reports each row.
+    """
+
+    def __init__(self, database_id):
+        self.database_id = database_id
+        self._futures = []
+
+    def _submit(self, entry_id, label):
+        future = metrics.submit(_write_executor, _send, entry_id)
+        self._futures.append((label, entry_id, future))
+
+    def add(self, properties, label=None, key=None):
+        """
+        key is the row's idempotency key (e.g. its date); the same key is never queued twice.
+        Without one, the key is derived from the payload.
+        """
+        self._submit(_enqueue("create", self.database_id, properties, label, key), label)
+
+    def update(self, page_id, properties, label=None, key=None):
+        """Queues an in-place property update of an existing page."""
+        self._submit(_enqueue("update", page_id, properties, label, key), label)
+
+    def flush(self):
+        """
+        Returns [{"label", "ok", "page_id", "page", "error", "queued"}] in the order rows were added.
+        queued is True for failed rows that stay in the outbox for a later replay.
+        """
+        results = []
+        for label, entry_id, future in self._futures:
+            try:
+                page = future.result()
+                page_id = page.get("id") if page else outbox.get(entry_id)["page_id"]
+                results.append({"label": label, "ok": True, "page_id": page_id, "page": page,
+                                "error": None, "queued": False})
+            except Exception as e:
+                entry = outbox.get(entry_id)
+                queued = entry is not None and entry["status"] in ("pending", "sending")
+                results.append({"label": label, "ok": False, "page_id": None, "page": None,
+                                "error": e, "queued": queued})
+        self._futures = []
+        return results
+
+
+_outbox_recovered = False
+
+
+def replay_outbox(startup=False):
+    """
+    Sends every write still pending in the outbox, oldest first, through the shared rate limiter.
+    startup=True also retries writes a crashed run left in flight; the first call in a process
+    does that in any case, so a failed startup replay is caught up by the next scheduled one.
+    Returns the number sent.
+    """
+    global _outbox_recovered
+    # core.mirror imports this module
+    from core.mirror import mirror
+
+    if startup or not _outbox_recovered:
+        outbox.recover()
+        _outbox_recovered = True
+    entries = outbox.pending(min_age_seconds=0 if startup else OUTBOX_REPLAY_MIN_AGE_SECONDS)
+    outbox.prune()
+    if not entries:
+        return 0
+
+    print(f"--- 📮 Replaying {len(entries)} pending Notion write(s) ---")
+    db_names = {db_id.replace("-", ""): name for name, db_id in config.DB_IDS.items() if db_id}
+    futures = [(e, metrics.submit(_write_executor, _send, e["id"])) for e in entries]
+    sent = 0
+    for entry, future in futures:
+        try:
+            page = future.result()
+        except Exception as e:
+            print(f"   ⏸️ Still pending {entry['label']}: {e}")
+            continue
+        sent += 1
+        # Write-through so the next sync-free job run sees the page
+        db_name = db_names.get(((page or {}).get("parent") or {}).get("database_id", "").replace("-", ""))
+        if db_name:
+            mirror.upsert_page(db_name, page)
+    mirror.commit()
+    print(f"   📮 Replayed {sent}/{len(entries)} write(s); outbox: {outbox.counts()}")
+    return sent
+
+
+def report(results):
+    """Prints the outcome of a flushed pipeline and returns the number of rows written."""
+    ok = 0
+    for r in results:
+        if r["ok"]:
+            ok += 1
+            print(f"✅ Uploaded {r['label']}")
+        elif r.get("queued"):
+            print(f"⏸️ Upload deferred {r['label']} (kept in the outbox): {r['error']}")
+        else:
+            print(f"❌ Upload failed {r['label']}: {r['error']}")
+    return ok
@@ -0,0 +1,156 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+import config
+
+OUTBOX_PATH = os.path.join(config.DATA_DIR, "outbox.sqlite3")
+# Sent entries are kept this long for inspection, then pruned
+DONE_RETENTION_DAYS = 7
+# Entries rejected this many times (or with a non-retryable error) are parked as "failed"
+MAX_ATTEMPTS = 8
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def default_key(op, target, properties):
+    """Content-derived idempotency key, used when the caller has no natural one."""
+    blob = json.dumps([op, target, properties], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+class Outbox:
+    """
+    Write-ahead log of Notion writes. Every create/update is stored (and committed) before it is
+    sent and marked done once Notion acknowledged it, so a crash or outage never loses or
+    silently repeats a row. Statuses: pending -> sending -> done, or failed after MAX_ATTEMPTS.
+    """
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL,
+                    op TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    properties TEXT NOT NULL,
+                    label TEXT,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    first_attempt_at TEXT,
+                    last_error TEXT,
+                    page_id TEXT,
+                    done_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status, id);
+                CREATE INDEX IF NOT EXISTS outbox_key ON outbox (key, status);
+            """)
+        return self._conn
+
+    @staticmethod
+    def _entry(row):
+        keys = ["id", "key", "op", "target", "properties", "label", "status", "attempts", "created_at",
+                "first_attempt_at", "last_error", "page_id", "done_at"]
+        entry = dict(zip(keys, row))
+        entry["properties"] = json.loads(entry["properties"])
+        return entry
+
+    def enqueue(self, op, target, properties, label=None, key=None, serialize=json.dumps):
+        """
+        Records an intended write and returns its entry id. A write whose key is already waiting
+        (pending or in flight) is not queued twice; the existing entry id is returned instead.
+        """
+        key = key or default_key(op, target, properties)
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT id FROM outbox WHERE key = ? AND status IN ('pending', 'sending') LIMIT 1",
+                             (key,)).fetchone()
+            if row:
+                return row[0]
+            cur = db.execute("INSERT INTO outbox (key, op, target, properties, label, status, created_at) "
+                             "VALUES (?, ?, ?, ?, ?, 'pending', ?)",
+                             (key, op, target, serialize(properties), label, _now()))
+            db.commit()
+            return cur.lastrowid
+
+    def claim(self, entry_id):
+        """Marks a pending entry as being sent. Returns the entry, or None if it is not pending."""
+        with self._lock:
+            db = self._db()
+            cur = db.execute("UPDATE outbox SET status = 'sending', attempts = attempts + 1, "
+                             "first_attempt_at = COALESCE(first_attempt_at, ?) WHERE id = ? AND status = 'pending'",
+                             (_now(), entry_id))
+            db.commit()
+            if cur.rowcount == 0:
+                return None
+            return self._entry(db.execute("SELECT * FROM outbox WHERE id = ?", (entry_id,)).fetchone())
+
+    def get(self, entry_id):
+        with self._lock:
+            row = self._db().execute("SELECT * FROM outbox WHERE id = ?", (entry_id,)).fetchone()
+        return self._entry(row) if row else None
+
+    def done(self, entry_id, page_id):
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE outbox SET status = 'done', page_id = ?, done_at = ?, last_error = NULL WHERE id = ?",
+                       (page_id, _now(), entry_id))
+            db.commit()
+
+    def release(self, entry_id, error, retryable=True, limit_attempts=True):
+        """Returns an entry to pending after a failed send (or parks it as failed). True if it will be retried."""
+        with self._lock:
+            db = self._db()
+            attempts = db.execute("SELECT attempts FROM outbox WHERE id = ?", (entry_id,)).fetchone()[0]
+            retry = retryable and (attempts < MAX_ATTEMPTS or not limit_attempts)
+            db.execute("UPDATE outbox SET status = ?, last_error = ? WHERE id = ?",
+                       ("pending" if retry else "failed", str(error)[:500], entry_id))
+            db.commit()
+        return retry
+
+    def recover(self):
+        """After a crash, entries left "sending" go back to pending (their outcome is unknown)."""
+        with self._lock:
+            db = self._db()
+            n = db.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending'").rowcount
+            db.commit()
+        return n
+
+    def pending(self, min_age_seconds=0):
+        """Pending entries, oldest first, created at least min_age_seconds ago."""
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=min_age_seconds)).isoformat()
+        with self._lock:
+            rows = self._db().execute("SELECT * FROM outbox WHERE status = 'pending' AND created_at <= ? ORDER BY id",
+                                      (cutoff,)).fetchall()
+        return [self._entry(r) for r in rows]
+
+    def prune(self):
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=DONE_RETENTION_DAYS)).isoformat()
+        with self._lock:
+            db = self._db()
+            n = db.execute("DELETE FROM outbox WHERE status = 'done' AND done_at < ?", (cutoff,)).rowcount
+            db.commit()
+        return n
+
+    def counts(self):
+        with self._lock:
+            return dict(self._db().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+
+outbox = Outbox()
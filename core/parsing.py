@@ -0,0 +1,118 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+from core import metrics
+
+try:
+    import lxml  # noqa: F401  (only needed as a BeautifulSoup builder)
+    SOUP_BUILDER = "lxml"
+except ImportError:
+    SOUP_BUILDER = "html.parser"
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as FastHTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as FastHTMLParser
+    except ImportError:
+        FastHTMLParser = None
+
+# Fastest available engine for extract_table_rows: "selectolax", "lxml" or "html.parser"
+DEFAULT_BACKEND = "selectolax" if FastHTMLParser else SOUP_BUILDER
+
+FORECAST_TABLE_SELECTOR = "table.forecast-table__table"
+
+
+def make_soup(html, parse_only=None, builder=None):
+    """BeautifulSoup with the fastest installed builder; parse_only restricts it to a region."""
+    with metrics.timed("parse.soup"):
+        return BeautifulSoup(html, builder or SOUP_BUILDER, parse_only=parse_only)
+
+
+def region(name=None, id=None, classes=None):
+    """
+    SoupStrainer for the parts of a page a job actually reads, e.g.
+    region("div", id="content_history") or region(classes=["weather-intro", "row"]).
+    """
+    if classes is not None:
+        wanted = set(classes)
+        return SoupStrainer(name, class_=lambda c: c is not None and bool(wanted & set(c.split())))
+    if id is not None:
+        return SoupStrainer(name, id=id)
+    return SoupStrainer(name)
+
+
+def has_selector(html, selector):
+    """True if the CSS selector matches anything in the HTML (used to validate static fetches)."""
+    if FastHTMLParser is not None:
+        return FastHTMLParser(html).css_first(selector) is not None
+    return make_soup(html).select_one(selector) is not None
+
+
+def _cell_value(get_attr, select_text, full_text, sel, attr):
+    if attr:
+        return get_attr(attr)
+    if sel:
+        value = select_text(sel)
+        return value if value is not None else "-"
+    return full_text()
+
+
+def _rows_selectolax(html, table_selector, specs):
+    tree = FastHTMLParser(html)
+    table = tree.css_first(table_selector)
+    if table is None:
+        return None
+    rows = {}
+    for tr in table.css("tr[data-row]"):
+        name = tr.attributes.get("data-row")
+        if name not in specs or name in rows: continue
+        sel, attr = specs[name]
+        data = []
+        for cell in tr.css("td"):
+            def select_text(s, cell=cell):
+                el = cell.css_first(s)
+                return el.text(strip=True) if el is not None else None
+            val = _cell_value(cell.attributes.get, select_text, lambda: cell.text(strip=True), sel, attr)
+            data.extend([val] * int(cell.attributes.get("colspan") or 1))
+        rows[name] = data
+    return rows
+
+
+def _rows_soup(html, table_selector, specs, builder):
+    tag, _, cls = table_selector.partition(".")
+    table = make_soup(html, parse_only=region(tag, classes=[cls]), builder=builder).find(tag)
+    if table is None:
+        return None
+    rows = {}
+    for tr in table.find_all("tr", attrs={"data-row": True}):
+        name = tr.get("data-row")
+        if name not in specs or name in rows: continue
+        sel, attr = specs[name]
+        data = []
+        for cell in tr.find_all("td"):
+            def select_text(s, cell=cell):
+                el = cell.select_one(s)
+                return el.get_text(strip=True) if el is not None else None
+            val = _cell_value(cell.get, select_text, lambda: cell.get_text(strip=True), sel, attr)
+            data.extend([val] * int(cell.get("colspan", 1)))
+        rows[name] = data
+    return rows
+
+
+def extract_table_rows(html, specs, table_selector=FORECAST_TABLE_SELECTOR, backend=None):
+    """
+    Extracts every <tr data-row=...> named in specs in a single pass over the table.
+    specs maps row name -> (css selector for the cell text, attribute name); both None means cell text.
+    Cells are repeated colspan times. Returns {row name: [values]}, or None if the table is missing.
+    """
+    backend = backend or DEFAULT_BACKEND
+    with metrics.timed("parse.table"):
+        if backend == "selectolax":
+            if FastHTMLParser is None:
+                raise ImportError("selectolax is not installed")
+            rows = _rows_selectolax(html, table_selector, specs)
+        else:
+            rows = _rows_soup(html, table_selector, specs, backend)
+    if rows is None:
+        return None
+    return {name: rows.get(name, []) for name in specs}
@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+import statistics
+from datetime import datetime, timedelta, timezone
+
+import config
+
+RELEASES_PATH = os.path.join(config.DATA_DIR, "releases.sqlite3")
+LOOKBACK_DAYS = 21
+# Observations closer than this (minutes of day) belong to the same daily release slot
+CLUSTER_GAP_MINUTES = 90
+# A slot needs this many observed days before it is trusted
+MIN_SUPPORT = 3
+
+_lock = threading.Lock()
+_conn = None
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(RELEASES_PATH), exist_ok=True)
+        _conn = sqlite3.connect(RELEASES_PATH, check_same_thread=False)
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS releases (
+                source TEXT NOT NULL,
+                released_at TEXT NOT NULL,
+                precision_minutes INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS releases_source_time ON releases (source, released_at);
+        """)
+    return _conn
+
+
+def _utc(dt):
+    return dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def record(source, released_at, precision_minutes=1):
+    """
+    Stores an observed publication time. released_at is the latest time the release could have
+    happened ("Updated: 2 hours ago" -> now - 2h with precision 60). Repeat sightings of the same
+    release are merged, keeping the most precise one.
+    """
+    released_at = _utc(released_at) - timedelta(minutes=precision_minutes / 2)
+    window = timedelta(minutes=max(precision_minutes, 20))
+    with _lock:
+        db = _db()
+        rows = db.execute(
+            "SELECT rowid, precision_minutes FROM releases WHERE source = ? AND released_at BETWEEN ? AND ?",
+            (source, (released_at - window).isoformat(), (released_at + window).isoformat())).fetchall()
+        if rows:
+            rowid, old_precision = min(rows, key=lambda r: r[1])
+            if precision_minutes < old_precision:
+                db.execute("UPDATE releases SET released_at = ?, precision_minutes = ? WHERE rowid = ?",
+                           (released_at.isoformat(), precision_minutes, rowid))
+        else:
+            db.execute("INSERT INTO releases VALUES (?, ?, ?)", (source, released_at.isoformat(), precision_minutes))
+        db.commit()
+
+
+def _slots(source, now):
+    """Daily release slots learned from recent observations: [(centre minute-of-day UTC, spread, share of days)]."""
+    since = (now - timedelta(days=LOOKBACK_DAYS)).isoformat()
+    with _lock:
+        rows = _db().execute("SELECT released_at, precision_minutes FROM releases WHERE source = ? AND released_at >= ?",
+                             (source, since)).fetchall()
+    points = sorted((datetime.fromisoformat(r[0]), r[1]) for r in rows)
+    if not points:
+        return []
+    # Whole days observed; today is still in progress, so its missing slots are not misses yet
+    today = now.date()
+    observed_days = max(1, (today - points[0][0].date()).days)
+
+    minutes = sorted(((dt.hour * 60 + dt.minute, dt.date(), p) for dt, p in points), key=lambda x: x[0])
+    clusters = [[minutes[0]]]
+    for m in minutes[1:]:
+        if m[0] - clusters[-1][-1][0] <= CLUSTER_GAP_MINUTES:
+            clusters[-1].append(m)
+        else:
+            clusters.append([m])
+    # Merge the slot that wraps around midnight
+    if len(clusters) > 1 and clusters[0][0][0] + 1440 - clusters[-1][-1][0] <= CLUSTER_GAP_MINUTES:
+        clusters[0] = [(m + (1440 if m < 720 else 0), d, p) for m, d, p in clusters.pop() + clusters[0]]
+
+    slots = []
+    for cluster in clusters:
+        seen = {d for _, d, _ in cluster}
+        if len(seen) < MIN_SUPPORT: continue
+        days = len(seen - {today})
+        values = [m for m, _, _ in cluster]
+        centre = statistics.median(values)
+        # Spread: observed scatter plus the coarsest precision among the observations
+        spread = (statistics.pstdev(values) * 1.5 if len(values) > 1 else 0) + max(p for _, _, p in cluster) / 2
+        slots.append((centre % 1440, max(spread, 5), min(1.0, days / observed_days)))
+    return slots
+
+
+def predict_next(source, now=None):
+    """
+    Next expected release after `now`: {"expected", "earliest", "latest", "confidence"} (UTC datetimes),
+    or None until MIN_SUPPORT days of observations exist. Confidence is the share of recent days
+    the slot was actually observed.
+    """
+    now = _utc(now or datetime.now(timezone.utc))
+    best = None
+    for centre, spread, share in _slots(source, now):
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        for day in (-1, 0, 1):
+            expected = midnight + timedelta(days=day, minutes=centre)
+            if expected + timedelta(minutes=spread) <= now: continue
+            if best is None or expected < best["expected"]:
+                best = {"expected": expected,
+                        "earliest": expected - timedelta(minutes=spread),
+                        "latest": expected + timedelta(minutes=spread),
+                        "confidence": share}
+            break
+    return best
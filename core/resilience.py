@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+
+import config
+
+# Circuit breakers: this many consecutive failures open a host's breaker for the cool-down
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN_SECONDS = 5 * 60
+# Full-jitter exponential backoff: sleep uniform(0, min(cap, base * 2**attempt))
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_CAP_SECONDS = 30
+# Statuses worth another attempt; anything else is the caller's answer
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+LAST_GOOD_DIR = os.path.join(config.DATA_DIR, "last_good")
+
+# Monotonic time by which the current cycle / job / source call must be done (None = no deadline)
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The current deadline budget is spent."""
+
+
+class CircuitOpen(Exception):
+    """The host's breaker is open; the call was not attempted."""
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Bounds everything inside the block to `seconds`. Nested deadlines only ever shrink the budget,
+    and it follows work submitted through metrics.submit into worker threads.
+    """
+    current = _deadline.get()
+    until = time.monotonic() + seconds
+    token = _deadline.set(until if current is None else min(current, until))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left in the current deadline, or None without one."""
+    until = _deadline.get()
+    return None if until is None else max(0.0, until - time.monotonic())
+
+
+def budget(timeout):
+    """timeout capped to the remaining deadline. Raises DeadlineExceeded once nothing is left."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("deadline budget spent")
+    return min(timeout, left)
+
+
+def backoff(attempt, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_CAP_SECONDS):
+    """Jittered delay before retry number attempt + 1."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def sleep_backoff(attempt, at_least=0):
+    """Sleeps before the next retry. Raises DeadlineExceeded instead if the wait would overrun the deadline."""
+    delay = max(at_least, backoff(attempt))
+    left = remaining()
+    if left is not None and delay >= left:
+        raise DeadlineExceeded(f"no budget left for a {delay:.1f}s backoff")
+    time.sleep(delay)
+
+
+def host_of(url):
+    return urlparse(url).netloc or url
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After failure_threshold consecutive failures the breaker opens and
+    calls are refused for cooldown seconds, then a single trial call is let through (half-open):
+    its success closes the breaker, its failure re-opens it. A trial that ends without a verdict
+    (throttled, out of budget, local error) is released so the next call becomes the trial.
+    Use attempt() rather than allow() directly, so every call is resolved one way or the other.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half-open"
+                return True
+            return False
+
+    def cooling_down(self):
+        """True while calls are refused; does not claim the half-open trial."""
+        with self._lock:
+            return self.state == "half-open" or (self.state == "open" and
+                                                 time.monotonic() - self.opened_at < self.cooldown)
+
+    def release(self):
+        """Ends a call that says nothing about the host's health; a half-open trial goes back to open."""
+        with self._lock:
+            # opened_at is already past the cool-down, so the next allow() is the new trial
+            if self.state == "half-open":
+                self.state = "open"
+
+    @contextmanager
+    def attempt(self):
+        """
+        allow() for the block, raising CircuitOpen when refused. Call .success() / .failure() on the
+        yielded handle; leaving the block without either (exception, 429, deadline) releases the call.
+        """
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} is cooling down for {self.retry_in():.0f}s")
+        call = _Call(self)
+        try:
+            yield call
+        finally:
+            if not call.resolved:
+                self.release()
+
+    def success(self):
+        with self._lock:
+            if self.state != "closed":
+                print(f"   🟢 {self.name} recovered, breaker closed")
+            self.state = "closed"
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                print(f"   🔴 {self.name} failing ({self.failures} in a row), skipping it for {self.cooldown}s")
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a trial call through."""
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at)) if self.state == "open" else 0.0
+
+
+class _Call:
+    """One call through a breaker; records whether it was resolved."""
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+        self.resolved = False
+
+    def success(self):
+        self.resolved = True
+        self.breaker.success()
+
+    def failure(self):
+        self.resolved = True
+        self.breaker.failure()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(host, **settings):
+    """The process-wide breaker for a host; settings only apply when it is first created."""
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host, **settings)
+        return _breakers[host]
+
+
+def open_breakers():
+    with _breakers_lock:
+        return [b for b in _breakers.values() if b.state != "closed"]
+
+
+def http(method, url, timeout, attempts=1, session=requests, **kwargs):
+    """
+    One HTTP call guarded by the host's breaker and the current deadline, retrying network errors
+    and RETRY_STATUSES with jittered backoff. Returns the last response (which may be an error
+    status) or raises the last network error, CircuitOpen or DeadlineExceeded.
+    """
+    host_breaker = breaker(host_of(url))
+    for attempt in range(attempts):
+        last = attempt + 1 >= attempts
+        request_timeout = budget(timeout)
+        retry_after = 0
+        with host_breaker.attempt() as call:
+            try:
+                resp = session.request(method, url, timeout=request_timeout, **kwargs)
+            except requests.RequestException:
+                call.failure()
+                if last: raise
+            else:
+                # Throttling (429) says nothing about the host's health: the call is just released
+                if resp.status_code >= 500: call.failure()
+                elif resp.status_code != 429: call.success()
+                if resp.status_code not in RETRY_STATUSES or last:
+                    return resp
+                retry_after = float(resp.headers.get("Retry-After", 0) or 0)
+        sleep_backoff(attempt, at_least=retry_after)
+
+
+class LastGood:
+    """Last successfully fetched value per key (page HTML, AI labels), served while a source is down."""
+
+    def __init__(self, directory=LAST_GOOD_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def put(self, key, value):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            with open(path + ".tmp", "w") as f:
+                json.dump({"key": key, "at": time.time(), "value": value}, f)
+            os.replace(path + ".tmp", path)
+
+    def get(self, key, max_age_seconds):
+        """(value, age in seconds) if a copy younger than max_age_seconds exists, else None."""
+        try:
+            with open(self._path(key)) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        age = time.time() - saved["at"]
+        return (saved["value"], age) if saved["key"] == key and age <= max_age_seconds else None
+
+
+last_good = LastGood()
@@ -0,0 +1,83 @@
+import re
+import time
+import threading
+
+from core.mirror import mirror
+
+RESOLVER_TTL_SECONDS = 6 * 60 * 60
+# A lookup that finds nothing reloads the table at most this often (e.g. for a row added in Notion)
+RESOLVER_MISS_RELOAD_SECONDS = 10 * 60
+
+
+def _normalize(title):
+    return re.sub(r"\s+", " ", title).strip().lower()
+
+
+class LookupResolver:
+    """
+    In-memory indexes over small Notion lookup tables (elevations, stations) loaded from the mirror.
+    Tables are reloaded after ttl_seconds or on refresh(); id lookups that found a page are
+    memoized per search term.
+    """
+
+    def __init__(self, ttl_seconds=RESOLVER_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _table(self, db_name):
+        with self._lock:
+            table = self._tables.get(db_name)
+            if table is None or time.monotonic() - table["loaded_at"] > self.ttl_seconds:
+                mirror.sync(db_name)
+                rows = mirror.rows(db_name)
+                table = {
+                    "rows": rows,
+                    "by_title": {_normalize(r["__title__"]): r["id"] for r in rows if r["__title__"]},
+                    "memo": {},
+                    "loaded_at": time.monotonic(),
+                }
+                self._tables[db_name] = table
+            return table
+
+    def rows(self, db_name):
+        """Flattened rows of a lookup table (see core.mirror.plain_value)."""
+        return self._table(db_name)["rows"]
+
+    def find_id(self, db_name, term, exact=False):
+        """
+        Page ID whose title equals term (ignoring case and extra whitespace) or, unless exact,
+        contains it. None when nothing matches.
+        """
+        memo_key = (term, exact)
+        table = self._table(db_name)
+        if memo_key in table["memo"]:
+            return table["memo"][memo_key]
+
+        page_id = self._match(table, term, exact)
+        if page_id is None and time.monotonic() - table["loaded_at"] > RESOLVER_MISS_RELOAD_SECONDS:
+            self.refresh(db_name)
+            table = self._table(db_name)
+            page_id = self._match(table, term, exact)
+        # Misses are not memoized, so a row added later is found on the next lookup
+        if page_id is not None:
+            table["memo"][memo_key] = page_id
+        return page_id
+
+    @staticmethod
+    def _match(table, term, exact):
+        page_id = table["by_title"].get(_normalize(term))
+        if page_id is None and not exact:
+            page_id = next((r["id"] for r in table["rows"] if term in r["__title__"]), None)
+        return page_id
+
+    def refresh(self, db_name=None):
+        """Drops cached tables so the next lookup re-syncs them."""
+        with self._lock:
+            if db_name is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(db_name, None)
+
+
+resolver = LookupResolver()
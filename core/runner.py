@@ -0,0 +1,110 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from core import metrics, resilience
+
+# Worker threads are kept for the life of the process; browser work goes to scraper's browser thread
+MAX_WORKERS = 4
+DEFAULT_JOB_TIMEOUT = 15 * 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class Job:
+    """A named unit of work. Dependencies only order execution; they run even if a dependency failed."""
+
+    def __init__(self, name, func, *args, depends_on=(), timeout=DEFAULT_JOB_TIMEOUT):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="job")
+        return _executor
+
+
+def _run_one(job, started=None):
+    # Budgets count from when a worker picks the job up, not from when it was queued
+    if started is not None:
+        started["at"] = time.monotonic()
+    start = time.perf_counter()
+    # The job's budget also bounds every fetch and API call it makes (see core.resilience)
+    with metrics.labels(job=job.name), resilience.deadline(job.timeout):
+        try:
+            with metrics.timed("job"):
+                result = job.func(*job.args)
+            return {"status": "ok", "result": result, "error": None, "seconds": time.perf_counter() - start}
+        except Exception as e:
+            print(f"🔥 Job '{job.name}' failed: {e}")
+            return {"status": "failed", "result": None, "error": e, "seconds": time.perf_counter() - start}
+
+
+def submit(job, started=None):
+    """
+    Starts a single job on the shared worker pool; the future resolves to _run_one's result dict.
+    started (a dict) gets the job's monotonic start time under "at" once a worker runs it.
+    """
+    return metrics.submit(_get_executor(), _run_one, job, started)
+
+
+def run_jobs(jobs):
+    """
+    Runs jobs concurrently on the shared worker pool, honouring depends_on and per-job timeouts.
+    Returns {name: {"status", "result", "error", "seconds"}}. A job that overruns its budget is
+    reported as "timeout" and its dependents are released; the thread itself cannot be killed, but
+    its fetches and API calls stop at the job's deadline. Jobs inherit the caller's deadline too.
+    """
+    by_name = {job.name: job for job in jobs}
+    for job in jobs:
+        missing = [d for d in job.depends_on if d not in by_name]
+        if missing:
+            raise ValueError(f"Job '{job.name}' depends on unknown job(s): {missing}")
+
+    executor = _get_executor()
+    results = {}
+    pending = list(jobs)
+    running = {}  # future -> (job, {"at": monotonic start}); "at" is missing while the job is queued
+
+    while pending or running:
+        # 1. Submit every job whose dependencies have all finished
+        for job in list(pending):
+            if all(d in results for d in job.depends_on):
+                pending.remove(job)
+                started = {}
+                running[metrics.submit(executor, _run_one, job, started)] = (job, started)
+
+        if not running:
+            raise RuntimeError(f"Dependency cycle between jobs: {[j.name for j in pending]}")
+
+        # 2. Wait for the next completion or the nearest deadline (queued jobs re-check every second)
+        now = time.monotonic()
+        deadlines = [started["at"] + job.timeout if "at" in started else now + 1
+                     for job, started in running.values()]
+        done, _ = wait(list(running), timeout=max(0, min(deadlines) - now), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            job, _ = running.pop(future)
+            results[job.name] = future.result()
+
+        now = time.monotonic()
+        for future, (job, started) in list(running.items()):
+            if "at" in started and now - started["at"] >= job.timeout:
+                running.pop(future)
+                print(f"⏰ Job '{job.name}' exceeded its {job.timeout}s budget, moving on.")
+                results[job.name] = {"status": "timeout", "result": None, "error": None,
+                                     "seconds": now - started["at"]}
+
+    return results
+
+
+def summarize(results):
+    parts = [f"{name}: {r['status']} ({r['seconds']:.1f}s)" for name, r in results.items()]
+    return "⏱️ Jobs - " + ", ".join(parts)
@@ -0,0 +1,194 @@
+import time
+import random
+import logging
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from core import runner, state, releases
+
+VANCOUVER = ZoneInfo("America/Vancouver")
+POLL_SECONDS = 30
+# A tick that raises (state/SQLite error, bad cadence) is logged and retried after this long
+CRASH_RETRY_SECONDS = 60
+STATE_KEY = "scheduler"
+
+
+# ==========================================
+# CADENCES: next_due(last_run, result, now) -> datetime
+# ==========================================
+class Daily:
+    """Runs once per listed local time ("HH:MM"); a slot missed while down runs once on startup."""
+
+    def __init__(self, *times):
+        self.times = [tuple(int(x) for x in t.split(":")) for t in times]
+
+    def next_due(self, last_run, result, now):
+        if last_run is None:
+            return now
+        # The most recent slot at or before now; if it hasn't run since, it is due (catch-up)
+        slots = [now.replace(hour=h, minute=m, second=0, microsecond=0) for h, m in self.times]
+        slots += [s - timedelta(days=1) for s in slots]
+        latest = max(s for s in slots if s <= now)
+        if last_run < latest:
+            return now
+        return min(s + timedelta(days=d) for s in slots for d in (0, 1, 2) if s + timedelta(days=d) > now)
+
+
+class Every:
+    """Runs every `minutes`, optionally only between start_hour and end_hour local time."""
+
+    def __init__(self, minutes, start_hour=None, end_hour=None):
+        self.interval = timedelta(minutes=minutes)
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+
+    def next_due(self, last_run, result, now):
+        # A run missed while down is due immediately, once
+        due = now if last_run is None else max(last_run + self.interval, now)
+        if self.start_hour is None:
+            return due
+        window_start = due.replace(hour=self.start_hour, minute=0, second=0, microsecond=0)
+        if due.hour < self.start_hour:
+            return window_start
+        if due.hour >= self.end_hour:
+            return window_start + timedelta(days=1)
+        return due
+
+
+class AfterRelease:
+    """
+    Runs shortly after the source's next release. The job returns the minutes until that release;
+    if it returns nothing, fall back to polling every fallback_minutes.
+    """
+
+    def __init__(self, delay_minutes=5, fallback_minutes=60):
+        self.delay = timedelta(minutes=delay_minutes)
+        self.fallback = timedelta(minutes=fallback_minutes)
+
+    def next_due(self, last_run, result, now):
+        if last_run is None:
+            return now
+        if isinstance(result, (int, float)) and result > 0:
+            return last_run + timedelta(minutes=result) + self.delay
+        return last_run + self.fallback
+
+
+class PredictedRelease:
+    """
+    Wakes just after the end of the next release window learned by core.releases from observed
+    publication times. Until the predictor is confident, the fallback cadence decides.
+    """
+
+    def __init__(self, source, fallback, delay_minutes=5, min_confidence=0.5):
+        self.source = source
+        self.fallback = fallback
+        self.delay = timedelta(minutes=delay_minutes)
+        self.min_confidence = min_confidence
+
+    def next_due(self, last_run, result, now):
+        if last_run is None:
+            return now
+        prediction = releases.predict_next(self.source, now=last_run)
+        if prediction is None or prediction["confidence"] < self.min_confidence:
+            return self.fallback.next_due(last_run, result, now)
+        return max(now, prediction["latest"].astimezone(VANCOUVER) + self.delay)
+
+
+# ==========================================
+# SCHEDULER
+# ==========================================
+class ScheduledJob:
+    def __init__(self, name, func, cadence, *args, jitter_seconds=60, timeout=runner.DEFAULT_JOB_TIMEOUT):
+        self.job = runner.Job(name, func, *args, timeout=timeout)
+        self.name = name
+        self.cadence = cadence
+        self.jitter_seconds = jitter_seconds
+
+
+class Scheduler:
+    """
+    Runs each job on its own cadence on the shared worker pool. Last runs are persisted so a
+    restart catches up on missed runs once (not once per missed slot), and a job is never started
+    while its previous run is still going.
+    """
+
+    def __init__(self, entries, on_finish=None):
+        self.entries = {e.name: e for e in entries}
+        # on_finish(name, outcome) is called after every run, e.g. to export metrics
+        self.on_finish = on_finish
+        self._running = {}
+        self._overdue_warned = set()
+        saved = state.get(STATE_KEY, {})
+        now = self._now()
+        self._last = {name: datetime.fromisoformat(saved[name]["last_run"])
+                      for name in self.entries if saved.get(name, {}).get("last_run")}
+        self._result = {name: saved.get(name, {}).get("result") for name in self.entries}
+        # Jitter is only added to future runs so catch-ups start straight away
+        self._due = {name: e.cadence.next_due(self._last.get(name), self._result[name], now)
+                     for name, e in self.entries.items()}
+
+    @staticmethod
+    def _now():
+        return datetime.now(VANCOUVER)
+
+    def _save(self):
+        state.put(STATE_KEY, {
+            name: {"last_run": self._last[name].isoformat(), "result": self._result.get(name),
+                   "next_due": self._due[name].isoformat()}
+            for name in self.entries if name in self._last
+        })
+
+    def _finish(self, name, outcome):
+        entry = self.entries[name]
+        now = self._now()
+        self._last[name] = now
+        result = outcome["result"] if isinstance(outcome["result"], (int, float, str, type(None))) else None
+        self._result[name] = result
+        due = entry.cadence.next_due(now, result, now)
+        if due > now:
+            due += timedelta(seconds=random.uniform(0, entry.jitter_seconds))
+        self._due[name] = due
+        self._save()
+        logging.info(f"✔️ {name}: {outcome['status']} in {outcome['seconds']:.0f}s, next run {due:%a %H:%M}")
+        if self.on_finish:
+            try:
+                self.on_finish(name, outcome)
+            except Exception as e:
+                logging.error(f"on_finish hook failed for {name}: {e}")
+
+    def tick(self):
+        """Collects finished jobs and starts due ones. Returns the seconds until the next due job."""
+        for name, (future, started) in list(self._running.items()):
+            if future.done():
+                del self._running[name]
+                self._overdue_warned.discard(name)
+                self._finish(name, future.result())
+            elif ("at" in started and time.monotonic() - started["at"] > self.entries[name].job.timeout
+                  and name not in self._overdue_warned):
+                self._overdue_warned.add(name)
+                logging.warning(f"⏰ {name} is over its {self.entries[name].job.timeout}s budget; not restarting it")
+
+        now = self._now()
+        for name, entry in self.entries.items():
+            if name in self._running or self._due[name] > now:
+                continue
+            logging.info(f"▶️ Starting {name}")
+            started = {}
+            self._running[name] = (runner.submit(entry.job, started), started)
+
+        idle = [due for name, due in self._due.items() if name not in self._running]
+        if not idle:
+            return POLL_SECONDS
+        return max(1, min(POLL_SECONDS, (min(idle) - self._now()).total_seconds()))
+
+    def run_forever(self):
+        for name, due in sorted(self._due.items(), key=lambda x: x[1]):
+            logging.info(f"🗓️ {name}: next run {due:%a %H:%M}")
+        while True:
+            try:
+                time.sleep(self.tick())
+            except Exception as e:
+                # A crashing tick must not kill the service: log it, wait, and try again
+                logging.error(f"🔥 CRASH OCCURRED: {e}")
+                logging.info(f"Retrying in {CRASH_RETRY_SECONDS} seconds...")
+                time.sleep(CRASH_RETRY_SECONDS)
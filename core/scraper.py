@@ -1,24 +1,567 @@
+import os
+import json
+import atexit
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import queue
+import threading
+import contextvars
+from concurrent.futures import Future
+from collections import OrderedDict, Counter
+from contextlib import contextmanager
+from urllib.parse import urlparse
 from playwright.sync_api import sync_playwright
 
+import config
+from core import parsing, metrics, resilience
+from core.archive import archive
 
-def scrape_dynamic_content(url, selector=None, timeout=60000):
+# Browser recycling limits
+MAX_PAGES_PER_BROWSER = 50
+MAX_BROWSER_RSS_MB = 700
+
+DEFAULT_VIEWPORT = {"width": 1920, "height": 1080}
+
+# Page-fetch cache limits
+FETCH_CACHE_TTL_SECONDS = 15 * 60
+FETCH_CACHE_MAX_ENTRIES = 32
+
+# Static-HTTP fast path
+STATIC_TIMEOUT_SECONDS = 15
+# A URL that needed the browser gets another plain-HTTP attempt after this long
+STRATEGY_RETRY_SECONDS = 24 * 60 * 60
+STRATEGY_PATH = os.path.join(config.DATA_DIR, "fetch_strategies.json")
+# Per-source deadline: every strategy and retry for one URL must fit in this
+SCRAPE_BUDGET_SECONDS = 150
+BROWSER_ATTEMPTS = 2
+# While a site is down (or its breaker is open) its last good page is served up to this old
+LAST_GOOD_MAX_AGE_SECONDS = 12 * 60 * 60
+# Request interception profiles: resource types allowed through, everything else is aborted
+BLOCK_PROFILES = {
+    "dom-only": {"document", "script"},
+    "dom+xhr": {"document", "script", "xhr", "fetch"},
+    "full": None,
+}
+DEFAULT_BLOCK_PROFILE = "dom+xhr"
+# Ad/analytics hosts are aborted under every profile except "full"
+BLOCKED_HOST_SUFFIXES = (
+    "doubleclick.net", "googlesyndication.com", "googletagmanager.com", "google-analytics.com",
+    "googleadservices.com", "adservice.google.com", "facebook.net", "facebook.com", "hotjar.com",
+    "amazon-adsystem.com", "adnxs.com", "criteo.com", "taboola.com", "outbrain.com", "quantserve.com",
+    "scorecardresearch.com", "pubmatic.com", "rubiconproject.com", "moatads.com", "youtube.com",
+)
+# Rough transfer sizes used to estimate bytes saved by aborted requests
+AVG_BYTES_BY_TYPE = {
+    "image": 60_000, "media": 500_000, "font": 40_000, "stylesheet": 30_000,
+    "script": 80_000, "xhr": 10_000, "fetch": 10_000, "other": 5_000,
+}
+
+USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/124.0 Safari/537.36")
+
+
+class BrowserUnavailable(Exception):
+    """The local browser could not be started or could not open a page; says nothing about the site."""
+
+
+def _process_children():
+    """{ppid: [child pids]} for every process. Linux only, empty elsewhere."""
+    children = {}
+    if not os.path.isdir("/proc"):
+        return children
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit(): continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 is the parent PID (comm may contain spaces, so split after ')')
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    return children
+
+
+def _descendant_rss_mb(root_pid):
+    """Sums the RSS (MB) of every process below root_pid. Linux only, returns 0 elsewhere."""
+    children = _process_children()
+    total_kb = 0
+    stack = list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+
+class BrowserPool:
+    """
+    Keeps one warm Chromium alive and hands out isolated context/page pairs.
+    The browser is relaunched after max_pages pages or once its RSS passes max_rss_mb.
+    Playwright's sync API is bound to the thread that started it, so use it through render().
+    The RSS limit applies to this pool's own Chromium: the process tree below its Playwright driver.
+    """
+
+    # Serializes driver start-up so each pool can tell which new child process is its driver
+    _driver_lock = threading.Lock()
+
+    def __init__(self, max_pages=MAX_PAGES_PER_BROWSER, max_rss_mb=MAX_BROWSER_RSS_MB):
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._playwright = None
+        self._browser = None
+        self._pages_served = 0
+        self._driver_pid = None
+
+    def _start_playwright(self):
+        with BrowserPool._driver_lock:
+            before = set(_process_children().get(os.getpid(), []))
+            self._playwright = sync_playwright().start()
+            new = set(_process_children().get(os.getpid(), [])) - before
+        # Without a single identifiable driver, only the page limit recycles the browser
+        self._driver_pid = new.pop() if len(new) == 1 else None
+
+    def _ensure_browser(self):
+        if self._browser is not None and self._browser.is_connected():
+            return self._browser
+        if self._playwright is None:
+            self._start_playwright()
+        with metrics.timed("browser.launch"):
+            self._browser = self._playwright.chromium.launch(headless=True)
+        self._pages_served = 0
+        print("   🌐 Launched pooled Chromium")
+        return self._browser
+
+    def _close_browser(self):
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+        self._browser = None
+
+    def _maybe_recycle(self):
+        if self._browser is None: return
+        reason = None
+        if self._pages_served >= self.max_pages:
+            reason = f"{self._pages_served} pages served"
+        elif self._driver_pid is not None:
+            # The browser runs below the driver; the driver's own memory is not the browser's
+            rss = _descendant_rss_mb(self._driver_pid)
+            if rss > self.max_rss_mb:
+                reason = f"RSS {rss:.0f}MB > {self.max_rss_mb}MB"
+        if reason:
+            print(f"   ♻️ Recycling Chromium ({reason})")
+            self._close_browser()
+
+    @contextmanager
+    def page(self, block_profile=None, **context_kwargs):
+        """
+        Yields a fresh page in its own browser context; the context is closed afterwards.
+        block_profile (see BLOCK_PROFILES) aborts unneeded resource types and ad/analytics hosts.
+        Raises BrowserUnavailable when Chromium cannot be launched or cannot open the page.
+        """
+        context = None
+        try:
+            browser = self._ensure_browser()
+            context = browser.new_context(**context_kwargs)
+            blocker = None
+            if block_profile and BLOCK_PROFILES[block_profile] is not None:
+                blocker = RequestBlocker(block_profile)
+                context.route("**/*", blocker.handle)
+            page = context.new_page()
+        except Exception as e:
+            if context is not None:
+                try:
+                    context.close()
+                except Exception:
+                    pass
+            self._close_browser()
+            raise BrowserUnavailable(str(e)) from e
+        try:
+            yield page
+        finally:
+            if blocker and blocker.blocked:
+                print(f"   🚫 {blocker.summary()}")
+            try:
+                context.close()
+            except Exception:
+                pass
+            self._pages_served += 1
+            self._maybe_recycle()
+
+    def close(self):
+        self._close_browser()
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+        self._playwright = None
+        self._driver_pid = None
+
+
+class RequestBlocker:
+    """Playwright route handler that aborts requests outside a BLOCK_PROFILES entry and counts them."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.allowed_types = BLOCK_PROFILES[profile]
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_type = Counter()
+
+    def _should_block(self, request):
+        host = urlparse(request.url).hostname or ""
+        if any(host == s or host.endswith("." + s) for s in BLOCKED_HOST_SUFFIXES):
+            return True
+        return request.resource_type not in self.allowed_types
+
+    def handle(self, route):
+        request = route.request
+        if self._should_block(request):
+            self.blocked += 1
+            self.blocked_by_type[request.resource_type] += 1
+            route_totals["requests"] += 1
+            route_totals["bytes"] += AVG_BYTES_BY_TYPE.get(request.resource_type, AVG_BYTES_BY_TYPE["other"])
+            route.abort()
+        else:
+            self.allowed += 1
+            route.continue_()
+
+    def bytes_saved(self):
+        return sum(AVG_BYTES_BY_TYPE.get(t, AVG_BYTES_BY_TYPE["other"]) * n for t, n in self.blocked_by_type.items())
+
+    def summary(self):
+        kinds = ", ".join(f"{n} {t}" for t, n in self.blocked_by_type.most_common())
+        return (f"Blocked {self.blocked}/{self.blocked + self.allowed} requests "
+                f"(~{self.bytes_saved() / 1e6:.1f}MB saved, profile '{self.profile}': {kinds})")
+
+
+# Process-wide totals of aborted requests and estimated bytes
+route_totals = Counter()
+
+class BrowserThread:
+    """
+    Owns the process's single BrowserPool on a dedicated thread, so every job and worker shares one
+    warm Chromium. Playwright's sync API is bound to the thread that started it, so other threads
+    hand it work through submit() and renders run one at a time.
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _run(work):
+        pool = BrowserPool()
+        while True:
+            item = work.get()
+            if item is None:
+                break
+            fn, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(pool))
+            except BaseException as e:
+                future.set_exception(e)
+        pool.close()
+
+    def submit(self, fn):
+        """Runs fn(pool) on the browser thread with the caller's context (deadline, labels); returns a Future."""
+        future = Future()
+        context = contextvars.copy_context()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                # Each browser thread drains its own queue, so a closing one never takes new work
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), name="browser", daemon=True)
+                self._thread.start()
+            self._queue.put((lambda pool: context.run(fn, pool), future))
+        return future
+
+    def close(self, timeout=30):
+        """Closes the browser once queued work is done; the next submit() starts a fresh one."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(None)
+        thread.join(timeout)
+
+
+browser_thread = BrowserThread()
+atexit.register(browser_thread.close)
+
+
+def render(fn, block_profile=None, **context_kwargs):
+    """
+    fn(page) on a fresh page (see BrowserPool.page) of the shared browser; returns fn's result.
+    fn runs on the browser thread, so it must do all of its page work before returning.
     """
-    Scrapes a URL using Playwright.
+    def task(pool):
+        with pool.page(block_profile=block_profile, **context_kwargs) as page:
+            return fn(page)
+    return browser_thread.submit(task).result()
+
+
+def close_browser_pool():
+    """Shuts down the shared browser (if running)."""
+    browser_thread.close()
+
+
+class FetchCache:
+    """
+    LRU cache of rendered pages keyed by (url, selector), with a TTL.
+    Optionally keeps the parsed soup next to the HTML so later consumers skip parsing too.
+    """
+
+    def __init__(self, ttl_seconds=FETCH_CACHE_TTL_SECONDS, max_entries=FETCH_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["fetched_at"] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, url, selector=None):
+        """Returns the cached HTML or None, counting a hit or a miss."""
+        with self._lock:
+            entry = self._lookup((url, selector))
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry["html"]
+
+    def put(self, url, selector, html):
+        if html is None: return
+        with self._lock:
+            self._entries[(url, selector)] = {"html": html, "soup": None, "fetched_at": time.monotonic()}
+            self._entries.move_to_end((url, selector))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_soup(self, url, selector):
+        """Returns a parsed soup for a cached page (parsing it once), or None if not cached."""
+        with self._lock:
+            entry = self._lookup((url, selector))
+            if entry is None:
+                return None
+            if entry["soup"] is None:
+                entry["soup"] = parsing.make_soup(entry["html"])
+            return entry["soup"]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def summary(self):
+        return f"📦 Fetch cache: {self.hits} hits / {self.misses} misses ({len(self._entries)} pages held)"
+
+
+fetch_cache = FetchCache()
+
+
+class StrategyStore:
+    """Remembers, per URL, whether plain HTTP was enough ("http") or the page needed a browser ("browser")."""
+
+    def __init__(self, path=STRATEGY_PATH):
+        self.path = path
+        self._strategies = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._strategies is None:
+            try:
+                with open(self.path) as f:
+                    self._strategies = json.load(f)
+            except (OSError, ValueError):
+                self._strategies = {}
+        return self._strategies
+
+    def should_try_http(self, url):
+        with self._lock:
+            entry = self._load().get(url)
+        if entry is None or entry["strategy"] == "http":
+            return True
+        return time.time() - entry["decided_at"] > STRATEGY_RETRY_SECONDS
+
+    def record(self, url, strategy):
+        with self._lock:
+            strategies = self._load()
+            previous = strategies.get(url, {}).get("strategy")
+            strategies[url] = {"strategy": strategy, "decided_at": time.time()}
+            if previous != strategy:
+                print(f"   🧭 Fetch strategy for {url}: {strategy}")
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(strategies, f, indent=2)
+
+
+strategies = StrategyStore()
+
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+_http.headers.update({"User-Agent": USER_AGENT})
+
+
+def _fetch_static(url, selector):
+    """Plain GET; returns the HTML only if it already contains the expected selector."""
+    with metrics.timed("scrape.http", url=url):
+        try:
+            resp = _http.get(url, timeout=resilience.budget(STATIC_TIMEOUT_SECONDS))
+            if resp.status_code != 200:
+                return None
+            html = resp.text
+            if selector and not parsing.has_selector(html, selector):
+                return None
+            return html
+        except requests.RequestException:
+            return None
+
+
+def _fetch_browser(url, selector, timeout, block_profile):
+    def read(page):
+        # Budgeted once the browser thread gets to it, after any renders queued ahead of this one
+        page_timeout = resilience.budget(timeout / 1000) * 1000
+        with metrics.timed("browser.goto", url=url):
+            page.goto(url, timeout=page_timeout)
+
+        if selector:
+            page.wait_for_selector(selector, timeout=page_timeout)
+
+        return page.content()
+
+    content = None
+    try:
+        with metrics.timed("scrape.browser", url=url):
+            content = render(read, block_profile=block_profile, viewport=DEFAULT_VIEWPORT)
+    except (BrowserUnavailable, resilience.DeadlineExceeded):
+        raise
+    except Exception as e:
+        print(f"❌ Scrape Error ({url}): {e}")
+    return content
+
+
+def _archive(url, content):
+    # Archiving is best effort: a full disk must not cost us the scrape
+    try:
+        with metrics.timed("scrape.archive", url=url):
+            archive.put(url, content)
+    except Exception as e:
+        print(f"⚠️ Could not archive {url}: {e}")
+
+
+def _fetch(url, selector, timeout, block_profile):
+    content = None
+    if strategies.should_try_http(url):
+        content = _fetch_static(url, selector)
+        if content is not None:
+            strategies.record(url, "http")
+            return content
+
+    for attempt in range(BROWSER_ATTEMPTS):
+        content = _fetch_browser(url, selector, timeout, block_profile)
+        if content is not None:
+            strategies.record(url, "browser")
+            return content
+        if attempt + 1 < BROWSER_ATTEMPTS:
+            resilience.sleep_backoff(attempt)
+    return None
+
+
+def scrape_dynamic_content(url, selector=None, timeout=60000, use_cache=True, block_profile=DEFAULT_BLOCK_PROFILE,
+                           refresh=False):
+    """
+    Scrapes a URL, trying a pooled plain-HTTP GET before the pooled Playwright browser.
+    Whichever strategy worked is remembered per URL, so JS-only pages skip straight to the browser.
+    Pages already fetched within the cache TTL are returned without any network access; refresh=True
+    always fetches and replaces the cached copy, for pages whose content changes on a known schedule.
+    Browser renders abort resource types outside block_profile (images, fonts, media, ads by default).
+    With config.ARCHIVE_PAGES, every freshly fetched page is also written to core.archive.
+    Each URL gets SCRAPE_BUDGET_SECONDS (within the job's deadline) and its host's circuit breaker;
+    only failed requests and navigations count against the host, not a spent budget or a local
+    browser that would not start.
     """
+    if use_cache and not refresh:
+        cached = fetch_cache.get(url, selector)
+        if cached is not None:
+            return cached
+
     content = None
-    with sync_playwright() as p:
+    host_breaker = resilience.breaker(resilience.host_of(url))
+    if resilience.remaining() == 0:
+        print(f"   ⏱️ No time left in this run's budget, not fetching {url}")
+    else:
         try:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(viewport={"width": 1920, "height": 1080})
+            with host_breaker.attempt() as call:
+                try:
+                    with resilience.deadline(SCRAPE_BUDGET_SECONDS):
+                        content = _fetch(url, selector, timeout, block_profile)
+                # Neither says anything about the host, so the call is released without a verdict
+                except resilience.DeadlineExceeded as e:
+                    print(f"   ⏱️ Scrape deadline hit ({url}): {e}")
+                except BrowserUnavailable as e:
+                    print(f"   🌐 Browser unavailable, not fetching {url}: {e}")
+                else:
+                    if content is None:
+                        call.failure()
+                    else:
+                        call.success()
+        except resilience.CircuitOpen as e:
+            print(f"   ⏭️ Skipping {url}: {e}")
 
-            page.goto(url, timeout=timeout)
+    if content is not None and config.ARCHIVE_PAGES:
+        _archive(url, content)
 
-            if selector:
-                page.wait_for_selector(selector, timeout=timeout)
+    if use_cache:
+        fetch_cache.put(url, selector, content)
+    return content
+
+
+def scrape_or_last_good(url, selector=None, timeout=60000):
+    """
+    (html, age_seconds): a normal scrape (age 0) or, when it fails or the host is cooling down, the
+    last good copy of the page up to LAST_GOOD_MAX_AGE_SECONDS old. (None, None) if neither exists.
+    Only for pages whose content does not depend on when it was fetched: the age is the caller's
+    to act on, and stale copies never enter the fetch cache.
+    """
+    html = scrape_dynamic_content(url, selector, timeout)
+    if html is not None:
+        resilience.last_good.put(url, html)
+        return html, 0
+    saved = resilience.last_good.get(url, LAST_GOOD_MAX_AGE_SECONDS)
+    if saved is None:
+        return None, None
+    print(f"   🗄️ Using the last good copy of {url} ({saved[1] / 60:.0f} min old)")
+    return saved
 
-            content = page.content()
-            browser.close()
-        except Exception as e:
-            print(f"❌ Scrape Error ({url}): {e}")
 
-    return content
\ No newline at end of file
+def scrape_soup(url, selector=None, timeout=60000, refresh=False):
+    """Like scrape_dynamic_content, but returns a (shared, cached) BeautifulSoup. Treat it as read-only."""
+    html = scrape_dynamic_content(url, selector, timeout, refresh=refresh)
+    if not html:
+        return None
+    return fetch_cache.get_soup(url, selector) or parsing.make_soup(html)
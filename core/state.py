@@ -0,0 +1,43 @@
+import os
+import copy
+import json
+import threading
+
+import config
+
+STATE_PATH = os.path.join(config.DATA_DIR, "state.json")
+
+_lock = threading.Lock()
+_state = None
+
+
+def _load():
+    global _state
+    if _state is None:
+        try:
+            with open(STATE_PATH) as f:
+                _state = json.load(f)
+        except (OSError, ValueError):
+            _state = {}
+    return _state
+
+
+def get(key, default=None):
+    """
+    Reads a small persisted value (watermarks, fingerprints, ...). The result is a private copy:
+    changing it has no effect until it is written back with put().
+    """
+    with _lock:
+        return copy.deepcopy(_load().get(key, default))
+
+
+def put(key, value):
+    """Persists a JSON-serializable value (a copy of it), rewriting the state file atomically."""
+    with _lock:
+        state = _load()
+        state[key] = copy.deepcopy(value)
+        os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+        tmp = STATE_PATH + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp, STATE_PATH)
@@ -0,0 +1,124 @@
+import os
+import json
+import base64
+import threading
+from array import array
+
+import config
+
+SERIES_DIR = os.path.join(config.DATA_DIR, "series")
+UNKNOWN = -1
+# A gap longer than this between two samples is not counted as open time
+MAX_SAMPLE_GAP_SECONDS = 15 * 60
+
+
+class DayBuffer:
+    """
+    One local day of (timestamp, status, value) samples per key, held in typed arrays:
+    timestamps and values are delta-encoded (uint32 seconds / int16), statuses are int8 codes.
+    About 7 bytes per sample; raw samples are dropped once the day is rolled up.
+    """
+
+    def __init__(self, day, start_ts):
+        self.day = day            # "YYYY-MM-DD" (local)
+        self.start_ts = start_ts  # epoch seconds of local midnight
+        self.meta = {}            # small job state persisted with the buffer (e.g. last aggregate window)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        s = self._series.get(key)
+        if s is None:
+            s = self._series[key] = {"t": array("I"), "s": array("b"), "v": array("h"),
+                                     "last_t": self.start_ts, "last_v": 0}
+        return s
+
+    def append(self, key, ts, status, value=UNKNOWN):
+        with self._lock:
+            s = self._get(key)
+            ts = max(int(ts), s["last_t"])
+            s["t"].append(ts - s["last_t"])
+            s["s"].append(status)
+            s["v"].append(int(value) - s["last_v"])
+            s["last_t"], s["last_v"] = ts, int(value)
+
+    def last(self, key):
+        """(ts, status, value) of the latest sample for key, or None."""
+        s = self._series.get(key)
+        if not s or not s["s"]:
+            return None
+        return s["last_t"], s["s"][-1], s["last_v"]
+
+    def keys(self):
+        return list(self._series)
+
+    def samples(self, key, start=None, end=None):
+        """Decoded [(ts, status, value)] for key, optionally within [start, end)."""
+        s = self._series.get(key)
+        if not s:
+            return []
+        out, ts, value = [], self.start_ts, 0
+        for dt, status, dv in zip(s["t"], s["s"], s["v"]):
+            ts += dt
+            value += dv
+            if (start is None or ts >= start) and (end is None or ts < end):
+                out.append((ts, status, value))
+        return out
+
+    def summarize(self, key, open_status, start=None, end=None):
+        """Samples, open minutes and mean/max value over open samples with a known value."""
+        samples = self.samples(key, start, end)
+        if not samples:
+            return None
+        open_seconds = 0
+        for (ts, status, _), (next_ts, _, _) in zip(samples, samples[1:]):
+            if status == open_status:
+                open_seconds += min(next_ts - ts, MAX_SAMPLE_GAP_SECONDS)
+        values = [v for _, status, v in samples if status == open_status and v != UNKNOWN]
+        return {
+            "samples": len(samples),
+            "open_minutes": round(open_seconds / 60),
+            "avg_value": round(sum(values) / len(values), 1) if values else None,
+            "max_value": max(values) if values else None,
+            "last_status": samples[-1][1],
+        }
+
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for s in self._series.values() for a in (s["t"], s["s"], s["v"]))
+
+    # -- persistence --
+    def to_dict(self):
+        enc = lambda a: base64.b64encode(a.tobytes()).decode("ascii")
+        return {"day": self.day, "start_ts": self.start_ts, "meta": self.meta,
+                "series": {k: {"t": enc(s["t"]), "s": enc(s["s"]), "v": enc(s["v"]),
+                               "last_t": s["last_t"], "last_v": s["last_v"]} for k, s in self._series.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        buf = cls(data["day"], data["start_ts"])
+        buf.meta = data.get("meta", {})
+        for key, s in data["series"].items():
+            arrays = {}
+            for name, code in (("t", "I"), ("s", "b"), ("v", "h")):
+                arrays[name] = array(code)
+                arrays[name].frombytes(base64.b64decode(s[name]))
+            buf._series[key] = {**arrays, "last_t": s["last_t"], "last_v": s["last_v"]}
+        return buf
+
+
+def load(name):
+    """The persisted buffer for a series (e.g. "lift_waits"), or None."""
+    try:
+        with open(os.path.join(SERIES_DIR, f"{name}.json")) as f:
+            return DayBuffer.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save(name, buffer):
+    os.makedirs(SERIES_DIR, exist_ok=True)
+    path = os.path.join(SERIES_DIR, f"{name}.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(buffer.to_dict(), f)
+    os.replace(tmp, path)
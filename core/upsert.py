@@ -0,0 +1,88 @@
+import json
+import hashlib
+
+from core import notion
+from core.mirror import mirror, plain_value, KEY_BUILDERS
+
+LATEST_FLAG = "Latest Report?"
+
+
+def _normalize(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return round(float(value), 3)
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return sorted(str(v) for v in value)
+    return str(value)
+
+
+def content_hash(values, fields):
+    """Stable hash of the given fields of a flattened row (mirror row or plain_value'd payload)."""
+    normalized = [_normalize(values.get(f)) for f in fields]
+    return hashlib.sha1(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+class Upserter:
+    """
+    Upserts rows keyed by a mirror index whose rows carry the "Latest Report?" flag.
+    Per key: identical content is skipped, changed content updates the live page in place,
+    no live page inserts a new one, and extra live duplicates get the flag cleared.
+    """
+
+    def __init__(self, db_name, database_id, key_name, hash_fields):
+        self.db_name = db_name
+        self.key_name = key_name
+        self.hash_fields = hash_fields
+        self.pipeline = notion.WritePipeline(database_id)
+        self.counts = {"inserted": 0, "updated": 0, "skipped": 0, "superseded": 0}
+
+    def upsert(self, key, props, label):
+        new_values = {name: plain_value(prop) for name, prop in props.items()}
+        new_hash = content_hash(new_values, self.hash_fields)
+        props = {**props, LATEST_FLAG: {"checkbox": True}}
+
+        live = mirror.lookup(self.db_name, self.key_name, key)
+        if not live:
+            # One insert per key and content, however often a failed run is retried
+            self.pipeline.add(props, label=label, key=f"{self.db_name}:{json.dumps(list(key))}:{new_hash}")
+            self.counts["inserted"] += 1
+            return "inserted"
+
+        # Keep an identical live row if there is one, otherwise the first
+        live.sort(key=lambda r: content_hash(r, self.hash_fields) != new_hash)
+        keep, superseded = live[0], live[1:]
+        for old in superseded:
+            self.pipeline.update(old["id"], {LATEST_FLAG: {"checkbox": False}}, label=f"{label} (superseded)")
+            self.counts["superseded"] += 1
+
+        if content_hash(keep, self.hash_fields) == new_hash:
+            self.counts["skipped"] += 1
+            return "skipped"
+        self.pipeline.update(keep["id"], props, label=f"{label} (updated)")
+        self.counts["updated"] += 1
+        return "updated"
+
+    def supersede(self, predicate, label):
+        """
+        Clears the flag on every live row whose key matches predicate(key), e.g. rows for dates an
+        upsert key will never be reused for again. Queued with the upserts, sent by flush().
+        """
+        build = KEY_BUILDERS[self.db_name][self.key_name]
+        for row in mirror.rows(self.db_name):
+            key = build(row)
+            if key is not None and predicate(key):
+                self.pipeline.update(row["id"], {LATEST_FLAG: {"checkbox": False}},
+                                     label=f"{label} (superseded)")
+                self.counts["superseded"] += 1
+
+    def flush(self):
+        results = self.pipeline.flush()
+        mirror.record_writes(self.db_name, results)
+        notion.report(results)
+        c = self.counts
+        print(f"   🧮 Upsert: {c['inserted']} inserted, {c['updated']} updated, "
+              f"{c['skipped']} unchanged, {c['superseded']} superseded")
+        return results
@@ -1,35 +1,123 @@
-import requests
 import base64
+import numpy as np
 from bs4 import BeautifulSoup
 from datetime import datetime
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from zoneinfo import ZoneInfo
 
-from internal_tools import NotionClient
-from cred import NOTION_TOKEN, GEMINI_API_KEY
+from cred import GEMINI_API_KEY
 import config
-from core import scraper, utils
+from core import scraper, utils, notion, metrics, analytics, resilience
+from core.resolver import resolver
+from core.image_cache import sky_cache, phash, time_bucket, load_rgb
+
+
+# --- LOCAL PRE-CLASSIFIER ---
+# Thresholds on 0-255 luminance and 0-1 saturation. Not validated on labelled webcam frames yet
+# (see benchmarks/sky_classifier.py), so they only catch extreme frames: a wrong local label is
+# worse than an unneeded Gemini call.
+NIGHT_MEAN_LUMA = 25
+NIGHT_P95_LUMA = 60
+FOG_MIN_MEAN_LUMA = 110
+FOG_MAX_LUMA_STD = 15
+FOG_MAX_SKY_SATURATION = 0.05
+FOG_MAX_SKY_STD = 6
+
+GEMINI_API = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+GEMINI_TIMEOUT_SECONDS = 30
+GEMINI_ATTEMPTS = 3
+WEBCAM_TIMEOUT_SECONDS = 15
+STATION_PAGE_TIMEOUT_SECONDS = 60
+# Per-camera deadline for download + classification, retries included
+SKY_BUDGET_SECONDS = 60
+# While a webcam or Gemini is unreachable, a camera keeps its last label for this long
+SKY_LAST_GOOD_MAX_AGE_SECONDS = 60 * 60
+
+
+def local_sky_classify(rgb):
+    """
+    Labels frames that are obvious from pixel statistics alone: "Night" (dark frame) and
+    "Foggy" (bright, grey, low-contrast frame). Returns None when the frame is ambiguous.
+    """
+    if rgb is None or rgb.size == 0:
+        return None
+    px = rgb.astype(np.float32)
+    luma = px @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+    if luma.mean() < NIGHT_MEAN_LUMA and np.percentile(luma, 95) < NIGHT_P95_LUMA:
+        return "Night"
+
+    # Sky region: top third of the frame
+    sky = px[:max(1, px.shape[0] // 3)]
+    mx, mn = sky.max(axis=2), sky.min(axis=2)
+    sky_saturation = np.where(mx > 0, (mx - mn) / np.maximum(mx, 1), 0).mean()
+    sky_std = luma[:sky.shape[0]].std()
+
+    if (luma.mean() > FOG_MIN_MEAN_LUMA and luma.std() < FOG_MAX_LUMA_STD
+            and sky_saturation < FOG_MAX_SKY_SATURATION and sky_std < FOG_MAX_SKY_STD):
+        return "Foggy"
+    return None
 
 
 # --- GEMINI AI ---
+def _last_sky(image_url):
+    saved = resilience.last_good.get(f"sky:{image_url}", SKY_LAST_GOOD_MAX_AGE_SECONDS)
+    if saved is None:
+        return None
+    print(f"      🗄️ Keeping the last sky condition: {saved[0]} ({saved[1] / 60:.0f} min old)")
+    return saved[0]
+
+
+@metrics.instrument("sky.analyze")
 def gemini_analyze_sky(image_url):
-    print(f"      ✨ Asking Gemini to analyze: ...{image_url[-20:]}")
+    """Sky condition for a webcam frame; falls back to the camera's last label when a source is down."""
+    with resilience.deadline(SKY_BUDGET_SECONDS):
+        result = _classify_sky(image_url)
+    if result:
+        resilience.last_good.put(f"sky:{image_url}", result)
+        return result
+    return _last_sky(image_url)
+
+
+def _classify_sky(image_url):
     try:
-        img_resp = requests.get(image_url)
+        with metrics.timed("webcam.download"):
+            img_resp = resilience.http("GET", image_url, WEBCAM_TIMEOUT_SECONDS)
         if img_resp.status_code != 200: return None
 
+        # Obvious frames (dark, uniform grey) never need a model call
+        with metrics.timed("sky.local"):
+            local = local_sky_classify(load_rgb(img_resp.content, max_width=160))
+        if local:
+            print(f"      🌓 Local classifier: {local}")
+            return local
+
+        # Near-duplicate frames (static night scene, unchanged cam) reuse the previous label
+        image_hash = phash(img_resp.content)
+        bucket = time_bucket(datetime.now(ZoneInfo("America/Vancouver")))
+        cached = sky_cache.get(image_hash, bucket)
+        if cached:
+            print(f"      ♻️ Reusing cached sky condition: {cached}")
+            return cached
+
+        print(f"      ✨ Asking Gemini to analyze: ...{image_url[-20:]}")
         b64_image = base64.b64encode(img_resp.content).decode("utf-8")
-        api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
+        api_url = f"{GEMINI_API}?key={GEMINI_API_KEY}"
         prompt = "Look at this ski resort webcam. Classify the sky condition into one word: Bluebird, Sunny, Cloudy, Overcast, Foggy, Night. If dark, say Night."
         payload = {"contents": [
             {"parts": [{"text": prompt}, {"inline_data": {"mime_type": "image/jpeg", "data": b64_image}}]}]}
 
-        response = requests.post(api_url, json=payload)
+        with metrics.timed("gemini.call"):
+            response = resilience.http("POST", api_url, GEMINI_TIMEOUT_SECONDS, attempts=GEMINI_ATTEMPTS,
+                                       json=payload)
         if response.status_code == 200:
             content = response.json()['candidates'][0]['content']['parts'][0]['text'].strip()
             print(f"      🤖 Gemini Result: {content}")
-            for cond in ["Bluebird", "Sunny", "Foggy", "Cloudy", "Overcast", "Night"]:
-                if cond in content: return cond
-            return "Cloudy"
+            result = next((c for c in ["Bluebird", "Sunny", "Foggy", "Cloudy", "Overcast", "Night"] if c in content),
+                          "Cloudy")
+            sky_cache.put(image_hash, bucket, result)
+            return result
     except Exception as e:
         print(f"      ⚠️ AI Analysis failed: {e}")
     return None
@@ -59,71 +147,117 @@ def extract_webcam_urls(page, indices, base_url):
     return found
 
 
+# --- STATION PIPELINE ---
+# Station pages are rendered by the shared browser thread, one at a time; these workers only queue
+# them and hand results on, so downloads + AI (on their own pool) overlap with the next render
+STATION_PAGE_WORKERS = 2
+ANALYSIS_WORKERS = 4
+
+_page_executor = ThreadPoolExecutor(max_workers=STATION_PAGE_WORKERS, thread_name_prefix="station-page")
+_analysis_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="station-ai")
+
+
+def _read_station_page(page, wp_url, webcams, call):
+    timeout = resilience.budget(STATION_PAGE_TIMEOUT_SECONDS) * 1000
+    try:
+        page.goto(wp_url, timeout=timeout)
+    except Exception:
+        call.failure()
+        raise
+    call.success()
+    temp_val = None
+    try:
+        temp_el = page.locator(".tempValue").first
+        if temp_el.count() > 0:
+            temp_val = utils.safe_float(temp_el.inner_text().replace("°C", ""))
+    except:
+        pass
+
+    imgs = extract_webcam_urls(page, webcams, wp_url) if webcams else []
+    return temp_val, imgs
+
+
+def _scrape_station(name, wp_url, webcams):
+    """Stage 1: temperature and webcam URLs from the station page, in an isolated browser context."""
+    print(f"Processing {name}...")
+    # Only webcam src attributes are needed, never the image bytes. A browser that fails to start
+    # releases the breaker call without a verdict; only navigation counts against the host.
+    with resilience.breaker(resilience.host_of(wp_url)).attempt() as call, metrics.labels(station=name), \
+            metrics.timed("station.page", url=wp_url):
+        return scraper.render(lambda page: _read_station_page(page, wp_url, webcams, call),
+                              block_profile="dom+xhr")
+
+
+def _analyze_station(name, imgs):
+    """Stage 2: sky condition for the first webcam (local classifier, cache, then Gemini)."""
+    condition = "Cloudy"
+    if imgs:
+        with metrics.labels(station=name):
+            ai_result = gemini_analyze_sky(imgs[0])
+        if ai_result: condition = ai_result
+    return condition
+
+
 # --- MAIN SYNC ---
 def sync_conditions():
     print("--- 🎿 Syncing Ski Conditions & Webcams ---")
 
-    client_stations = NotionClient(token=NOTION_TOKEN, database_id=config.DB_IDS['Weather Stations'])
-    # RESPONSE FIX
-    response = client_stations.query_database()
-    stations = response.get("results", []) if isinstance(response, dict) else response
-
-    client_conditions = NotionClient(token=NOTION_TOKEN, database_id=config.DB_IDS['Ski Conditions'])
-
-    with scraper.sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
-
-        for st in stations:
-            props = st['properties']
-            title_list = props.get('Name', {}).get('title', [])
-            if not title_list: continue
-            name = title_list[0]['text']['content']
-
-            wp_url = props.get('WhistlerPeak URL', {}).get('url')
-            rt = props.get('Webcams', {}).get('rich_text', [])
-            webcams = [int(x.strip()) for x in rt[0]['plain_text'].split(',') if x.strip().isdigit()] if rt else []
-
-            if not wp_url: continue
-            print(f"Processing {name}...")
-
-            try:
-                page.goto(wp_url, timeout=60000)
-                temp_val = None
-                try:
-                    temp_el = page.locator(".tempValue").first
-                    if temp_el.count() > 0:
-                        temp_val = utils.safe_float(temp_el.inner_text().replace("°C", ""))
-                except:
-                    pass
-
-                condition = "Cloudy"
-                imgs = []
-                if webcams:
-                    imgs = extract_webcam_urls(page, webcams, wp_url)
-                    if imgs:
-                        ai_result = gemini_analyze_sky(imgs[0])
-                        if ai_result: condition = ai_result
-
-                if temp_val is not None or imgs:
-                    P = client_conditions.Props
-                    row_props = {
-                        "Name": P.title(f"{name} - {datetime.now().strftime('%H:%M')}"),
-                        "Temperature": P.number(temp_val),
-                        "Weather Station": P.relation([st['id']]),
-                        "Condition": P.select(condition),
-                        "Date": P.date(datetime.now().isoformat())
-                    }
-                    if imgs:
-                        files_payload = [{"name": f"Cam {i + 1}", "type": "external", "external": {"url": u}} for i, u
-                                         in enumerate(imgs)]
-                        row_props["Files"] = {"files": files_payload}
-
-                    client_conditions.add_row(properties=row_props)
-                    print(f"✅ Uploaded {name} (Cond: {condition})")
-
-            except Exception as e:
-                print(f"Error {name}: {e}")
-
-        browser.close()
\ No newline at end of file
+    # Station rows come from the resolver's cached lookup table, not a fresh database read
+    stations = resolver.rows('Weather Stations')
+
+    P = notion.Props
+    pipeline = notion.WritePipeline(config.DB_IDS['Ski Conditions'])
+
+    # 1. Navigate station pages concurrently
+    page_futures = {}
+    for st in stations:
+        name = st.get('Name')
+        if not name: continue
+
+        wp_url = st.get('WhistlerPeak URL')
+        webcams = [int(x.strip()) for x in (st.get('Webcams') or '').split(',') if x.strip().isdigit()]
+
+        if not wp_url: continue
+        page_futures[metrics.submit(_page_executor, _scrape_station, name, wp_url, webcams)] = (st, name)
+
+    # 2. Hand each finished page to the analysis pool as soon as it is ready
+    analysis_futures = {}
+    for future in as_completed(page_futures):
+        st, name = page_futures[future]
+        try:
+            temp_val, imgs = future.result()
+        except Exception as e:
+            print(f"Error {name}: {e}")
+            continue
+        if temp_val is None and not imgs: continue
+        analysis_futures[metrics.submit(_analysis_executor, _analyze_station, name, imgs)] = (st, name, temp_val, imgs)
+
+    # 3. Queue uploads
+    readings = []
+    for future in as_completed(analysis_futures):
+        st, name, temp_val, imgs = analysis_futures[future]
+        try:
+            condition = future.result()
+        except Exception as e:
+            print(f"Error {name}: {e}")
+            continue
+
+        row_props = {
+            "Name": P.title(f"{name} - {datetime.now().strftime('%H:%M')}"),
+            "Temperature": P.number(temp_val),
+            "Weather Station": P.relation([st['id']]),
+            "Condition": P.select(condition),
+            "Date": P.date(datetime.now().isoformat())
+        }
+        if imgs:
+            files_payload = [{"name": f"Cam {i + 1}", "type": "external", "external": {"url": u}} for i, u
+                             in enumerate(imgs)]
+            row_props["Files"] = {"files": files_payload}
+
+        pipeline.add(row_props, label=f"{name} (Cond: {condition})")
+        readings.append({"station": name, "observed_at": datetime.now().astimezone(), "temperature_c": temp_val,
+                         "condition": condition})
+
+    notion.report(pipeline.flush())
+    analytics.append("conditions", readings)
+    print(sky_cache.summary())
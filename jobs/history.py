@@ -1,86 +1,95 @@
-import bs4
 import pandas as pd
 from datetime import datetime
-from internal_tools import NotionClient
 import config
-from cred import NOTION_TOKEN
-from core import scraper
+from core import scraper, notion, parsing, state, analytics
+from core.mirror import mirror
 
+WATERMARK_KEY = "history.watermark"
 
-def parse_ski_date(date_str):
-    try:
-        date_obj = datetime.strptime(date_str, "%b %d")
-    except ValueError:
-        return None
 
-    now = datetime.now()
-    year = now.year
-    # Logic: If month is May-Dec (5-12) and current month is Jan-May (1-5), it was last year.
-    if date_obj.month > 6 and now.month < 6:
-        year = now.year - 1
-    return date_obj.replace(year=year)
+def parse_ski_dates(dates, now=None):
+    """Parses a Series of 'Dec 8' strings into dates of the current season (NaT when unparseable)."""
+    now = now or datetime.now()
+    months = pd.to_datetime(dates.str[:3], format="%b", errors="coerce").dt.month
+    # Season rollover: Jul-Dec dates seen in Jan-May belong to last year
+    years = now.year - ((months > 6) & (now.month < 6)).astype(int)
+    return pd.to_datetime(dates + " " + years.astype(str), format="%b %d %Y", errors="coerce")
 
 
-def update_snow_history():
-    print("--- ❄️ Updating Snowfall History ---")
-
-    # 1. Scrape Website
-    html = scraper.scrape_dynamic_content(config.URLS["Snowfall History"], '.day-container')
-    if not html: return
-
-    soup = bs4.BeautifulSoup(html, "html.parser")
+def parse_history(html, now=None):
+    """
+    History table as a DataFrame (Date, Snowfall, Season, Base, DateObj, DateISO), or None if the
+    page has no history block. now pins the season rollover, e.g. to a replayed page's fetch time.
+    """
+    soup = parsing.make_soup(html, parse_only=parsing.region("div", id="content_history"))
     content = soup.find("div", id="content_history")
-    if not content: return
+    if not content: return None
 
     clean_lines = [line.strip() for line in content.text.split('\n') if line.strip()]
     try:
         idx = clean_lines.index('Base') + 1
         data_lines = clean_lines[idx:]
     except:
-        return
+        return None
 
     rows = []
     for i in range(0, len(data_lines), 4):
         row = data_lines[i:i + 4]
         if len(row) == 4: rows.append(row)
 
-    # 2. Process Scraped Data
     df = pd.DataFrame(rows, columns=["Date", "Snowfall", "Season", "Base"])
 
     # Clean numbers
     for col in ["Snowfall", "Season", "Base"]:
-        df[col] = df[col].astype(str).str.replace('cm', '').astype(float)
+        df[col] = pd.to_numeric(df[col].str.replace('cm', '', regex=False), errors="coerce")
 
-    df['DateObj'] = df['Date'].apply(lambda x: parse_ski_date(x))
+    df['DateObj'] = parse_ski_dates(df['Date'], now)
     df = df.dropna(subset=['DateObj'])
+    df['DateISO'] = df['DateObj'].dt.strftime("%Y-%m-%d")
+    return df
 
-    # 3. Fetch Existing Notion Data (As DataFrame)
-    client = NotionClient(token=NOTION_TOKEN, database_id=config.DB_IDS["Snowfall History"])
-
-    print("   📊 Querying Notion Data Source...")
-    existing_df = client.query_datasource(return_df=True)
 
-    existing_dates = set()
+def update_snow_history(reconcile=False):
+    """
+    Incremental by default: only rows newer than the persisted watermark date are uploaded and
+    Notion is not read at all. reconcile=True (or a missing watermark) re-syncs the full mirror
+    and checks every scraped row against it; run it with `python main.py --reconcile-history`.
+    """
+    print("--- ❄️ Updating Snowfall History ---")
 
-    # Extract existing dates directly from the DataFrame column
-    if existing_df is not None and not existing_df.empty:
-        # Check if the "Date" column exists (Title property)
-        if "Date" in existing_df.columns:
-            # Convert to string to ensure matching works ('2025-01-27')
-            existing_dates = set(existing_df["Date"].astype(str))
+    # 1. Scrape Website
+    html = scraper.scrape_dynamic_content(config.URLS["Snowfall History"], '.day-container')
+    if not html: return
 
-    print(f"   📊 Found {len(existing_dates)} existing records in Notion.")
+    # 2. Process Scraped Data
+    df = parse_history(html)
+    if df is None: return
+    scraped_dates = df['DateISO'].tolist()
+    analytics.append("snow_history", df.rename(columns={
+        "DateISO": "date", "Snowfall": "snowfall_cm", "Season": "season_cm", "Base": "base_cm"}))
+
+    # 3. Pick rows to upload
+    watermark = state.get(WATERMARK_KEY)
+
+    if watermark and not reconcile:
+        # ISO dates compare correctly as strings
+        df = df[df['DateISO'] > watermark]
+        print(f"   📊 Incremental: {len(df)} row(s) newer than {watermark}.")
+    else:
+        print("   📊 Reconciling against the full Notion mirror...")
+        mirror.sync("Snowfall History", full=True)
+        print(f"   📊 Found {mirror.count('Snowfall History')} existing records in Notion.")
+        # EXACT MATCH CHECK (indexed title lookup)
+        exists = df['DateISO'].map(lambda d: mirror.has("Snowfall History", "date", (d,)))
+        df = df[~exists.astype(bool)]
 
     # 4. Upload New Rows
-    count = 0
-    P = client.Props
-
-    for _, row in df.iterrows():
-        date_iso = row["DateObj"].strftime("%Y-%m-%d")
+    P = notion.Props
+    pipeline = notion.WritePipeline(config.DB_IDS["Snowfall History"])
 
-        # EXACT MATCH CHECK
-        if date_iso in existing_dates:
-            continue
+    # Unparseable numbers become None instead of NaN (which is not valid JSON)
+    for row in df.astype(object).where(df.notna(), None).to_dict("records"):
+        date_iso = row["DateISO"]
 
         props = {
             "Date": P.title(date_iso),
@@ -90,8 +99,18 @@ def update_snow_history():
             "Base (cm)": P.number(row["Base"]),
             "date": P.date(date_iso)
         }
-        client.add_row(properties=props)
-        count += 1
-        print(f"      + Added: {date_iso}")
+        pipeline.add(props, label=date_iso, key=f"history:{date_iso}")
+
+    results = pipeline.flush()
+    mirror.record_writes("Snowfall History", results)
+    count = notion.report(results)
+
+    # Advance the watermark only up to the day before the first failed upload; rows kept in the
+    # outbox are delivered by its replay, so they do not hold the watermark back
+    failed = [r["label"] for r in results if not r["ok"] and not r["queued"]]
+    safe_dates = [d for d in scraped_dates if not failed or d < min(failed)]
+    if watermark: safe_dates.append(watermark)
+    if safe_dates:
+        state.put(WATERMARK_KEY, max(safe_dates))
 
     print(f"✅ Sync Complete. Added {count} new records.")
\ No newline at end of file
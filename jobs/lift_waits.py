@@ -0,0 +1,207 @@
+import json
+import re
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import config
+from core import scraper, notion, timeseries, state, metrics
+from core.resolver import resolver
+
+SERIES_NAME = "lift_waits"
+ROLLUP_STATE_KEY = "lift_waits.rollups"
+ROLLUP_DAYS_KEPT = 120
+# Notion gets every status change plus one aggregate row per open lift per window
+AGGREGATE_MINUTES = 60
+
+# Vail-style terrain feeds use numeric statuses
+STATUS_CODES = {"closed": 0, "open": 1, "hold": 2, "scheduled": 3}
+STATUS_NAMES = {v: k.title() for k, v in STATUS_CODES.items()}
+_FEED_STATUS = {0: "closed", 1: "open", 2: "hold", 3: "scheduled"}
+
+VANCOUVER = ZoneInfo("America/Vancouver")
+
+# Properties the "Lift Wait Times" database needs (name -> Notion type); see the README
+SCHEMA = {
+    "Name": "title", "Kind": "select", "Time": "date", "Status": "select", "Lift": "relation",
+    "Wait (min)": "number", "Max Wait (min)": "number", "Open Minutes": "number", "Samples": "number",
+}
+_schema_ok = None
+
+
+class _LocalOnly:
+    """Stands in for the WritePipeline while the database does not fit SCHEMA: rows are dropped."""
+
+    def add(self, properties, label=None, key=None):
+        pass
+
+    def flush(self):
+        return []
+
+
+def _pipeline():
+    """
+    WritePipeline for "Lift Wait Times" once its schema has been checked (once per process). With
+    missing properties every write would fail with a 400 and sit in the outbox, so samples are only
+    kept locally until the database is fixed and the service restarted.
+    """
+    global _schema_ok
+    database_id = config.DB_IDS["Lift Wait Times"]
+    if _schema_ok is None:
+        try:
+            missing = notion.missing_properties(database_id, SCHEMA)
+        except Exception as e:
+            # Checked again on the next poll; writes go out (or to the outbox) meanwhile
+            print(f"   ⚠️ Could not check the Lift Wait Times schema: {e}")
+            return notion.WritePipeline(database_id)
+        _schema_ok = not missing
+        if missing:
+            print(f"   🔥 Lift Wait Times is missing {', '.join(missing)}; keeping lift samples local only.")
+    return notion.WritePipeline(database_id) if _schema_ok else _LocalOnly()
+
+
+def parse_lift_status(html):
+    """
+    [{"lift", "status", "wait"}] from the terrain status page, which embeds its data as
+    `TerrainStatusFeed = {..., "Lifts": [{"Name", "Status", "WaitTimeInMinutes"}, ...]}`.
+    wait is None when the feed has no wait time for the lift.
+    """
+    match = re.search(r"TerrainStatusFeed\s*=\s*", html)
+    if not match: return []
+    try:
+        feed, _ = json.JSONDecoder().raw_decode(html, match.end())
+    except ValueError:
+        return []
+
+    lifts = []
+    for lift in feed.get("Lifts", []):
+        raw = lift.get("Status")
+        status = _FEED_STATUS.get(raw) if isinstance(raw, int) else str(raw or "").strip().lower()
+        if not lift.get("Name") or status not in STATUS_CODES: continue
+        wait = lift.get("WaitTimeInMinutes")
+        lifts.append({"lift": lift["Name"].strip(), "status": status,
+                      "wait": int(wait) if isinstance(wait, (int, float)) and wait >= 0 else None})
+    return lifts
+
+
+def _local_midnight(now):
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _load_buffer(now):
+    """Today's buffer; a buffer left over from an earlier day is returned separately for its rollup."""
+    buffer = timeseries.load(SERIES_NAME)
+    today = now.strftime("%Y-%m-%d")
+    if buffer is not None and buffer.day == today:
+        return buffer, None
+    return timeseries.DayBuffer(today, int(_local_midnight(now).timestamp())), buffer
+
+
+def _props(P, lift, kind, when, status, extra=None):
+    props = {
+        "Name": P.title(f"{lift} - {when.strftime('%Y-%m-%d %H:%M')}"),
+        "Kind": P.select(kind),
+        "Time": P.date(when.isoformat()),
+        "Status": P.select(STATUS_NAMES[status]),
+    }
+    lift_id = resolver.find_id("Lifts", lift, exact=True)
+    if lift_id: props["Lift"] = P.relation([lift_id])
+    for name, value in (extra or {}).items():
+        props[name] = P.number(value)
+    return props
+
+
+def _aggregate_props(P, buffer, lift, kind, when, start=None, end=None):
+    s = buffer.summarize(lift, STATUS_CODES["open"], start, end)
+    # Lifts that never ran in the period produce no row
+    if not s or (not s["open_minutes"] and s["last_status"] != STATUS_CODES["open"]):
+        return None, s
+    return _props(P, lift, kind, when, s["last_status"], {
+        "Wait (min)": s["avg_value"], "Max Wait (min)": s["max_value"],
+        "Open Minutes": s["open_minutes"], "Samples": s["samples"]}), s
+
+
+def _flush_windows(P, pipeline, buffer, until):
+    """Queues the aggregate rows of every window that ended by `until`; returns how many."""
+    window = AGGREGATE_MINUTES * 60
+    aggregates = 0
+    buffer.meta.setdefault("window_start", until // window * window)
+    while buffer.meta["window_start"] + window <= until:
+        start = buffer.meta["window_start"]
+        for lift in buffer.keys():
+            props, _ = _aggregate_props(P, buffer, lift, "Aggregate",
+                                        datetime.fromtimestamp(start, VANCOUVER), start, start + window)
+            if props:
+                pipeline.add(props, label=f"{lift} ({AGGREGATE_MINUTES} min aggregate)")
+                aggregates += 1
+        buffer.meta["window_start"] = start + window
+    return aggregates
+
+
+def close_lift_day():
+    """
+    Sends the aggregates of windows that ended after the last poll of the day (the lifts close
+    on the hour, so the final window only completes once polling has stopped).
+    """
+    buffer = timeseries.load(SERIES_NAME)
+    if buffer is None or "window_start" not in buffer.meta: return
+    pipeline = _pipeline()
+    aggregates = _flush_windows(notion.Props, pipeline, buffer, int(datetime.now(VANCOUVER).timestamp()))
+    timeseries.save(SERIES_NAME, buffer)
+    notion.report(pipeline.flush())
+    print(f"   📈 {aggregates} closing aggregate(s) sent for {buffer.day}.")
+
+
+def poll_lift_status():
+    """
+    Samples every lift's status and wait time into the local day buffer. Notion only receives
+    status changes, one aggregate per open lift per AGGREGATE_MINUTES window and a daily rollup.
+    """
+    print("--- ⏳ Polling Lift Status ---")
+    # Polled every few minutes, so the shared 15-minute page cache must not answer
+    html = scraper.scrape_dynamic_content(config.URLS["Lift Status"], use_cache=False)
+    if not html: return
+    lifts = parse_lift_status(html)
+    if not lifts:
+        print("   ⚠️ No lift status feed found on the page.")
+        return
+
+    now = datetime.now(VANCOUVER)
+    ts = int(now.timestamp())
+    buffer, previous_day = _load_buffer(now)
+
+    P = notion.Props
+    pipeline = _pipeline()
+
+    # 1. Close out yesterday: windows close_lift_day never sent (service down), then one rollup
+    # row per lift that opened, kept locally as well
+    if previous_day is not None:
+        day_end = datetime.fromtimestamp(previous_day.start_ts, VANCOUVER) + timedelta(hours=23, minutes=59)
+        if "window_start" in previous_day.meta:
+            _flush_windows(P, pipeline, previous_day, int(day_end.timestamp()) + 60)
+        rollups = state.get(ROLLUP_STATE_KEY, {})
+        rollups[previous_day.day] = {}
+        for lift in previous_day.keys():
+            props, summary = _aggregate_props(P, previous_day, lift, "Daily", day_end)
+            rollups[previous_day.day][lift] = summary
+            if props: pipeline.add(props, label=f"{lift} ({previous_day.day} rollup)")
+        state.put(ROLLUP_STATE_KEY, dict(sorted(rollups.items())[-ROLLUP_DAYS_KEPT:]))
+
+    # 2. Record the samples; status changes go to Notion right away
+    changes = 0
+    for row in lifts:
+        code = STATUS_CODES[row["status"]]
+        last = buffer.last(row["lift"])
+        buffer.append(row["lift"], ts, code, timeseries.UNKNOWN if row["wait"] is None else row["wait"])
+        if last is not None and last[1] != code:
+            extra = {"Wait (min)": row["wait"]} if row["wait"] is not None else None
+            pipeline.add(_props(P, row["lift"], "Change", now, code, extra),
+                         label=f"{row['lift']} {STATUS_NAMES[last[1]]} -> {STATUS_NAMES[code]}")
+            changes += 1
+
+    # 3. Downsampled aggregates for every completed window
+    aggregates = _flush_windows(P, pipeline, buffer, ts)
+
+    with metrics.timed("lift_waits.save"):
+        timeseries.save(SERIES_NAME, buffer)
+    notion.report(pipeline.flush())
+    print(f"   📈 {len(lifts)} lifts sampled ({buffer.nbytes() / 1024:.1f} KB buffered today), "
+          f"{changes} status change(s), {aggregates} aggregate(s) sent.")
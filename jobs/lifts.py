@@ -1,20 +1,13 @@
-import bs4
 import pandas as pd
-from internal_tools import NotionClient
 import config
-from cred import NOTION_TOKEN
-from core import scraper
+from datetime import date
+from core import scraper, notion, parsing, analytics, fingerprint
+from core.mirror import mirror
 
 
-def sync_lift_info():
-    print("--- 🚠 Syncing Lift Information ---")
-
-    # 1. Scrape Lift Data
-    html = scraper.scrape_dynamic_content(config.URLS["Lifts"], ".row")
-    if not html:
-        return
-
-    soup = bs4.BeautifulSoup(html, "html.parser")
+def parse_lifts(html):
+    """Lift rows from the elevations page: [{"Lift Name", "Bottom Elevation (m)", "Top Elevation (m)"}]."""
+    soup = parsing.make_soup(html, parse_only=parsing.region("div", classes=["row"]))
     lift_data = []
 
     for row in soup.find_all('div', class_='row'):
@@ -29,34 +22,37 @@ def sync_lift_info():
                 "Bottom Elevation (m)": int(cells[1].get_text(strip=True).replace(',', '')),
                 "Top Elevation (m)": int(cells[2].get_text(strip=True).replace(',', ''))
             })
+    return lift_data
 
-    local_df = pd.DataFrame(lift_data)
-
-    # 2. Fetch Existing Notion Data
-    client = NotionClient(token=NOTION_TOKEN, database_id=config.DB_IDS["Lifts"])
 
-    # Handle response (list or dict)
-    response = client.query_database()
-    results = response.get("results", []) if isinstance(response, dict) else response
+def sync_lift_info():
+    print("--- 🚠 Syncing Lift Information ---")
 
-    existing_names = set()
+    # 1. Scrape Lift Data (lift elevations rarely change, so a recent copy will do while the site is down)
+    html, age = scraper.scrape_or_last_good(config.URLS["Lifts"], ".row")
+    if not html:
+        return
 
-    # ROBUST MATCHING: Find the Title property dynamically
-    for page in results:
-        props = page.get("properties", {})
-        title_content = ""
+    lift_data = parse_lifts(html)
+    local_df = pd.DataFrame(lift_data)
+    # A stale copy is still good for Notion, but it is not today's capture
+    if not age:
+        analytics.append("lifts", [{"captured_on": date.today(), "lift": r["Lift Name"],
+                                    "bottom_m": r["Bottom Elevation (m)"], "top_m": r["Top Elevation (m)"]}
+                                   for r in lift_data])
+
+    # Same table as last time: nothing to compare against Notion
+    fp = fingerprint.of(sorted(lift_data, key=lambda r: r["Lift Name"]))
+    if fingerprint.unchanged("lifts", fp):
+        print("   ✅ Lift table unchanged since the last sync, skipping Notion.")
+        return
 
-        # Loop through properties to find the one with type 'title'
-        # This fixes issues if your column is named "Name" instead of "Lift Name"
-        for prop_name, prop_data in props.items():
-            if prop_data.get("type") == "title":
-                title_list = prop_data.get("title", [])
-                if title_list:
-                    title_content = title_list[0]["text"]["content"]
-                break
+    # 2. Fetch Existing Notion Data (from the incrementally synced local mirror)
+    mirror.sync("Lifts")
 
-        if title_content:
-            existing_names.add(title_content.strip().lower())
+    # ROBUST MATCHING: the mirror indexes whichever property has type 'title'
+    # This fixes issues if your column is named "Name" instead of "Lift Name"
+    existing_names = {r["__title__"].strip().lower() for r in mirror.rows("Lifts") if r["__title__"]}
 
     print(f"   📊 Found {len(existing_names)} existing lifts in Notion.")
 
@@ -66,19 +62,25 @@ def sync_lift_info():
 
     if rows_to_add.empty:
         print("   ✅ No new lifts found. Database is up to date.")
+        fingerprint.remember("lifts", fp)
         return
 
     print(f"   🚀 Found {len(rows_to_add)} NEW lifts to add.")
 
     # 4. Upload
-    P = client.Props
+    P = notion.Props
+    pipeline = notion.WritePipeline(config.DB_IDS["Lifts"])
     for _, row in rows_to_add.iterrows():
         props = {
             "Lift Name": P.title(row["Lift Name"]),
             "Bottom Elevation (m)": P.number(row["Bottom Elevation (m)"]),
             "Top Elevation (m)": P.number(row["Top Elevation (m)"])
         }
-        client.add_row(properties=props)
-        print(f"      + Added: {row['Lift Name']}")
+        pipeline.add(props, label=row["Lift Name"], key=f"lifts:{row['Lift Name'].strip().lower()}")
 
+    results = pipeline.flush()
+    mirror.record_writes("Lifts", results)
+    notion.report(results)
+    if all(r["ok"] for r in results):
+        fingerprint.remember("lifts", fp)
     print("✅ Lift Sync Complete.")
\ No newline at end of file
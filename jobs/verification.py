@@ -0,0 +1,156 @@
+import pandas as pd
+from datetime import date, timedelta
+import config
+from core import analytics, notion, state
+from core.mirror import mirror
+
+STATE_KEY = "verification"
+# Sources whose forecasts carry precipitation amounts (RWDI only publishes temperatures)
+VERIFIED_SOURCES = ["snow-forecast"]
+PERIODS_PER_DAY = 3
+# The snow report for day D covers the 24h ending that morning, i.e. forecast day D-1 (AM + PM + Night)
+OBSERVATION_LAG_DAYS = 1
+# A day "has snow" from this much new snow (cm); used for hit / false-alarm counts
+SNOW_EVENT_CM = 2
+GROUP_COLS = ["source", "elevation", "lead_days"]
+COUNT_FIELDS = ["n", "sum_err", "sum_abs_err", "hits", "misses", "false_alarms", "correct_negatives"]
+
+
+def daily_forecasts(forecasts):
+    """
+    Collapses period rows to one daily snowfall total per issued forecast and keeps, for every
+    source/elevation/day/lead time, the last forecast issued at that lead. Partial days are dropped.
+    """
+    fc = forecasts.dropna(subset=["snow_cm"])
+    fc = fc.assign(issued_on=fc["report_time"].dt.tz_convert("America/Vancouver").dt.date)
+    daily = (fc.groupby(["source", "elevation", "report_time", "issued_on", "forecast_date"])
+             .agg(forecast_cm=("snow_cm", "sum"), periods=("period", "nunique"))
+             .reset_index())
+    daily = daily[daily["periods"] == PERIODS_PER_DAY]
+    daily["lead_days"] = (pd.to_datetime(daily["forecast_date"]) - pd.to_datetime(daily["issued_on"])).dt.days
+    daily = daily[daily["lead_days"] >= 0]
+    daily = (daily.sort_values("report_time")
+             .drop_duplicates(["source", "elevation", "forecast_date", "lead_days"], keep="last"))
+    daily["obs_date"] = pd.to_datetime(daily["forecast_date"]) + pd.Timedelta(days=OBSERVATION_LAG_DAYS)
+    return daily
+
+
+def score(daily, observed):
+    """Joins daily forecasts to observed snowfall and sums errors and contingency counts per group."""
+    obs = observed.assign(obs_date=pd.to_datetime(observed["date"]))[["obs_date", "snowfall_cm"]].dropna()
+    joined = daily.merge(obs, on="obs_date", how="inner")
+    if joined.empty:
+        return pd.DataFrame(columns=GROUP_COLS + COUNT_FIELDS)
+
+    err = joined["forecast_cm"] - joined["snowfall_cm"]
+    forecast_event = joined["forecast_cm"] >= SNOW_EVENT_CM
+    observed_event = joined["snowfall_cm"] >= SNOW_EVENT_CM
+    joined = joined.assign(
+        n=1, sum_err=err, sum_abs_err=err.abs(),
+        hits=(forecast_event & observed_event).astype(int),
+        misses=(~forecast_event & observed_event).astype(int),
+        false_alarms=(forecast_event & ~observed_event).astype(int),
+        correct_negatives=(~forecast_event & ~observed_event).astype(int))
+    return joined.groupby(GROUP_COLS)[COUNT_FIELDS].sum().reset_index()
+
+
+def _group_key(source, elevation, lead_days):
+    return f"{source}|{elevation}|{int(lead_days)}"
+
+
+def summary(groups=None):
+    """Bias, MAE and hit rates per source/elevation/lead time from the accumulated counts."""
+    groups = groups if groups is not None else state.get(STATE_KEY, {}).get("groups", {})
+    rows = []
+    for key, c in groups.items():
+        source, elevation, lead = key.split("|")
+        events = c["hits"] + c["misses"]
+        forecast_events = c["hits"] + c["false_alarms"]
+        rows.append({
+            "source": source, "elevation": elevation, "lead_days": int(lead), "n": c["n"],
+            "bias_cm": c["sum_err"] / c["n"], "mae_cm": c["sum_abs_err"] / c["n"],
+            # Share of observed snow days that were forecast (probability of detection)
+            "hit_rate": c["hits"] / events if events else None,
+            "false_alarm_ratio": c["false_alarms"] / forecast_events if forecast_events else None,
+            "accuracy": (c["hits"] + c["correct_negatives"]) / c["n"],
+        })
+    return pd.DataFrame(rows).sort_values(GROUP_COLS).reset_index(drop=True) if rows else pd.DataFrame()
+
+
+def _upload(table, touched):
+    database_id = config.DB_IDS.get("Forecast Verification")
+    if not database_id:
+        print("   ℹ️ No 'Forecast Verification' database configured, skipping the Notion summary.")
+        return
+    P = notion.Props
+    mirror.sync("Forecast Verification")
+    pipeline = notion.WritePipeline(database_id)
+
+    for row in table.to_dict("records"):
+        if _group_key(row["source"], row["elevation"], row["lead_days"]) not in touched: continue
+        title = f"{row['source']} {row['elevation']} +{row['lead_days']}d"
+        props = {
+            "Name": P.title(title),
+            "Source": P.select(row["source"]),
+            "Elevation": P.select(row["elevation"]),
+            "Lead Time (days)": P.number(row["lead_days"]),
+            "Samples": P.number(row["n"]),
+            "Bias (cm)": P.number(round(row["bias_cm"], 2)),
+            "MAE (cm)": P.number(round(row["mae_cm"], 2)),
+            "Hit Rate": P.number(None if pd.isna(row["hit_rate"]) else round(row["hit_rate"], 3)),
+            "False Alarm Ratio": P.number(None if pd.isna(row["false_alarm_ratio"])
+                                          else round(row["false_alarm_ratio"], 3)),
+            "Accuracy": P.number(round(row["accuracy"], 3)),
+        }
+        existing = mirror.lookup("Forecast Verification", "name", (title.lower(),))
+        if existing:
+            pipeline.update(existing[0]["id"], props, label=title)
+        else:
+            pipeline.add(props, label=title)
+
+    results = pipeline.flush()
+    mirror.record_writes("Forecast Verification", results)
+    notion.report(results)
+
+
+def update_verification():
+    """
+    Scores forecasts against the observed days added since the last run. Per-group sums live in
+    core.state, so each run reads only the new observation days and the forecasts that cover them.
+    """
+    print("--- 🎯 Verifying Forecasts ---")
+    saved = state.get(STATE_KEY, {})
+    verified_through = saved.get("verified_through")
+    groups = saved.get("groups", {})
+
+    # 1. New observation days only
+    filters = [("date", ">", date.fromisoformat(verified_through))] if verified_through else None
+    observed = analytics.read("snow_history", columns=["date", "snowfall_cm"], filters=filters)
+    if observed.empty:
+        print("   ✅ No new observed days to verify.")
+        return summary(groups)
+
+    # 2. Forecasts for exactly the days those observations cover
+    first = min(observed["date"]) - timedelta(days=OBSERVATION_LAG_DAYS)
+    last = max(observed["date"]) - timedelta(days=OBSERVATION_LAG_DAYS)
+    forecasts = analytics.read("forecasts", filters=[
+        ("source", "in", VERIFIED_SOURCES), ("forecast_date", ">=", first), ("forecast_date", "<=", last)])
+
+    # 3. Fold the new scores into the running sums
+    touched = set()
+    if not forecasts.empty:
+        for row in score(daily_forecasts(forecasts), observed).to_dict("records"):
+            key = _group_key(row["source"], row["elevation"], row["lead_days"])
+            acc = groups.setdefault(key, dict.fromkeys(COUNT_FIELDS, 0))
+            for field in COUNT_FIELDS:
+                acc[field] += float(row[field]) if field.startswith("sum") else int(row[field])
+            touched.add(key)
+
+    state.put(STATE_KEY, {"verified_through": max(observed["date"]).isoformat(), "groups": groups})
+    print(f"   📊 Scored {len(observed)} new day(s), {len(touched)} group(s) updated.")
+
+    # 4. Summary back to Notion
+    table = summary(groups)
+    if touched:
+        _upload(table, touched)
+    return table
@@ -1,66 +1,52 @@
-import bs4
 import re
 import pandas as pd
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from internal_tools import NotionClient
 
 # Internal Imports
 import config
-from cred import NOTION_TOKEN
-from core import scraper, utils
+from core import scraper, utils, notion, parsing, releases, metrics, analytics, fingerprint
+from core.mirror import mirror
+from core.resolver import resolver
+from core.upsert import Upserter
+
+# Fields that define a forecast's content; report time and title are excluded so re-publishing
+# an unchanged forecast is a no-op
+SNOW_FORECAST_HASH_FIELDS = ["Forecast Type", "Synopsis", "Daily Summary", "Precipitation Type",
+                             "Precipitation Amount", "High", "Low", "Freezing Level (m)"]
+RWDI_HASH_FIELDS = ["Daily Summary", "High", "Low"]
 
 
 # --- HELPER: Get Relation ID for Elevations ---
 def get_forecast_relation_id(search_term):
-    """Finds the Page ID for a specific elevation in the Elevations DB."""
-    client = NotionClient(token=NOTION_TOKEN, database_id=config.DB_IDS['Weather Forecast Elevations'])
-
-    # WORKAROUND: Fetch all rows and filter in Python to avoid API filter errors
-    response = client.query_database()
-    results = response.get("results", []) if isinstance(response, dict) else response
-
-    for page in results:
-        props = page.get("properties", {})
-        title_list = props.get("Weather Source + Elevation", {}).get("title", [])
-        if title_list:
-            title_text = title_list[0]["text"]["content"]
-            if search_term in title_text:
-                return page["id"]
-
-    return None
+    """Finds the Page ID for a specific elevation in the Elevations DB (memoized by the resolver)."""
+    return resolver.find_id('Weather Forecast Elevations', search_term)
 
 
 # --- HELPER: Check Existing Forecasts ---
 def fetch_existing_forecasts(elevation):
-    """Gets currently active forecasts to prevent duplicate entries."""
-    client = NotionClient(token=NOTION_TOKEN, database_id=config.DB_IDS['Weather Forecasts'])
-
+    """Refreshes the local mirror so upserts see every active forecast, not just the first page."""
     print(f"Checking Notion for existing {elevation} reports...")
+    mirror.sync('Weather Forecasts')
 
-    # WORKAROUND: Fetch recent rows and filter in Python
-    # (Notion API returns recent rows by default, so simple query usually suffices for recent checks)
-    response = client.query_database()
-    results = response.get("results", []) if isinstance(response, dict) else response
 
-    if not results: return None
+def forecast_upserter(hash_fields):
+    """Upserts keyed by (elevation, Forecast Date, Time of Day) among "Latest Report?" rows."""
+    return Upserter('Weather Forecasts', config.DB_IDS['Weather Forecasts'], 'latest_forecast', hash_fields)
 
-    # Python Filtering
-    filtered_results = []
-    for page in results:
-        props = page.get("properties", {})
 
-        # Check 1: Title starts with elevation
-        title_list = props.get("Elevation + Update Time", {}).get("title", [])
-        if not title_list or not title_list[0]["text"]["content"].startswith(elevation):
-            continue
+def supersede_earlier_days(upserter, elevation, forecast_date):
+    """
+    RWDI cards are filed under the day they were fetched, so a new day's cards never share a key
+    with the previous report's: clear the flag on every live row of this elevation from an earlier day.
+    """
+    upserter.supersede(lambda key: key[0] == elevation and (key[1] or "") < forecast_date,
+                       label=f"{elevation} earlier day")
 
-        # Check 2: Latest Report is Checked
-        is_latest = props.get("Latest Report?", {}).get("checkbox", False)
-        if is_latest:
-            filtered_results.append(page)
 
-    return client.results_to_dataframe(filtered_results)
+def release_source(elevation):
+    """Key under which core.releases tracks this elevation's publication times."""
+    return "rwdi" if elevation == "1800m" else f"snow-forecast {elevation}"
 
 
 # ==========================================
@@ -70,27 +56,45 @@ def update_forecast(elevation):
     print(f"--- ☁️ Processing {elevation} Forecast ---")
     url = config.URLS['Weather Forecast'][elevation]
 
-    if elevation == "1800m":
-        _process_rwdi_1800m(url, elevation)
-    else:
-        _process_snow_forecast(url, elevation)
+    with metrics.labels(elevation=elevation):
+        if elevation == "1800m":
+            _process_rwdi_1800m(url, elevation)
+        else:
+            _process_snow_forecast(url, elevation)
 
 
 # ==========================================
 # LOGIC A: SNOW-FORECAST.COM (1480m, 2248m)
 # ==========================================
-def _process_snow_forecast(url, elevation):
-    # 1. Scrape
-    html = scraper.scrape_dynamic_content(url, '.forecast-table')
-    if not html: return
-    soup = bs4.BeautifulSoup(html, "html.parser")
+# data-row name -> (cell selector, cell attribute); both None means the cell text
+FORECAST_ROWS = {
+    'days': (None, 'data-date'),
+    'time': (None, None),
+    'phrases': ('.forecast-table__phrase', None),
+    'snow': ('.snow-amount__value', None),
+    'rain': ('.rain-amount__value', None),
+    'temperature-max': ('.temp-value', None),
+    'temperature-min': ('.temp-value', None),
+    'freezing-level': ('.level-value', None),
+    'wind': (None, None),
+}
+
+
+def parse_snow_forecast(html, now=None):
+    """
+    Report metadata and per-period rows ("periods", empty without a table) of a snow-forecast.com 6-day page.
+    The report time is derived from "Updated: N min/hours ago" relative to now (default: current
+    Vancouver time), with report_precision_minutes set when the page gave one.
+    """
+    # Only the metadata blocks are parsed into a soup; the table has its own single-pass extractor
+    soup = parsing.make_soup(html, parse_only=parsing.region("div", classes=[
+        "weather-intro", "about-weather-summary__content"]))
 
-    meta_dict = {}
     vancouver_tz = ZoneInfo("America/Vancouver")
-    now_van = datetime.now(vancouver_tz)
-    report_dt_obj = now_van
+    now_van = (now or datetime.now(vancouver_tz)).astimezone(vancouver_tz)
+    report = {"report_time": now_van, "report_precision_minutes": None}
 
-    # 2. Extract Metadata
+    # 1. Extract Metadata
     intro_div = soup.find("div", class_="weather-intro")
     if intro_div:
         text = intro_div.get_text(strip=True)
@@ -98,70 +102,76 @@ def _process_snow_forecast(url, elevation):
         if match:
             delta = timedelta(minutes=int(match.group(1))) if "min" in match.group(2) else timedelta(
                 hours=int(match.group(1)))
-            report_dt_obj = now_van - delta
+            report["report_time"] = now_van - delta
+            # "2 hour" is only hour-accurate
+            report["report_precision_minutes"] = 1 if "min" in match.group(2) else 60
 
-    h = report_dt_obj.hour
-    meta_dict["Edition"] = "AM" if h < 12 else ("PM" if h < 18 else "Night")
+    h = report["report_time"].hour
+    report["Edition"] = "AM" if h < 12 else ("PM" if h < 18 else "Night")
 
-    meta_dict["Synopsis"] = "No synopsis"
+    report["Synopsis"] = "No synopsis"
     summ_div = soup.find('div', class_='about-weather-summary__content')
     if summ_div:
         txt = summ_div.get_text(" ", strip=True)
         if "Weather (Next 3 days):" in txt:
-            meta_dict["Synopsis"] = txt.split('):', 1)[-1].strip()
-
-    # 3. Extract Table Data
-    table = soup.find('table', class_='forecast-table__table')
-    if not table: return
-
-    def get_row(name, sel=None, attr=None):
-        data = []
-        row = table.find('tr', attrs={'data-row': name})
-        if row:
-            for cell in row.find_all('td'):
-                colspan = int(cell.get('colspan', 1))
-                val = "-"
-                if attr:
-                    val = cell.get(attr)
-                elif sel:
-                    el = cell.select_one(sel)
-                    if el: val = el.get_text(strip=True)
-                else:
-                    val = cell.get_text(strip=True)
-                for _ in range(colspan): data.append(val)
-        return data
-
-    dates = get_row('days', attr='data-date')
-    times = ["Night" if t == "night" else t for t in get_row('time')]
-    summaries = get_row('phrases', '.forecast-table__phrase')
-    snows = get_row('snow', '.snow-amount__value')
-    rains = get_row('rain', '.rain-amount__value') or ["-"] * len(dates)
-    highs = get_row('temperature-max', '.temp-value')
-    lows = get_row('temperature-min', '.temp-value')
-    freezing_levels = get_row('freezing-level', '.level-value')
-    winds = get_row('wind')
-
-    # 4. Upload
-    client = NotionClient(token=NOTION_TOKEN, database_id=config.DB_IDS['Weather Forecasts'])
-    P = client.Props
+            report["Synopsis"] = txt.split('):', 1)[-1].strip()
+
+    # 2. Extract Table Data
+    rows = parsing.extract_table_rows(html, FORECAST_ROWS)
+    report["periods"] = []
+    if not rows: return report
+
+    dates = rows['days']
+    rains = rows['rain'] or ["-"] * len(dates)
+    report["periods"] = [{
+        "date": dates[i],
+        "period": "Night" if rows['time'][i] == "night" else rows['time'][i],
+        "summary": rows['phrases'][i],
+        "snow": rows['snow'][i],
+        "rain": rains[i],
+        "high": rows['temperature-max'][i],
+        "low": rows['temperature-min'][i],
+        "freezing_level": rows['freezing-level'][i],
+        "wind": rows['wind'][i] if i < len(rows['wind']) else None,
+    } for i in range(len(dates))]
+    return report
+
+
+def _process_snow_forecast(url, elevation):
+    # 1. Scrape. Always fresh: the daemon wakes a few minutes after a release, well inside the fetch
+    # cache TTL, and a cached copy would hide the release and re-date "Updated N min ago" to now
+    html = scraper.scrape_dynamic_content(url, '.forecast-table', refresh=True)
+    if not html: return
+
+    # 2. Parse
+    report = parse_snow_forecast(html)
+    if report["report_precision_minutes"]:
+        # Feeds the release predictor used by the scheduler
+        releases.record(release_source(elevation), report["report_time"], report["report_precision_minutes"])
+    if not report["periods"]: return
+    report_dt_obj = report["report_time"]
+
+    # The report time drifts with "Updated: N min ago", so only the published content is hashed
+    fp = fingerprint.of([report["Edition"], report["Synopsis"], report["periods"]])
+    if fingerprint.unchanged(f"forecast {elevation}", fp):
+        print(f"   ✅ {elevation} forecast unchanged since the last upload, skipping Notion.")
+        return
+
+    # 3. Upload
+    P = notion.Props
     rel_id = get_forecast_relation_id(elevation)
 
     # Existing Check
-    existing_df = fetch_existing_forecasts(elevation)
-    existing_keys = set()
-    if existing_df is not None and not existing_df.empty:
-        for _, row in existing_df.iterrows():
-            if row.get('Forecast Date') and row.get('Time of Day'):
-                existing_keys.add((row['Forecast Date'], row['Time of Day']))
+    fetch_existing_forecasts(elevation)
+    upserter = forecast_upserter(SNOW_FORECAST_HASH_FIELDS)
+    cleaned = []
 
-    for i in range(len(dates)):
-        date_key = dates[i]
-        period = times[i]
+    for row in report["periods"]:
+        date_key = row["date"]
+        period = row["period"]
 
-        if (date_key, period) in existing_keys: continue
-
-        s_val = utils.clean_notion_number(snows[i])
-        r_val = utils.clean_notion_number(rains[i])
+        s_val = utils.clean_notion_number(row["snow"])
+        r_val = utils.clean_notion_number(row["rain"])
         p_type = "Snow" if s_val > 0 else ("Rain" if r_val > 0 else "None")
         p_amount = s_val if s_val > 0 else r_val
 
@@ -170,73 +180,125 @@ def _process_snow_forecast(url, elevation):
             "Report Date": P.date(report_dt_obj.isoformat()),
             "Forecast Date": P.date(date_key),
             "Time of Day": P.select(period),
-            "Forecast Type": P.rich_text(meta_dict["Edition"]),
-            "Synopsis": P.rich_text(meta_dict["Synopsis"][:2000]),
-            "Daily Summary": P.rich_text(summaries[i]),
+            "Forecast Type": P.rich_text(report["Edition"]),
+            "Synopsis": P.rich_text(report["Synopsis"][:2000]),
+            "Daily Summary": P.rich_text(row["summary"]),
             "Precipitation Type": P.select(p_type),
             "Precipitation Amount": P.number(p_amount),
-            "High": P.number(utils.clean_notion_number(highs[i])),
-            "Low": P.number(utils.clean_notion_number(lows[i])),
-            "Freezing Level (m)": P.number(utils.clean_notion_number(freezing_levels[i]))
+            "High": P.number(utils.clean_notion_number(row["high"])),
+            "Low": P.number(utils.clean_notion_number(row["low"])),
+            "Freezing Level (m)": P.number(utils.clean_notion_number(row["freezing_level"]))
         }
 
         if rel_id: props["Forecast Elevation"] = P.relation([rel_id])
-        client.add_row(properties=props)
-        print(f"✅ Uploaded {date_key} ({period})")
+        upserter.upsert((elevation, date_key, period), props, label=f"{date_key} ({period})")
+        cleaned.append({"elevation": elevation, "source": "snow-forecast", "report_time": report_dt_obj,
+                        "forecast_date": date_key, "period": period, "summary": row["summary"],
+                        "precip_type": p_type, "precip_amount": p_amount, "snow_cm": s_val, "rain_mm": r_val,
+                        "high_c": utils.clean_notion_number(row["high"]),
+                        "low_c": utils.clean_notion_number(row["low"]),
+                        "freezing_level_m": utils.clean_notion_number(row["freezing_level"])})
+
+    if all(r["ok"] for r in upserter.flush()):
+        fingerprint.remember(f"forecast {elevation}", fp)
+    analytics.append("forecasts", cleaned)
 
 
 # ==========================================
 # LOGIC B: RWDI / 1800m
 # ==========================================
-def _process_rwdi_1800m(url, elevation):
-    html = scraper.scrape_dynamic_content(url, '.alpine__container')
-    if not html: return
-    soup = bs4.BeautifulSoup(html, "html.parser")
-
-    meta_dict = {}
+def parse_rwdi(soup, now=None):
+    """
+    RWDI alpine forecast from a parsed page: {"report_date" (UTC ISO or None), "forecast_date",
+    "cards": [{"day_name", "summary", "high", "low"}]}. forecast_date is the day of `now`.
+    """
+    report = {"report_date": None, "forecast_date": (now or datetime.now()).strftime("%Y-%m-%d"), "cards": []}
     time_blocks = soup.find_all("div", class_='alpine__time-container')
     if len(time_blocks) >= 1:
         txt = time_blocks[0].get_text(" ", strip=True)
         if "Report date:" in txt:
             clean_date = txt.split("Report date:")[1].split("Forecast")[0].strip().rstrip('.')
-            meta_dict["Report Date"] = utils.parse_whistler_date(clean_date.split(' ', 1)[1])
-
-    cards = soup.find_all("div", class_="alpine__card")
-    client = NotionClient(token=NOTION_TOKEN, database_id=config.DB_IDS['Weather Forecasts'])
-    P = client.Props
-    rel_id = get_forecast_relation_id(elevation)
+            report["report_date"] = utils.parse_whistler_date(clean_date.split(' ', 1)[1])
 
-    for card in cards:
-        day_name = card.find("h3", class_="alpine__card-period").get_text(strip=True)
-        summary = card.find("p", class_="alpine__card-summary").get_text(strip=True)
+    for card in soup.find_all("div", class_="alpine__card"):
         temps = card.find("p", class_="alpine__card-temps").get_text(strip=True)
         high = re.search(r'High\s*([-\d]+)', temps)
         low = re.search(r'Low\s*([-\d]+)', temps)
+        report["cards"].append({
+            "day_name": card.find("h3", class_="alpine__card-period").get_text(strip=True),
+            "summary": card.find("p", class_="alpine__card-summary").get_text(strip=True),
+            "high": int(high.group(1)) if high else 0,
+            "low": int(low.group(1)) if low else 0,
+        })
+    return report
 
+
+def _process_rwdi_1800m(url, elevation):
+    soup = scraper.scrape_soup(url, '.alpine__container', refresh=True)
+    if not soup: return
+
+    report = parse_rwdi(soup)
+    if report["report_date"]:
+        releases.record(release_source(elevation), datetime.fromisoformat(report["report_date"].replace("Z", "+00:00")))
+
+    # Report date, cards and the day they are filed under; a new day re-files the same cards
+    fp = fingerprint.of(report)
+    if fingerprint.unchanged(f"forecast {elevation}", fp):
+        print(f"   ✅ {elevation} forecast unchanged since the last upload, skipping Notion.")
+        return
+
+    P = notion.Props
+    rel_id = get_forecast_relation_id(elevation)
+
+    # Existing Check (previously every card was inserted on every run)
+    fetch_existing_forecasts(elevation)
+    upserter = forecast_upserter(RWDI_HASH_FIELDS)
+    forecast_date = report["forecast_date"]
+
+    for card in report["cards"]:
+        day_name = card["day_name"]
         props = {
             "Elevation + Update Time": P.title(f"{elevation} - {datetime.now().strftime('%H:%M')}"),
-            "Forecast Date": P.date(datetime.now().strftime("%Y-%m-%d")),
+            "Forecast Date": P.date(forecast_date),
             "Time of Day": P.select(day_name),
-            "Daily Summary": P.rich_text(summary),
-            "High": P.number(int(high.group(1)) if high else 0),
-            "Low": P.number(int(low.group(1)) if low else 0)
+            "Daily Summary": P.rich_text(card["summary"]),
+            "High": P.number(card["high"]),
+            "Low": P.number(card["low"])
         }
 
         if rel_id: props["Forecast Elevation"] = P.relation([rel_id])
-        client.add_row(properties=props)
-        print(f"✅ Uploaded {day_name}")
+        upserter.upsert((elevation, forecast_date, day_name), props, label=day_name)
+
+    if report["cards"]:
+        supersede_earlier_days(upserter, elevation, forecast_date)
+
+    if all(r["ok"] for r in upserter.flush()):
+        fingerprint.remember(f"forecast {elevation}", fp)
+    report_time = report["report_date"] or datetime.now().astimezone()
+    analytics.append("forecasts", [{"elevation": elevation, "source": "rwdi", "report_time": report_time,
+                                    "forecast_date": forecast_date, "period": c["day_name"], "summary": c["summary"],
+                                    "high_c": c["high"], "low_c": c["low"]} for c in report["cards"]])
 
 
 # ==========================================
 # SCHEDULER
 # ==========================================
-def get_time_until_update():
+def get_time_until_update(elevation="1480m"):
+    """Minutes until snow-forecast.com's next update for this elevation's page (60 if unknown)."""
     print("--- ⏱️ Checking Schedule ---")
-    url = config.URLS['Weather Forecast']['1480m']
+    url = config.URLS['Weather Forecast'][elevation]
+    # Served from the fetch cache when _process_snow_forecast just rendered this page
     html = scraper.scrape_dynamic_content(url, '.forecast-table')
     if not html: return 60
 
-    soup = bs4.BeautifulSoup(html, "html.parser")
+    minutes = parse_time_until_update(html)
+    return 60 if minutes is None else minutes
+
+
+def parse_time_until_update(html):
+    """The "next update in Xh Ym" countdown of a snow-forecast.com page, in minutes (None if absent)."""
+    soup = parsing.make_soup(html, parse_only=parsing.region("span", classes=["location-issued__update"]))
+
     update_node = soup.find("span", class_="location-issued__update")
 
     if update_node:
@@ -246,4 +308,4 @@ def get_time_until_update():
             return h * 60 + m
         except:
             pass
-    return 60
\ No newline at end of file
+    return None
\ No newline at end of file
@@ -1,24 +1,103 @@
-from jobs import lifts, weather, history, conditions
+from jobs import lifts, lift_waits, weather, history, conditions, verification
+import sys
+import time
+from core import scraper, runner, metrics, notion, resilience
+from core.scheduler import ScheduledJob, Daily, Every, AfterRelease, PredictedRelease
+
+FORECAST_ELEVATIONS = ["1480m", "1800m", "2248m"]
+
+# Daemon cadences (America/Vancouver local time)
+CONDITIONS_INTERVAL_MINUTES = 30
+DAYLIGHT_HOURS = (7, 18)
+RWDI_RELEASE_TIMES = ("05:30", "15:30")
+LIFT_POLL_MINUTES = 3
+LIFT_HOURS = (8, 17)
+OUTBOX_REPLAY_MINUTES = 10
+# Hard ceiling for one run_all_tasks cycle; each job also has its own runner timeout
+CYCLE_BUDGET_SECONDS = 20 * 60
+
+
+def build_jobs():
+    forecast_jobs = [runner.Job(f"forecast {e}", weather.update_forecast, e) for e in FORECAST_ELEVATIONS]
+    return [
+        # 1. Static Data
+        runner.Job("lifts", lifts.sync_lift_info),
+        runner.Job("lift status", lift_waits.poll_lift_status),
+        runner.Job("history", history.update_snow_history),
+        # 2. Conditions (Webcams/AI)
+        runner.Job("conditions", conditions.sync_conditions),
+        # 3. Forecasts
+        *forecast_jobs,
+        # 4. Schedule (reads the 1480m page the forecast job already rendered)
+        runner.Job("schedule", weather.get_time_until_update,
+                   depends_on=[j.name for j in forecast_jobs], timeout=5 * 60),
+        # 5. Verification (scores the forecasts stored so far against the new history days)
+        runner.Job("verification", verification.update_verification,
+                   depends_on=["history", *[j.name for j in forecast_jobs]], timeout=5 * 60),
+    ]
+
+
+def _snow_forecast_cycle(elevation):
+    """Uploads the forecast and returns the minutes until snow-forecast.com's next release."""
+    weather.update_forecast(elevation)
+    return weather.get_time_until_update(elevation)
+
+
+def build_schedule():
+    """Per-job cadences for service.py: each source is polled only when it may have changed."""
+    return [
+        ScheduledJob("lifts", lifts.sync_lift_info, Daily("04:00")),
+        # Delivers Notion writes that failed on a transient error (Notion down, rate limited)
+        ScheduledJob("outbox", notion.replay_outbox, Every(OUTBOX_REPLAY_MINUTES)),
+        ScheduledJob("lift status", lift_waits.poll_lift_status, Every(LIFT_POLL_MINUTES, *LIFT_HOURS),
+                     jitter_seconds=15),
+        # The last aggregate window only completes once polling has stopped for the day
+        ScheduledJob("lift day close", lift_waits.close_lift_day, Daily(f"{LIFT_HOURS[1]:02d}:05")),
+        # After the morning snow report
+        ScheduledJob("history", history.update_snow_history, Daily("07:30")),
+        ScheduledJob("verification", verification.update_verification, Daily("08:00")),
+        ScheduledJob("conditions", conditions.sync_conditions,
+                     Every(CONDITIONS_INTERVAL_MINUTES, *DAYLIGHT_HOURS), jitter_seconds=120),
+        # Forecasts wake after each source's learned release window; until enough releases have
+        # been observed, snow-forecast.com falls back to its page countdown and RWDI to fixed times
+        *[ScheduledJob(f"forecast {e}", _snow_forecast_cycle,
+                       PredictedRelease(weather.release_source(e), fallback=AfterRelease()), e)
+          for e in ("1480m", "2248m")],
+        ScheduledJob("forecast 1800m", weather.update_forecast,
+                     PredictedRelease(weather.release_source("1800m"), fallback=Daily(*RWDI_RELEASE_TIMES)), "1800m"),
+    ]
 
 
 def run_all_tasks():
     print("🚀 Starting All Tasks...", flush=True)
+    start = time.perf_counter()
 
-    # 1. Static Data
-    lifts.sync_lift_info()
-    history.update_snow_history()
+    with resilience.deadline(CYCLE_BUDGET_SECONDS):
+        # Writes a previous run could not deliver go out before anything new is queued; if that
+        # fails, the jobs still run and their own writes wait in the outbox
+        try:
+            notion.replay_outbox(startup=True)
+        except Exception as e:
+            print(f"🔥 Outbox replay failed: {e}")
 
-    # 2. Conditions (Webcams/AI)
-    conditions.sync_conditions()
+        # Independent jobs hit different sites and databases, so they run side by side
+        results = runner.run_jobs(build_jobs())
+    print(runner.summarize(results))
+    for b in resilience.open_breakers():
+        print(f"🔴 {b.name}: breaker {b.state} ({b.failures} failures)")
 
-    # 3. Forecasts
-    weather.update_forecast("1480m")
-    weather.update_forecast("1800m")
-    weather.update_forecast("2248m")
+    status = "ok" if all(r["status"] == "ok" for r in results.values()) else "degraded"
+    metrics.write_cycle_summary("run_all_tasks", status, time.perf_counter() - start)
 
-    # 4. Schedule
-    return weather.get_time_until_update()
+    # Pages are only reused within one cycle
+    print(scraper.fetch_cache.summary())
+    scraper.fetch_cache.clear()
+    return results["schedule"]["result"]
 
 
 if __name__ == "__main__":
-    run_all_tasks()
\ No newline at end of file
+    if "--reconcile-history" in sys.argv:
+        # Re-syncs the whole snow history mirror (edits or deletions made in Notion, lost watermark)
+        history.update_snow_history(reconcile=True)
+    else:
+        run_all_tasks()
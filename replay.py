@@ -0,0 +1,67 @@
+"""
+Re-runs the job parsers over pages stored by core.archive (set config.ARCHIVE_PAGES to record).
+No browser and no network: every page comes from local disk.
+
+    python replay.py                                   # list archived URLs
+    python replay.py "forecast 2248m" --since 2025-12-01 > forecasts.jsonl
+"""
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import config
+from core import parsing
+from core.archive import archive
+from jobs import lifts, history, weather
+
+
+def _history(html, fetched_at):
+    df = history.parse_history(html, now=fetched_at)
+    if df is None: return []
+    df = df[["DateISO", "Snowfall", "Season", "Base"]]
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+# Replay source -> (archived URL, parser(html, fetched_at))
+SOURCES = {
+    "lifts": (config.URLS["Lifts"], lambda html, at: lifts.parse_lifts(html)),
+    "history": (config.URLS["Snowfall History"], _history),
+    "forecast 1480m": (config.URLS["Weather Forecast"]["1480m"], weather.parse_snow_forecast),
+    "forecast 2248m": (config.URLS["Weather Forecast"]["2248m"], weather.parse_snow_forecast),
+    "forecast 1800m": (config.URLS["Weather Forecast"]["1800m"],
+                       lambda html, at: weather.parse_rwdi(parsing.make_soup(html), now=at)),
+}
+
+
+def replay(source, since=None, until=None, distinct=True):
+    """Yields (fetched_at, parsed) for every archived version of the source's page."""
+    url, parse = SOURCES[source]
+    for fetched_at, html in archive.replay(url, since, until, distinct=distinct):
+        yield fetched_at, parse(html, fetched_at)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay archived pages through the job parsers (JSON lines on stdout).")
+    ap.add_argument("source", nargs="?", choices=sorted(SOURCES))
+    ap.add_argument("--since", type=datetime.fromisoformat)
+    ap.add_argument("--until", type=datetime.fromisoformat)
+    ap.add_argument("--all", action="store_true", help="parse every fetch, not just each distinct page version")
+    args = ap.parse_args()
+
+    if not args.source:
+        for url, fetches, versions, first, last in archive.urls():
+            print(f"{url}\n   {fetches} fetch(es), {versions} version(s), {first[:16]} -> {last[:16]}")
+        return
+
+    start, count = time.perf_counter(), 0
+    for fetched_at, parsed in replay(args.source, args.since, args.until, distinct=not args.all):
+        print(json.dumps({"source": args.source, "fetched_at": fetched_at.isoformat(), "data": parsed}, default=str))
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"🔁 Replayed {count} page(s) of {args.source} in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
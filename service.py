@@ -1,7 +1,8 @@
-import time
 import logging
 import sys
 import main
+from core import metrics, notion
+from core.scheduler import Scheduler
 
 # Configure logging to show in Systemd/Journalctl
 logging.basicConfig(
@@ -10,33 +11,27 @@ logging.basicConfig(
     handlers=[logging.StreamHandler(sys.stdout)]  # Print to console/systemd
 )
 
-if __name__ == "__main__":
-    logging.info("Service started - Adaptive Scheduler Running")
-
-    while True:
-        try:
-            # 1. Run task and get dynamic delay (in MINUTES)
-            wait_minutes = main.run_task()
-
-            # Safety check: If calculation failed or returned 0/None
-            if not wait_minutes or wait_minutes < 1:
-                logging.warning("⚠️ Received 0 or None for wait time. Defaulting to 60 minutes.")
-                wait_minutes = 60
+def write_metrics(job_name, outcome):
+    """One JSON summary line per job run, plus a refreshed Prometheus textfile."""
+    record = metrics.write_cycle_summary(job_name, outcome["status"], outcome["seconds"], job=job_name)
+    slowest = ", ".join(f"{stage} {s['total_s']:.1f}s" for stage, s in list(record["stages"].items())[:3])
+    logging.info(f"📈 {job_name} hot spots: {slowest or 'n/a'}")
 
-            # 2. Log the sleep time clearly
-            logging.info(f"--- 💤 Sleeping for {wait_minutes:.1f} minutes ---")
 
-            # 3. Sleep (Convert Minutes -> Seconds)
-            time.sleep(wait_minutes * 60)
-
-        except KeyboardInterrupt:
-            # Allow you to Ctrl+C if running manually
-            logging.info("Stopping service manually.")
-            break
+if __name__ == "__main__":
+    logging.info("Service started - Adaptive Scheduler Running")
 
-        except Exception as e:
-            # 4. Crash Handling: If main.py crashes, don't kill the service.
-            # Log the error, wait 1 minute, and try again.
-            logging.error(f"🔥 CRASH OCCURRED: {e}")
-            logging.info("Retrying in 60 seconds...")
-            time.sleep(60)
\ No newline at end of file
+    # Resume from the outbox: writes left pending or in flight by the last process go out first.
+    # A failure here is logged and left to the scheduled "outbox" job.
+    try:
+        notion.replay_outbox(startup=True)
+    except Exception as e:
+        logging.error(f"🔥 Outbox replay failed at startup: {e}")
+
+    # Each job runs on its own cadence (see main.build_schedule); failures are isolated per job
+    scheduler = Scheduler(main.build_schedule(), on_finish=write_metrics)
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        # Allow you to Ctrl+C if running manually
+        logging.info("Stopping service manually.")
@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+from core import notion, resilience
+
+
+class FakeResponse:
+    status_code = 429
+    headers = {"Retry-After": "30"}
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        return FakeResponse()
+
+
+def test_rate_limit_wait_that_overruns_the_deadline_raises():
+    bucket = notion.TokenBucket(rate=1)
+    bucket.pause(30)
+    start = time.monotonic()
+    with resilience.deadline(1), pytest.raises(resilience.DeadlineExceeded):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.5
+
+
+def test_long_retry_after_does_not_outlive_the_request_deadline(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(notion, "_session", session)
+    monkeypatch.setattr(notion, "rate_limiter", notion.TokenBucket(rate=100))
+    start = time.monotonic()
+    with resilience.deadline(2), pytest.raises(resilience.DeadlineExceeded):
+        notion.request("GET", "/users/me")
+    assert session.calls == 1
+    assert time.monotonic() - start < 1
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from core import releases
+
+NOW = datetime(2026, 1, 20, 10, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def release_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(releases, "RELEASES_PATH", str(tmp_path / "releases.sqlite3"))
+    monkeypatch.setattr(releases, "_conn", None)
+
+
+def observe(source, days, hour, minute):
+    for d in days:
+        day = NOW - timedelta(days=d)
+        releases.record(source, day.replace(hour=hour, minute=minute), precision_minutes=1)
+
+
+def near(actual, expected):
+    # Observations are stored at the middle of their precision window, so to the minute
+    return abs(actual - expected) <= timedelta(minutes=1)
+
+
+def test_no_prediction_before_min_support():
+    observe("rwdi", range(1, releases.MIN_SUPPORT), 15, 30)
+    assert releases.predict_next("rwdi", now=NOW) is None
+
+
+def test_daily_slot_seen_every_complete_day_is_fully_confident():
+    # Today's 15:30 release has not happened yet, which must not count as a missed day
+    observe("rwdi", range(1, 6), 15, 30)
+    prediction = releases.predict_next("rwdi", now=NOW)
+    assert near(prediction["expected"], NOW.replace(hour=15, minute=30))
+    assert prediction["earliest"] <= prediction["expected"] <= prediction["latest"]
+    assert prediction["confidence"] == 1.0
+
+
+def test_next_of_two_daily_slots():
+    observe("rwdi", range(0, 6), 5, 30)
+    observe("rwdi", range(1, 6), 15, 30)
+    assert near(releases.predict_next("rwdi", now=NOW)["expected"], NOW.replace(hour=15, minute=30))
+    after = NOW.replace(hour=16, minute=30)
+    tomorrow = NOW + timedelta(days=1)
+    assert near(releases.predict_next("rwdi", now=after)["expected"], tomorrow.replace(hour=5, minute=30))
+
+
+def test_slot_seen_on_half_the_days_has_half_the_confidence():
+    observe("rwdi", [2, 4, 6, 8], 15, 30)
+    observe("rwdi", [8], 3, 0)
+    assert releases.predict_next("rwdi", now=NOW)["confidence"] == 0.5
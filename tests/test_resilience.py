@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from core import resilience
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession:
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.calls += 1
+        return FakeResponse(self.statuses.pop(0))
+
+
+def half_open(host):
+    """A breaker for host that has tripped and whose cool-down is already over."""
+    b = resilience.breaker(host, failure_threshold=1, cooldown=60)
+    b.failure()
+    b.opened_at = time.monotonic() - 61
+    return b
+
+
+def test_429_on_half_open_trial_releases_the_breaker():
+    b = half_open("throttled.test")
+    resp = resilience.http("GET", "http://throttled.test/", 5, session=FakeSession(429))
+    assert resp.status_code == 429
+    assert b.state == "open" and b.retry_in() == 0
+
+    # The next call is the new trial and closes the breaker
+    assert resilience.http("GET", "http://throttled.test/", 5, session=FakeSession(200)).status_code == 200
+    assert b.state == "closed"
+
+
+def test_deadline_on_half_open_trial_releases_the_breaker():
+    b = half_open("slow.test")
+    session = FakeSession(200)
+    with resilience.deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(resilience.DeadlineExceeded):
+            resilience.http("GET", "http://slow.test/", 5, session=session)
+        with pytest.raises(resilience.DeadlineExceeded):
+            with b.attempt():
+                resilience.budget(5)
+    assert session.calls == 0
+    assert b.state == "open" and b.retry_in() == 0
+
+    assert resilience.http("GET", "http://slow.test/", 5, session=session).status_code == 200
+    assert b.state == "closed"
+
+
+def test_exception_inside_attempt_releases_the_trial():
+    b = half_open("broken.test")
+    with pytest.raises(RuntimeError):
+        with b.attempt():
+            raise RuntimeError("browser failed to launch")
+    assert b.state == "open" and b.allow()
@@ -0,0 +1,32 @@
+from core import resolver as resolver_module
+from core.resolver import LookupResolver
+
+
+class FakeMirror:
+    def __init__(self, *titles):
+        self.titles = list(titles)
+
+    def sync(self, db_name):
+        pass
+
+    def rows(self, db_name):
+        return [{"id": f"id-{t}", "__title__": t} for t in self.titles]
+
+
+def test_exact_lookup_ignores_case_and_whitespace_but_not_substrings(monkeypatch):
+    monkeypatch.setattr(resolver_module, "mirror", FakeMirror("Peak Express", "Peak 2 Peak Gondola"))
+    r = LookupResolver()
+    assert r.find_id("Lifts", "  peak   EXPRESS ", exact=True) == "id-Peak Express"
+    assert r.find_id("Lifts", "Peak", exact=True) is None
+    assert r.find_id("Lifts", "Peak 2", exact=False) == "id-Peak 2 Peak Gondola"
+
+
+def test_misses_are_not_memoized(monkeypatch):
+    mirror = FakeMirror("Peak Express")
+    monkeypatch.setattr(resolver_module, "mirror", mirror)
+    monkeypatch.setattr(resolver_module, "RESOLVER_MISS_RELOAD_SECONDS", 0)
+    r = LookupResolver()
+    assert r.find_id("Lifts", "Harmony 6 Express", exact=True) is None
+
+    mirror.titles.append("Harmony 6 Express")
+    assert r.find_id("Lifts", "Harmony 6 Express", exact=True) == "id-Harmony 6 Express"
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from core import scheduler
+from core.scheduler import Daily, Every, AfterRelease, PredictedRelease
+
+VANCOUVER = ZoneInfo("America/Vancouver")
+
+
+def at(day, hour, minute=0):
+    return datetime(2026, 1, day, hour, minute, tzinfo=VANCOUVER)
+
+
+def test_daily_runs_at_its_slots_and_catches_up_once():
+    daily = Daily("07:30")
+    assert daily.next_due(None, None, at(10, 9)) == at(10, 9)
+    # Ran yesterday after its slot, so today's 07:30 was missed while down: due now
+    assert daily.next_due(at(9, 7, 31), None, at(10, 9)) == at(10, 9)
+    assert daily.next_due(at(10, 7, 31), None, at(10, 7, 31)) == at(11, 7, 30)
+
+
+def test_every_stays_inside_its_hours():
+    every = Every(30, 7, 18)
+    assert every.next_due(at(10, 9), None, at(10, 9)) == at(10, 9, 30)
+    assert every.next_due(at(10, 17, 45), None, at(10, 17, 45)) == at(11, 7)
+    assert every.next_due(None, None, at(10, 5)) == at(10, 7)
+
+
+def test_after_release_follows_the_countdown():
+    after = AfterRelease(delay_minutes=5, fallback_minutes=60)
+    assert after.next_due(at(10, 9), 42, at(10, 9)) == at(10, 9, 47)
+    assert after.next_due(at(10, 9), None, at(10, 9)) == at(10, 10)
+
+
+def test_predicted_release_uses_the_fallback_until_confident(monkeypatch):
+    latest = at(10, 15, 40)
+    prediction = {"expected": at(10, 15, 30), "earliest": at(10, 15, 20), "latest": latest, "confidence": 0.2}
+    monkeypatch.setattr(scheduler.releases, "predict_next", lambda source, now=None: prediction)
+    cadence = PredictedRelease("rwdi", fallback=Daily("05:30", "15:30"), delay_minutes=5)
+
+    assert cadence.next_due(at(10, 9), None, at(10, 9)) == at(10, 15, 30)
+    prediction["confidence"] = 0.9
+    assert cadence.next_due(at(10, 9), None, at(10, 9)) == latest + timedelta(minutes=5)
@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from core import resilience, scraper
+
+
+def fresh_breaker(host):
+    b = resilience.breaker(host)
+    b.state, b.failures = "closed", 0
+    return b
+
+
+def test_spent_budget_does_not_count_against_the_host(monkeypatch):
+    b = fresh_breaker("budget.test")
+
+    def out_of_time(url, selector):
+        raise resilience.DeadlineExceeded("deadline budget spent")
+
+    monkeypatch.setattr(scraper, "_fetch_static", out_of_time)
+    for _ in range(3):
+        assert scraper.scrape_dynamic_content("http://budget.test/", use_cache=False) is None
+    assert b.state == "closed" and b.failures == 0
+
+
+def test_browser_launch_failure_does_not_count_against_the_host(monkeypatch):
+    b = fresh_breaker("nobrowser.test")
+
+    def launch_fails(self):
+        raise RuntimeError("Executable doesn't exist")
+
+    monkeypatch.setattr(scraper.strategies, "should_try_http", lambda url: False)
+    monkeypatch.setattr(scraper.BrowserPool, "_ensure_browser", launch_fails)
+    for _ in range(3):
+        assert scraper.scrape_dynamic_content("http://nobrowser.test/", use_cache=False) is None
+    assert b.state == "closed" and b.failures == 0
+
+
+def test_failed_fetch_counts_against_the_host(monkeypatch):
+    b = fresh_breaker("down.test")
+    monkeypatch.setattr(scraper, "_fetch", lambda url, selector, timeout, block_profile: None)
+    for _ in range(3):
+        scraper.scrape_dynamic_content("http://down.test/", use_cache=False)
+    assert b.state == "open"
+
+
+def test_refresh_replaces_the_cached_page(monkeypatch):
+    pages = iter(["<p>old</p>", "<p>new</p>"])
+    monkeypatch.setattr(scraper, "_fetch", lambda url, selector, timeout, block_profile: next(pages))
+    url = "http://release.test/forecast"
+    assert scraper.scrape_dynamic_content(url) == "<p>old</p>"
+    assert scraper.scrape_dynamic_content(url) == "<p>old</p>"
+    assert scraper.scrape_dynamic_content(url, refresh=True) == "<p>new</p>"
+    assert scraper.scrape_dynamic_content(url) == "<p>new</p>"
+
+
+def test_renders_from_every_thread_share_one_browser_thread(monkeypatch):
+    pools = []
+
+    @contextmanager
+    def fake_page(self, block_profile=None, **context_kwargs):
+        pools.append(self)
+        yield threading.current_thread().name
+
+    monkeypatch.setattr(scraper.BrowserPool, "page", fake_page)
+    scraper.close_browser_pool()
+    with ThreadPoolExecutor(max_workers=4) as workers:
+        names = set(workers.map(lambda _: scraper.render(lambda page: page), range(8)))
+    assert names == {"browser"}
+    assert len(set(map(id, pools))) == 1
+    scraper.close_browser_pool()
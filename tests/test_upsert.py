@@ -0,0 +1,67 @@
+import itertools
+
+from core import upsert
+from core.mirror import NotionMirror
+from jobs import weather
+
+ELEVATION = "1800m"
+
+
+class FakePipeline:
+    """WritePipeline stand-in that applies writes to an in-memory Notion."""
+    pages = {}
+    _ids = itertools.count(1)
+
+    def __init__(self, database_id):
+        self.queued = []
+
+    def add(self, properties, label=None, key=None):
+        self.queued.append((None, properties, label))
+
+    def update(self, page_id, properties, label=None, key=None):
+        self.queued.append((page_id, properties, label))
+
+    def flush(self):
+        results = []
+        for page_id, properties, label in self.queued:
+            page_id = page_id or f"page-{next(self._ids)}"
+            page = self.pages.setdefault(page_id, {"id": page_id, "properties": {}})
+            page["properties"].update(properties)
+            results.append({"label": label, "ok": True, "page_id": page_id, "page": page, "error": None,
+                            "queued": False})
+        return results
+
+
+def card(day, period, summary):
+    return {
+        "Elevation + Update Time": {"title": [{"text": {"content": f"{ELEVATION} - 05:45"}}]},
+        "Forecast Date": {"date": {"start": day}},
+        "Time of Day": {"select": {"name": period}},
+        "Daily Summary": {"rich_text": [{"text": {"content": summary}}]},
+    }
+
+
+def run_day(day, cards):
+    upserter = upsert.Upserter("Weather Forecasts", "db", "latest_forecast", ["Daily Summary"])
+    for period, summary in cards:
+        upserter.upsert((ELEVATION, day, period), card(day, period, summary), label=period)
+    weather.supersede_earlier_days(upserter, ELEVATION, day)
+    upserter.flush()
+    return upserter.counts
+
+
+def test_next_day_report_supersedes_the_previous_cards(tmp_path, monkeypatch):
+    monkeypatch.setattr(upsert, "mirror", NotionMirror(str(tmp_path / "mirror.sqlite3")))
+    monkeypatch.setattr(upsert.notion, "WritePipeline", FakePipeline)
+    monkeypatch.setattr(upsert.notion, "report", lambda results: None)
+    FakePipeline.pages = {}
+
+    counts = run_day("2026-01-10", [("Today", "Snow"), ("Tonight", "Flurries")])
+    assert counts["inserted"] == 2 and counts["superseded"] == 0
+
+    counts = run_day("2026-01-11", [("Today", "Sun"), ("Tonight", "Clear")])
+    assert counts["inserted"] == 2 and counts["superseded"] == 2
+
+    live = sorted((p["Forecast Date"], p["Time of Day"]) for p in upsert.mirror.rows("Weather Forecasts")
+                  if p.get(upsert.LATEST_FLAG))
+    assert live == [("2026-01-11", "Today"), ("2026-01-11", "Tonight")]